@@ -1 +1,22 @@
-from anikimiapi.anikimi import AniKimi
\ No newline at end of file
+# The clients are imported on first access, so that `import anikimiapi` stays
+# cheap for short-lived processes, see benchmarks/import_time.py.
+_LAZY = {
+    "AniKimi": "anikimiapi.anikimi",
+    "AsyncAniKimi": "anikimiapi.async_anikimi",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
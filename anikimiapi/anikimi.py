@@ -1,9 +1,20 @@
-from requests_html import HTMLSession
-from bs4 import BeautifulSoup
-import requests
-from anikimiapi.data_classes import *
-from anikimiapi.error_handlers import *
-import re
+import time
+from anikimiapi.cache import ResponseCache, conditional_headers, copy_parsed
+from anikimiapi.coalescing import coalesced
+from anikimiapi.data_classes import LazyMediaLinksObject, MediaInfoObject, MediaLinksObject
+from anikimiapi.error_handlers import (
+    AiringIndexError,
+    CountError,
+    InvalidAnimeIdError,
+    InvalidGenreNameError,
+    InvalidTokenError,
+    NetworkError,
+    NoSearchResultsError,
+)
+from anikimiapi.instrumentation import TEMPLATES, traced
+from anikimiapi.pagination import iter_pages, paginate, submit_in_context
+from anikimiapi.parsers import get_parser
+from anikimiapi.transport import Transport, network_errors
 
 class AniKimi:
     """The `AniKimi` class which authorizes the gogoanime client.
@@ -13,11 +24,53 @@ class AniKimi:
             To get this token, please refer to readme.md in the repository.
         auth_token (``str``):
             To get this token, please refer to readme.md in the repository.
-        host (``str``):
+        host (``str`` | ``list`` | :obj:`-anikimiapi.hosts.HostPool`):
             Change the base url, If gogoanime changes the domain, replace the url
-            with the new domain. Defaults to https://gogoanime.pe/ .
+            with the new domain. Defaults to https://gogoanime.pe/ . With a list of
+            mirrors, each request goes to the fastest healthy one, see :attr:`hosts`.
+            A `HostPool` given here can be shared, closing the client leaves it open.
         user_agent (``dict``):
              user_agent header for requests to the host. no need to set/change this.
+        pool_connections (``int``, *optional*):
+            The number of per-host connection pools kept by the client. Defaults to 10.
+        pool_maxsize (``int``, *optional*):
+            The maximum number of keep-alive connections kept per host. Defaults to 10.
+        timeout (``float`` | ``tuple``, *optional*):
+            The request timeout in seconds, or a ``(connect, read)`` tuple. Defaults to ``(10, 30)``.
+        transport (:obj:`-anikimiapi.transport.Transport`, *optional*):
+            A custom transport to send the requests through. If given, ``pool_connections``,
+            ``pool_maxsize``, ``timeout``, ``scheduler``, ``retry``, ``hedge`` and ``breaker``
+            are ignored.
+        cache (:obj:`-anikimiapi.cache.ResponseCache`, *optional*):
+            A cache for the fetched pages. Nothing is cached by default.
+        parser (``str`` | :obj:`-anikimiapi.parsers.BaseParser`, *optional*):
+            The parser backend, ``"soup"`` (the default) or ``"lxml"`` which is faster,
+            or a parser instance.
+        catalog (:obj:`-anikimiapi.catalog.CatalogIndex`, *optional*):
+            A local index filled with the results of :meth:`search_anime`, :meth:`get_by_genres`
+            and :meth:`get_details`, which :meth:`search_anime` answers from first.
+        scheduler (:obj:`-anikimiapi.scheduler.Scheduler`, *optional*):
+            Limits the rate and the concurrency of the requests sent to each host,
+            adapting them when the host throttles. Unlimited by default.
+        timeouts (``dict``, *optional*):
+            The timeout of the requests of some routes, overriding ``timeout``, for example
+            ``{"embed": 5}``. The routes are the ones of :obj:`-anikimiapi.cache.ResponseCache`.
+        retry (:obj:`-anikimiapi.resilience.RetryPolicy`, *optional*):
+            Retries the requests which fail or get a transient error. No retries by default.
+        hedge (:obj:`-anikimiapi.resilience.HedgePolicy`, *optional*):
+            Sends a duplicate of the requests slower than most, using the first response.
+        breaker (:obj:`-anikimiapi.resilience.CircuitBreaker`, *optional*):
+            Fails fast, with :obj:`-anikimiapi.error_handlers.CircuitOpenError`, the requests
+            to a host which keeps failing.
+        instrumentation (:obj:`-anikimiapi.instrumentation.Instrumentation`, *optional*):
+            Reports the timed spans of every call, fetch and parse to its hooks, like
+            :obj:`-anikimiapi.instrumentation.Metrics`. Nothing is measured by default.
+        link_cache (:obj:`-anikimiapi.link_cache.LinkCache`, *optional*):
+            A cache of the resolved episode links, served until shortly before the signed
+            links expire. The links are resolved on every call by default.
+        single_flight (:obj:`-anikimiapi.coalescing.SingleFlight`, *optional*):
+            Coalesces the concurrent fetches of a same url, and the concurrent calls of a
+            same method with the same arguments, into one. Nothing is coalesced by default.
 
     Example:
         .. code-block:: python
@@ -40,23 +93,173 @@ class AniKimi:
             auth_token: str, 
             host: str = "https://gogoanime.pe/",
             user_agent:dict = {'User-Agent': 'Mozilla/5.0'},
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            timeout=(10, 30),
+            transport: Transport = None,
+            cache: ResponseCache = None,
+            parser=None,
+            catalog=None,
+            scheduler=None,
+            timeouts: dict = None,
+            retry=None,
+            hedge=None,
+            breaker=None,
+            instrumentation=None,
+            link_cache=None,
+            single_flight=None,
     ):
         self.gogoanime_token = gogoanime_token
         self.auth_token = auth_token
-        self.host = host
+        if isinstance(host, str):
+            self.hosts = None
+            self.host = host
+        else:
+            from anikimiapi.hosts import HostPool
+
+            # a pool given by the caller may be shared, only the one created here is closed
+            self._own_hosts = not isinstance(host, HostPool)
+            self.hosts = HostPool(host, headers=user_agent) if self._own_hosts else host
+            self.host = self.hosts.hosts[0]
         self.user_agent=user_agent
+        if transport is None:
+            transport = Transport(
+                headers=user_agent,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                timeout=timeout,
+                scheduler=scheduler,
+                retry=retry,
+                hedge=hedge,
+                breaker=breaker,
+            )
+        self.transport = transport
+        self.parser = get_parser(parser)
+        self.cache = cache
+        self.timeouts = timeouts or {}
+        self.catalog = catalog
+        self.instrumentation = instrumentation
+        self.link_cache = link_cache
+        self.single_flight = single_flight
 
     def __str__(self) -> str:
         return "Anikimi API - Copyrights (c) 2020-2021 BaraniARR."
 
+    def close(self) -> None:
+        """Close the pooled connections of the client."""
+        if self.hosts is not None and self._own_hosts:
+            self.hosts.close()
+        if self.link_cache is not None:
+            self.link_cache.close()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    def search_anime(self, query: str) -> list:
+
+    def _send(self, url: str, cookies: dict = None, timeout=None, headers: dict = None):
+        """send a request through the mirrors, if any, and the transport."""
+        if self.hosts is not None and url.startswith(self.host):
+            return self.hosts.get(
+                self.transport, url[len(self.host):], cookies=cookies, headers=headers, timeout=timeout,
+            )
+        return self.transport.get(url, cookies=cookies, headers=headers, timeout=timeout)
+
+    def _fetch(self, url: str, route: str, cookies: dict, timeout):
+        """the page of ``url`` from the cache or the transport, and the response if it
+        was requested."""
+        fetched = None
+        if self.cache is None or cookies:
+            page = fetched = self._send(url, cookies=cookies, timeout=timeout)
+        else:
+            page = self.cache.get(url)
+            if page is None:
+                stale = self.cache.stale(url)
+                headers = conditional_headers(stale) if stale is not None else None
+                page = fetched = self._send(url, timeout=timeout, headers=headers)
+                if page.status == 304 and stale is not None:
+                    self.cache.renew(route, url, stale)
+                    page = stale
+                elif page.status == 200:
+                    page.parsed = {}
+                    self.cache.put(route, url, page)
+        if page.parsed is None and self.single_flight is not None:
+            page.parsed = {}  # the callers sharing the page share its parsing
+        return page, fetched
+
+    def _get(self, url: str, route: str, cookies: dict = None, timeout=None):
+        """fetch a page through the single flight, if any, the cache, if any, and the
+        transport, a server error raises ``NetworkError``. ``timeout`` overrides the
+        one of the route."""
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            started = time.perf_counter()
+        if timeout is None:
+            timeout = self.timeouts.get(route)
+        shared = False  # whether the page was fetched for another caller
+        try:
+            if self.single_flight is None:
+                page, fetched = self._fetch(url, route, cookies, timeout)
+            else:
+                (page, fetched), shared = self.single_flight.call(
+                    ("fetch", url, bool(cookies)), lambda: self._fetch(url, route, cookies, timeout),
+                )
+        except Exception as error:
+            if instrumentation is not None:
+                instrumentation.emit(
+                    "fetch", started, time.perf_counter() - started,
+                    route=route, template=TEMPLATES[route], url=url, error=type(error).__name__,
+                )
+            raise
+        if instrumentation is not None:
+            instrumentation.emit(
+                "fetch", started, time.perf_counter() - started, route=route, template=TEMPLATES[route],
+                url=url, status=page.status, bytes=len(page.text), cached=fetched is None,
+                not_modified=fetched is not None and fetched.status == 304, coalesced=shared,
+                wire_bytes=fetched.wire_bytes if fetched is not None and not shared else 0,
+                decoded_bytes=fetched.decoded_bytes if fetched is not None and not shared else 0,
+            )
+        if page.status >= 500:
+            raise NetworkError(f"The server answered {page.status}, try again later")
+        return page
+
+    def _parse(self, phase: str, page, parse=None):
+        """run the parser method ``phase`` on ``page``, timed if instrumented, reusing
+        the result already parsed from a cached page. ``parse`` runs in place of the
+        parser method, taking the page source, like the workers of a pipeline."""
+        parsed = page.parsed
+        if parsed is not None and phase in parsed:
+            return copy_parsed(parsed[phase])
+        if parse is None:
+            parse = getattr(self.parser, phase)
+        if self.instrumentation is None:
+            result = parse(page.text)
+        else:
+            result = self.instrumentation.parse(parse, phase, page.text)
+        if parsed is None:
+            return result
+        parsed[phase] = result
+        return copy_parsed(result)
+
+    @traced
+    @coalesced
+    def search_anime(self, query: str, use_catalog: bool = True) -> list:
         """The method used to search anime when a query string is passed
 
+        With a ``catalog``, the matching anime of the catalog are returned, and
+        the server is only searched when none matches.
+
         Parameters:
             query(``str``):
                 The query String which was to be searched in the API.
 
+            use_catalog(``bool``, *optional*):
+                Answer from the catalog, if any. Defaults to ``True``, with ``False``
+                the server is searched and the catalog only updated.
+
         Returns:
             List of :obj:`-anikimiapi.data_classes.ResultObject`: On Success, the list of search results is returned.
 
@@ -79,26 +282,79 @@ class AniKimi:
                 print(results.animeid)
 
         """
+        if self.catalog is not None and use_catalog:
+            res_list_search = self.catalog.search(query)
+            if res_list_search:
+                return res_list_search
         try:
             url1 = f"{self.host}/search.html?keyword={query}"
-            session = HTMLSession()
-            response = session.get(url1,headers=self.user_agent)
-            response_html = response.text
-            soup = BeautifulSoup(response_html, 'html.parser')
-            animes = soup.find("ul", {"class": "items"}).find_all("li")
-            res_list_search = []
-            for anime in animes:  # For every anime found
-                tit = anime.a["title"]
-                urll = anime.a["href"]
-                r = urll.split('/')
-                res_list_search.append(ResultObject(title=f"{tit}", animeid=f"{r[2]}"))
+            response = self._get(url1, "search")
+            res_list_search = self._parse("search_results", response)
             if not res_list_search:
                 raise NoSearchResultsError("No Search Results found for the query")
             else:
+                if self.catalog is not None:
+                    self.catalog.add_results(res_list_search)
                 return res_list_search
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to the Server, Check your connection")
 
+    @traced
+    def iter_search(self, query: str, prefetch: bool = True):
+        """Like :meth:`search_anime`, but yields the results of every results page, lazily.
+
+        A results page is only fetched when the results of the previous one are
+        being consumed (with ``prefetch``, one page ahead in the background), so
+        the first results come back after a single request and the caller can
+        stop at any time.
+
+        Parameters:
+            query(``str``):
+                The query String which was to be searched in the API.
+
+            prefetch(``bool``, *optional*):
+                Fetch the next results page while the current one is consumed. Defaults to ``True``.
+
+        Yields:
+            :obj:`-anikimiapi.data_classes.ResultObject`: The search results, in order.
+
+        Example:
+        .. code-block:: python
+            :emphasize-lines: 1,4-7,10-14
+
+            from anikimiapi import AniKimi
+
+            # Authorize the api to GogoAnime
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+
+            # Stop after the first 5 results
+            for i, result in enumerate(anime.iter_search(query="love")):
+                if i == 5:
+                    break
+                print(result.title)
+        """
+        url = f"{self.host}/search.html?keyword={query}&page="
+        results = iter_pages(
+            lambda page: self._get(f'{url}{page}', "search"),
+            lambda page: self._parse("listing", page),
+            prefetch=prefetch,
+        )
+        try:
+            first = next(results, None)
+            if first is None:
+                raise NoSearchResultsError("No Search Results found for the query")
+            yield first
+            yield from results
+        except AttributeError:
+            raise NoSearchResultsError("No Search Results found for the query")
+        except network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+
+    @traced
+    @coalesced
     def get_details(self, animeid: str) -> MediaInfoObject:
         """Get the basic details of anime using an animeid parameter.
 
@@ -130,53 +386,21 @@ class AniKimi:
         """
         try:
             animelink = f'{self.host}category/{animeid}'
-            response = requests.get(animelink,headers=self.user_agent)
-            plainText = response.text
-            soup = BeautifulSoup(plainText, "lxml")
-            source_url = soup.find("div", {"class": "anime_info_body_bg"}).img
-            imgg = source_url.get('src')
-            tit_url = soup.find("div", {"class": "anime_info_body_bg"}).h1.string
-            lis = soup.find_all('p', {"class": "type"})
-            plot_sum = lis[1]
-            pl = plot_sum.get_text().split(':')
-            pl.remove(pl[0])
-            sum = ""
-            plot_summary = sum.join(pl)
-            type_of_show = lis[0].a['title']
-            ai = lis[2].find_all('a')  # .find_all('title')
-            genres = []
-            for link in ai:
-                genres.append(link.get('title'))
-            year1 = lis[3].get_text()
-            year2 = year1.split(" ")
-            year = year2[1]
-            status = lis[4].a.get_text()
-            oth_names = lis[5].get_text()
-            lnk = soup.find(id="episode_page")
-            ep_str = str(lnk.contents[-2])
-            a_tag = ep_str.split("\n")[-2]
-            a_tag_sliced = a_tag[:-4].split(">")
-            last_ep_range = a_tag_sliced[-1]
-            y = last_ep_range.split("-")
-            ep_num = y[-1]
-            res_detail_search = MediaInfoObject(
-                title=f"{tit_url}",
-                year=int(year),
-                other_names=f"{oth_names}",
-                season=f"{type_of_show}",
-                status=f"{status}",
-                genres=genres,
-                episodes=int(ep_num),
-                image_url=f"{imgg}",
-                summary=f"{plot_summary}"
-            )
-            return res_detail_search
+            response = self._get(animelink, "category")
+            details = self._parse("details", response)
         except AttributeError:
             raise InvalidAnimeIdError("Invalid animeid given")
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to the Server, Check your connection")
-
-    def get_episode_link_advanced(self, animeid: str, episode_num: int) -> MediaLinksObject:
+        if self.catalog is not None:
+            self.catalog.add_details(animeid, details)
+        return details
+
+    @traced
+    @coalesced
+    def get_episode_link_advanced(
+            self, animeid: str, episode_num: int, lazy: bool = False, fields=None,
+    ) -> MediaLinksObject:
         """Get streamable and downloadable links for a given animeid and episode number.
         If the link is not found, then this method will return ``None`` .
 
@@ -187,6 +411,15 @@ class AniKimi:
              episode_num(``int``):
                 The episode number of the anime you want to download.
 
+             lazy(``bool``, *optional*):
+                Return once the episode page is parsed, and fetch ``link_hdp`` (an extra
+                request) on its first access, see :obj:`-anikimiapi.data_classes.LazyMediaLinksObject`.
+                Defaults to ``False``.
+
+             fields(``list``, *optional*):
+                Only get these links, like ``["720p", "mixdrop"]``, the others are ``None``.
+                Without ``"hdp"``, the embed page is not fetched.
+
         Returns:
             :obj:`-anikimiapi.data_classes.MediaLinksObject`: On success, the links of the anime is returned.
 
@@ -210,90 +443,28 @@ class AniKimi:
 
             # and many more...
         """
+        if fields is not None:
+            fields = MediaLinksObject.fields(fields)
+        links = self._cached_links(animeid, episode_num, "advanced")
+        if links is not None:
+            return links if fields is None else links.only(fields)
         try:
-            ep_num_link_get = episode_num
-            str_qry_final = animeid
-            animelink = f'{self.host}category/{str_qry_final}'
-            response = requests.get(animelink,headers=self.user_agent)
-            plainText = response.text
-            soup = BeautifulSoup(plainText, "lxml")
-            lnk = soup.find(id="episode_page")
-            source_url = lnk.find("li").a
-            anime_title = soup.find("div", {"class": "anime_info_body_bg"}).h1.string
-            ep_num_tot = source_url.get("ep_end")
-            last_ep = int(ep_num_tot)
-            episode_url = '{}{}-episode-{}'
-            url = episode_url.format(self.host, str_qry_final, ep_num_link_get)
-            master_keyboard_list = []
-            cookies = {
-                'gogoanime': self.gogoanime_token,
-                'auth': self.auth_token
-            }
-            response = requests.get(url=url, cookies=cookies,headers=self.user_agent)
-            plaintext = response.text
-            soup = BeautifulSoup(plaintext, "lxml")
-            download_div = soup.find("div", {'class': 'cf-download'}).findAll('a')
-            links_final = MediaLinksObject()
-            for links in download_div:
-                download_links = links['href']
-                q_name_raw = links.text.strip()
-                q_name_raw_list = q_name_raw.split('x')
-                quality_name = q_name_raw_list[1]  # 360, 720, 1080p links .just append to keyb lists with name and href
-                if quality_name == "360":
-                    links_final.link_360p = download_links
-                elif quality_name == "480":
-                    links_final.link_480p = download_links
-                elif quality_name == "720":
-                    links_final.link_720p = download_links
-                elif quality_name == "1080":
-                    links_final.link_1080p = download_links
-            anime_multi_link_initial = soup.find('div', {'class': 'anime_muti_link'}).findAll('li')
-            anime_multi_link_initial.remove(anime_multi_link_initial[0])
-            chumma_list = []
-            for l in anime_multi_link_initial:
-                get_a = l.find('a')
-                video_links = get_a['data-video']
-                valid = video_links[0:4]
-                if valid == "http":
-                    pass
-                else:
-                    video_links = f"https:{video_links}"
-                chumma_list.append(video_links)
-            anime_multi_link_initial.remove(anime_multi_link_initial[0])
-            for other_links in anime_multi_link_initial:
-                get_a_other = other_links.find('a')
-                downlink = get_a_other['data-video']  # video links other websites
-                quality_name = other_links.text.strip().split('C')[0]  # other links name quality
-                if quality_name == "Streamsb":
-                    links_final.link_streamsb = downlink
-                elif quality_name == "Xstreamcdn":
-                    links_final.link_xstreamcdn = downlink
-                elif quality_name == "Streamtape":
-                    links_final.link_streamtape = downlink
-                elif quality_name == "Mixdrop":
-                    links_final.link_mixdrop = downlink
-                elif quality_name == "Mp4Upload":
-                    links_final.link_mp4upload = downlink
-                elif quality_name == "Doodstream":
-                    links_final.link_doodstream = downlink
-            res = requests.get(chumma_list[0],headers=self.user_agent)
-            plain = res.text
-            s = BeautifulSoup(plain, "lxml")
-            t = s.findAll('script')
-            hdp_js = t[2].string
-            hdp_link_initial = re.search("(?P<url>https?://[^\s]+)", hdp_js).group("url")
-            hdp_link_initial_list = hdp_link_initial.split("'")
-            hdp_link_final = hdp_link_initial_list[0]  # final hdp links
-            links_final.link_hdp = hdp_link_final
-            return links_final
+            animelink = f'{self.host}category/{animeid}'
+            response = self._get(animelink, "category")
+            self._parse("anime_title", response)
+            return self._resolve_links(animeid, episode_num, "advanced", lazy, fields)
         except AttributeError:
             raise InvalidAnimeIdError("Invalid animeid or episode_num given")
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to the Server, Check your connection")
         except TypeError:
             raise InvalidTokenError("Invalid tokens passed, Check your tokens")
 
-    def get_episode_link_basic(self, animeid: str, episode_num: int) -> MediaLinksObject():
+    @traced
+    @coalesced
+    def get_episode_link_basic(
+            self, animeid: str, episode_num: int, lazy: bool = False, fields=None,
+    ) -> MediaLinksObject:
         """Get streamable and downloadable links for a given animeid and episode number.
         If the link is not found, then this method will return ``None`` .
 
@@ -304,6 +475,15 @@ class AniKimi:
              episode_num(``int``):
                 The episode number of the anime you want to download.
 
+             lazy(``bool``, *optional*):
+                Return once the episode page is parsed, and fetch the download page the links
+                are read from on the first access to one, see
+                :obj:`-anikimiapi.data_classes.LazyMediaLinksObject`. Defaults to ``False``.
+
+             fields(``list``, *optional*):
+                Only get these links, like ``["720p", "mixdrop"]``, the others are ``None``.
+                All the links come from the same page, so this saves no request.
+
         Returns:
             :obj:`-anikimiapi.data_classes.MediaLinksObject`: On success, the links of the anime is returned.
 
@@ -327,69 +507,313 @@ class AniKimi:
 
             # and many more...
         """
+        if fields is not None:
+            fields = MediaLinksObject.fields(fields)
+        links = self._cached_links(animeid, episode_num, "basic")
+        if links is not None:
+            return links if fields is None else links.only(fields)
         try:
             animelink = f'{self.host}category/{animeid}'
-            response = requests.get(animelink,headers=self.user_agent)
-            plainText = response.text
-            soup = BeautifulSoup(plainText, "lxml")
-            lnk = soup.find(id="episode_page")
-            source_url = lnk.find("li").a
-            tit_url = soup.find("div", {"class": "anime_info_body_bg"}).h1.string
-            URL_PATTERN = '{}{}-episode-{}'
-            url = URL_PATTERN.format(self.host, animeid, episode_num)
-            srcCode = requests.get(url,headers=self.user_agent)
-            plainText = srcCode.text
-            soup = BeautifulSoup(plainText, "lxml")
-            source_url = soup.find("li", {"class": "dowloads"}).a
-            vidstream_link = source_url.get('href')
-            # print(vidstream_link)
-            URL = vidstream_link
-            dowCode = requests.get(URL,headers=self.user_agent)
-            data = dowCode.text
-            soup = BeautifulSoup(data, "lxml")
-            dow_url= soup.findAll('div',{'class':'dowload'})
-            episode_res_link = {'title':f"{tit_url}"}
-            links_final = MediaLinksObject()
-            for i in range(len(dow_url)):
-                Url = dow_url[i].find('a')
-                downlink = Url.get('href')
-                str_= Url.string
-                str_spl = str_.split()
-                str_spl.remove(str_spl[0])
-                str_original = ""
-                quality_name = str_original.join(str_spl)
-                episode_res_link.update({f"{quality_name}":f"{downlink}"})
-                if "(HDP-mp4)" in quality_name:
-                    links_final.link_hdp = downlink
-                elif "(SDP-mp4)" in quality_name:
-                    links_final.link_sdp = downlink
-                elif "(360P-mp4)" in quality_name:
-                    links_final.link_360p = downlink
-                elif "(720P-mp4)" in quality_name:
-                    links_final.link_720p = downlink
-                elif "(1080P-mp4)" in quality_name:
-                    links_final.link_1080p = downlink
-                elif "Streamsb" in quality_name:
-                    links_final.link_streamsb = downlink
-                elif "Xstreamcdn" in quality_name:
-                    links_final.link_xstreamcdn = downlink
-                elif "Streamtape" in quality_name:
-                    links_final.link_streamtape = downlink
-                elif "Mixdrop" in quality_name:
-                    links_final.link_mixdrop = downlink
-                elif "Mp4Upload" in quality_name:
-                    links_final.link_mp4upload = downlink
-                elif "Doodstream" in quality_name:
-                    links_final.link_doodstream = downlink
-            return links_final
+            response = self._get(animelink, "category")
+            self._parse("anime_title", response)
+            return self._resolve_links(animeid, episode_num, "basic", lazy, fields)
         except AttributeError:
             raise InvalidAnimeIdError("Invalid animeid or episode_num given")
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to the Server, Check your connection")
         except TypeError:
-            raise InvalidTokenError("Invalid tokens passed, Check your tokens")            
-        
-    def get_by_genres(self,genre_name, limit=60 ) -> list :
+            raise InvalidTokenError("Invalid tokens passed, Check your tokens")
+
+    @traced
+    def iter_mirror_links(self, animeid: str, episode_num: int, timeout: float = 15, extractors: dict = None):
+        """Extract a direct media url from every streaming mirror of an episode at once.
+
+        :meth:`get_episode_link_advanced` only follows the first mirror, the others
+        are returned as the urls of their embed pages. This fetches the embed page of
+        every mirror concurrently, and extracts a direct url from each one with the
+        extractor of the mirror (see :func:`-anikimiapi.mirrors.register_extractor`).
+        The results are yielded as soon as each mirror is done, so a slow mirror
+        doesn't hold up the others, and all of them share a deadline of ``timeout``
+        seconds, after which the unfinished ones are yielded with a ``TimeoutError``.
+
+        Parameters:
+             animeid(``str``):
+                The animeid of the anime you want to download.
+
+             episode_num(``int``):
+                The episode number of the anime you want to download.
+
+             timeout(``float``, *optional*):
+                The seconds, from the call, given to the mirrors. Defaults to 15.
+
+             extractors(``dict``, *optional*):
+                Extractors overriding the registered ones for this call, by mirror name.
+                A mirror mapped to ``None`` is skipped.
+
+        Yields:
+            :obj:`-anikimiapi.mirrors.MirrorLink`: The url of each mirror, or why it has none.
+
+        Raises:
+            ``InvalidAnimeIdError``: If the animeid or the episode_num is invalid.
+            ``NetworkError``: If the episode page could not be fetched.
+
+        Example:
+        .. code-block:: python
+            :emphasize-lines: 1,4-7,10-14
+
+            from anikimiapi import AniKimi
+
+            # Authorize the api to GogoAnime
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+
+            # Play the first mirror which answers
+            for mirror in anime.iter_mirror_links(animeid="clannad-dub", episode_num=3, timeout=5):
+                if mirror.url is not None:
+                    print(mirror.name, mirror.url)
+                    break
+        """
+        from anikimiapi.mirrors import MirrorLink, get_extractor
+
+        deadline = time.monotonic() + timeout
+        cookies = {
+            'gogoanime': self.gogoanime_token,
+            'auth': self.auth_token
+        }
+        try:
+            response = self._get(f'{self.host}{animeid}-episode-{episode_num}', "episode", cookies=cookies)
+            mirrors = [
+                (name, embed_url, get_extractor(name, extractors))
+                for name, embed_url in self._parse("mirrors", response)
+            ]
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid or episode_num given")
+        except network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+        mirrors = [mirror for mirror in mirrors if mirror[2] is not None]
+        if not mirrors:
+            return
+
+        def resolve_one(name, embed_url, extract):
+            started = time.perf_counter()
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("The deadline passed before the mirror was fetched")
+                page = self._get(embed_url, "embed", timeout=remaining)
+                url = extract(page.text, embed_url)
+                error = None if url else LookupError("No media url found in the embed page")
+            except network_errors():
+                url, error = None, NetworkError("Unable to connect to the mirror")
+            except Exception as exc:
+                url, error = None, exc
+            return MirrorLink(name, embed_url, url or None, error, time.perf_counter() - started)
+
+        from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+
+        executor = ThreadPoolExecutor(max_workers=len(mirrors))
+        futures = {}
+        yielded = set()
+        try:
+            for mirror in mirrors:
+                futures[submit_in_context(executor, resolve_one, *mirror)] = mirror
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                    yielded.add(future)
+                    yield future.result()
+            except FuturesTimeout:
+                for future, (name, embed_url, _) in futures.items():
+                    if future in yielded:
+                        continue
+                    if future.done() and not future.cancelled():
+                        yield future.result()
+                    else:
+                        yield MirrorLink(
+                            name, embed_url, error=TimeoutError("The mirror did not answer before the deadline"),
+                            elapsed=timeout,
+                        )
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _cached_links(self, animeid: str, episode_num: int, mode: str):
+        """the cached links of an episode, if any, refreshed in the background when due."""
+        if self.link_cache is None:
+            return None
+        key = (animeid, episode_num, mode)
+        links = self.link_cache.get(key)
+        if links is not None and self.link_cache.claim_refresh(key):
+            resolve = self._resolve_advanced if mode == "advanced" else self._resolve_basic
+            self.link_cache.refresh(key, lambda: resolve(animeid, episode_num))
+        return links
+
+    def _resolve_links(self, animeid: str, episode_num: int, mode: str, lazy: bool = False, fields=None):
+        """resolve the links of an episode whose animeid was already validated, and cache
+        them if they are complete."""
+        resolve = self._resolve_advanced if mode == "advanced" else self._resolve_basic
+        links = resolve(animeid, episode_num, lazy, fields)
+        if self.link_cache is not None and not lazy and fields is None:
+            self.link_cache.put((animeid, episode_num, mode), links)
+        return links
+
+    def _lazy_loader(self, load):
+        """wrap the loader of a lazy field, to raise the errors of the resolvers."""
+        def loader():
+            try:
+                return load()
+            except AttributeError:
+                raise InvalidAnimeIdError("Invalid animeid or episode_num given")
+            except network_errors():
+                raise NetworkError("Unable to connect to the Server, Check your connection")
+        return loader
+
+    def _resolve_advanced(self, animeid: str, episode_num: int, lazy: bool = False, fields=None):
+        """resolve the links of an episode whose animeid was already validated, advanced method.
+
+        ``link_hdp`` comes from the embed page, fetched only if it is in ``fields``,
+        and on first access if ``lazy``."""
+        url = f'{self.host}{animeid}-episode-{episode_num}'
+        cookies = {
+            'gogoanime': self.gogoanime_token,
+            'auth': self.auth_token
+        }
+        response = self._get(url, "episode", cookies=cookies)
+        links_final, chumma_list = self._parse("episode_links", response)
+
+        def load_hdp():
+            res = self._get(chumma_list[0], "embed")
+            return MediaLinksObject(link_hdp=self._parse("embed_hdp_link", res))
+
+        if fields is not None and "link_hdp" not in fields:
+            return links_final.only(fields)
+        if lazy:
+            links_final = LazyMediaLinksObject(links_final, {"link_hdp": self._lazy_loader(load_hdp)})
+        else:
+            links_final.link_hdp = load_hdp().link_hdp
+        return links_final if fields is None else links_final.only(fields)
+
+    def _resolve_basic(self, animeid: str, episode_num: int, lazy: bool = False, fields=None):
+        """resolve the links of an episode whose animeid was already validated, basic method.
+
+        Every link comes from the download page, fetched on first access if ``lazy``."""
+        url = f'{self.host}{animeid}-episode-{episode_num}'
+        response = self._get(url, "episode")
+        vidstream_link = self._parse("download_page_link", response)
+
+        def load():
+            response = self._get(vidstream_link, "download")
+            return self._parse("download_links", response)
+
+        if not lazy:
+            links = load()
+            return links if fields is None else links.only(fields)
+        loader = self._lazy_loader(load)
+        pending = MediaLinksObject.__slots__ if fields is None else fields
+        return LazyMediaLinksObject(pending={name: loader for name in pending})
+
+    @traced
+    def get_episode_links(self, animeid: str, episodes, workers: int = 4, mode: str = "advanced", fields=None):
+        """Get the links of many episodes of an anime at once.
+
+        The category page is fetched only once, then the episodes are resolved in
+        parallel by a pool of ``workers`` threads. The results are yielded as soon
+        as each episode is resolved, so they don't come back in order. An error on
+        an episode doesn't stop the others, it is yielded in place of its links.
+
+        Parameters:
+             animeid(``str``):
+                The animeid of the anime you want to download.
+
+             episodes(``iterable`` of ``int``):
+                The episode numbers to resolve, e.g. ``range(1, 13)``.
+
+             workers(``int``, *optional*):
+                The maximum number of episodes resolved at the same time. Defaults to 4.
+
+             mode(``str``, *optional*):
+                ``"advanced"`` to resolve like :meth:`get_episode_link_advanced` or
+                ``"basic"`` to resolve like :meth:`get_episode_link_basic`. Defaults to ``"advanced"``.
+
+             fields(``list``, *optional*):
+                Only get these links, see :meth:`get_episode_link_advanced`.
+
+        Yields:
+            ``(episode_num, result)`` tuples, where ``result`` is a
+            :obj:`-anikimiapi.data_classes.MediaLinksObject` on success, or the
+            ``InvalidAnimeIdError``, ``NetworkError`` or ``InvalidTokenError`` raised
+            for that episode.
+
+        Raises:
+            ``InvalidAnimeIdError``: If the animeid itself is invalid.
+            ``NetworkError``: If the category page could not be fetched.
+
+        Example:
+        .. code-block:: python
+            :emphasize-lines: 1,4-7,10-15
+
+            from anikimiapi import AniKimi
+
+            # Authorize the api to GogoAnime
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+
+            # Get the links of a whole season
+            for episode_num, links in anime.get_episode_links("clannad-dub", range(1, 24), workers=8):
+                if isinstance(links, Exception):
+                    print(episode_num, "failed:", links)
+                else:
+                    print(episode_num, links.link_hdp)
+        """
+        if mode not in ("advanced", "basic"):
+            raise ValueError(f"mode must be 'advanced' or 'basic', not {mode!r}")
+        if fields is not None:
+            fields = MediaLinksObject.fields(fields)
+        try:
+            animelink = f'{self.host}category/{animeid}'
+            response = self._get(animelink, "category")
+            self._parse("anime_title", response)
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid given")
+        except network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+
+        def resolve_one(episode_num):
+            try:
+                links = self._cached_links(animeid, episode_num, mode)
+                if links is not None:
+                    return episode_num, links if fields is None else links.only(fields)
+                return episode_num, self._resolve_links(animeid, episode_num, mode, fields=fields)
+            except AttributeError:
+                return episode_num, InvalidAnimeIdError(f"Invalid episode_num {episode_num} given")
+            except network_errors():
+                return episode_num, NetworkError("Unable to connect to the Server, Check your connection")
+            except NetworkError as error:
+                return episode_num, error
+            except TypeError:
+                return episode_num, InvalidTokenError("Invalid tokens passed, Check your tokens")
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = []
+        try:
+            futures.extend(submit_in_context(executor, resolve_one, episode_num) for episode_num in episodes)
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # stop the pending episodes when the caller stops iterating early
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @traced
+    @coalesced
+    def get_by_genres(self,genre_name, limit=60, workers=4) -> list :
 
         """Get anime by genres, The genre object has the following genres working,
 
@@ -407,6 +831,9 @@ class AniKimi:
             limit(``int``):
                 The limit for the number of anime you want from the results. defaults to 60 (i.e, 3 pages)
 
+            workers(``int``, *optional*):
+                The maximum number of pages fetched at the same time. Defaults to 4.
+
         Returns:
             List of :obj:`-anikimiapi.data_classes.ResultObject`: On Success, the list of genre results is returned.
 
@@ -428,77 +855,71 @@ class AniKimi:
                 print(result.title)
                 print(result.animeid)
         """
-        gen_ani = []
-
-        def page_anime_scraper(soup_object) -> list:
-            """a helper function to scrape anime results from page source"""
-            ani_results = []
-            animes = soup_object.find("ul", {"class": "items"}).find_all("li")
-            for anime in animes:
-                tits = anime.a["title"]
-                urll = anime.a["href"]
-                r = urll.split('/')
-                ani_results.append(ResultObject(title=f"{tits}", animeid=f"{r[2]}"))
-            return ani_results
-
-        def pagination_helper(current_page_source : str,url,limit:int) -> None:
-            """a recursive helper function which helps to successively scrape anime from following pages
-                 (if there are any) till limit is reached. """
-            soup = BeautifulSoup(current_page_source,"lxml")
-            next_page = soup.find("li",{"class": "selected"}).findNext('li')
-
-            
-            if (type(next_page) is not None):
-
-                try :
-
-                    [next_page_value] = [i.get('data-page') for i in next_page]
-                    next_page_url = f'{url}{next_page_value}'
-                    next_page_src = (requests.get(next_page_url,headers=self.user_agent)).text
-
-                    soup = BeautifulSoup(next_page_src,"lxml")
-
-                    #next/subsequent page results
-                    next_page_results = page_anime_scraper(soup)
-                    for anime in next_page_results:
-                        if (len(gen_ani) < limit):
-                            gen_ani.append(anime)
-                        else:
-                            pass
-                    if (len(gen_ani) == limit):
-                        pass
-                    else:
-                        pagination_helper(next_page_src,url,limit)
-
-                except AttributeError:
-                    pass
-
-            else:
-                pass
-            
         try:
             url = f"{self.host}genre/{genre_name}?page="
-            response =  requests.get(url,headers=self.user_agent)
-            plainText = response.text
-            soup = BeautifulSoup(plainText,"lxml")
-            
-            # starting page
-            starting_page_results = page_anime_scraper(soup)
-            for anime in starting_page_results :
-                if (len(gen_ani) < limit):
-                    gen_ani.append(anime)
-                else:
-                    pass
+            results = paginate(
+                lambda page: self._get(f'{url}{page}', "genre"),
+                lambda page: self._parse("listing", page),
+                limit=limit,
+                workers=workers,
+            )
+
+        except (AttributeError, KeyError):
+            raise InvalidGenreNameError("Invalid genre_name or page_num")
+        except network_errors():
+            raise NetworkError("Unable to connect to server")
+        if self.catalog is not None:
+            self.catalog.add_results(results)
+        return results
+
+    @traced
+    def iter_genre(self, genre_name: str, prefetch: bool = True):
+        """Like :meth:`get_by_genres`, but yields the results of every genre page, lazily and without limit.
+
+        A genre page is only fetched when the results of the previous one are
+        being consumed (with ``prefetch``, one page ahead in the background), so
+        the caller can stop at any time.
+
+        Parameters:
+            genre_name(``str``):
+                The name of the genre, see :meth:`get_by_genres` for the list of genres.
 
-            pagination_helper(current_page_source=plainText,url=url,limit=limit)
+            prefetch(``bool``, *optional*):
+                Fetch the next genre page while the current one is consumed. Defaults to ``True``.
 
-            return gen_ani
+        Yields:
+            :obj:`-anikimiapi.data_classes.ResultObject`: The genre results, in order.
 
-        except AttributeError or KeyError:
+        Example:
+        .. code-block:: python
+            :emphasize-lines: 1,4-7,10-12
+
+            from anikimiapi import AniKimi
+
+            # Authorize the api to GogoAnime
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+
+            for result in anime.iter_genre(genre_name="romance"):
+                print(result.title)
+                print(result.animeid)
+        """
+        url = f"{self.host}genre/{genre_name}?page="
+        try:
+            yield from iter_pages(
+                lambda page: self._get(f'{url}{page}', "genre"),
+                lambda page: self._parse("listing", page),
+                prefetch=prefetch,
+            )
+        except (AttributeError, KeyError):
             raise InvalidGenreNameError("Invalid genre_name or page_num")
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to server")
 
+    @traced
+    @coalesced
     def get_airing_anime(self, count=10) -> list:
         """Get the currently airing anime and their animeid.
 
@@ -531,20 +952,10 @@ class AniKimi:
                 raise CountError("count parameter cannot exceed 20")
             else:
                 url = f"{self.host}"
-                session = HTMLSession()
-                response = session.get(url,headers=self.user_agent)
-                response_html = response.text
-                soup = BeautifulSoup(response_html, 'html.parser')
-                anime = soup.find("nav", {"class": "menu_series cron"}).find("ul")
-                air = []
-                for link in anime.find_all('a'):
-                    airing_link = link.get('href')
-                    name = link.get('title')  # name of the anime
-                    link = airing_link.split('/')
-                    lnk_final = link[2]  # animeid of anime
-                    air.append(ResultObject(title=f"{name}", animeid=f"{lnk_final}"))
+                response = self._get(url, "home")
+                air = self._parse("airing", response)
                 return air[0:int(count)]
-        except IndexError or AttributeError or TypeError:
+        except (IndexError, AttributeError, TypeError):
             raise AiringIndexError("No content found on the given page number")
-        except requests.exceptions.ConnectionError:
+        except network_errors():
             raise NetworkError("Unable to connect to server")
@@ -0,0 +1,540 @@
+import asyncio
+import time
+from anikimiapi.cache import ResponseCache, conditional_headers, copy_parsed
+from anikimiapi.coalescing import coalesced
+from anikimiapi.data_classes import MediaInfoObject, MediaLinksObject
+from anikimiapi.error_handlers import (
+    AiringIndexError,
+    CountError,
+    InvalidAnimeIdError,
+    InvalidGenreNameError,
+    InvalidTokenError,
+    NetworkError,
+    NoSearchResultsError,
+)
+from anikimiapi.instrumentation import TEMPLATES, traced
+from anikimiapi.pagination import aiter_pages, apaginate
+from anikimiapi.parsers import get_parser
+from anikimiapi.transport import AsyncTransport, async_network_errors
+
+
+class AsyncAniKimi:
+    """The asyncio version of :obj:`-anikimiapi.AniKimi`, requires ``aiohttp``.
+
+    It has the same methods as ``AniKimi``, as coroutines, and shares the same
+    parser, so both clients return identical objects. Independent requests of a
+    method, like the category page and the episode page of the link resolvers,
+    are sent concurrently.
+
+    Parameters:
+        gogoanime_token (``str``):
+            To get this token, please refer to readme.md in the repository.
+        auth_token (``str``):
+            To get this token, please refer to readme.md in the repository.
+        host (``str`` | ``list`` | :obj:`-anikimiapi.hosts.HostPool`):
+            Change the base url, If gogoanime changes the domain, replace the url
+            with the new domain. Defaults to https://gogoanime.pe/ . With a list of
+            mirrors, each request goes to the fastest healthy one, see :attr:`hosts`.
+            A `HostPool` given here can be shared, closing the client leaves it open.
+        user_agent (``dict``):
+             user_agent header for requests to the host. no need to set/change this.
+        limit (``int``, *optional*):
+            The maximum number of simultaneous connections. Defaults to 100.
+        limit_per_host (``int``, *optional*):
+            The maximum number of simultaneous connections to one host. Defaults to 10.
+        timeout (``float`` | ``tuple``, *optional*):
+            The request timeout in seconds, or a ``(connect, read)`` tuple. Defaults to ``(10, 30)``.
+        transport (:obj:`-anikimiapi.transport.AsyncTransport`, *optional*):
+            A custom transport to send the requests through. If given, ``limit``,
+            ``limit_per_host``, ``timeout``, ``scheduler``, ``retry``, ``hedge``
+            and ``breaker`` are ignored.
+        cache (:obj:`-anikimiapi.cache.ResponseCache`, *optional*):
+            A cache for the fetched pages. Nothing is cached by default.
+        parser (``str`` | :obj:`-anikimiapi.parsers.BaseParser`, *optional*):
+            The parser backend, ``"soup"`` (the default) or ``"lxml"`` which is faster,
+            or a parser instance.
+        catalog (:obj:`-anikimiapi.catalog.CatalogIndex`, *optional*):
+            A local index of the results, see :obj:`-anikimiapi.AniKimi`.
+        scheduler (:obj:`-anikimiapi.scheduler.Scheduler`, *optional*):
+            Limits the rate and the concurrency of the requests sent to each host,
+            adapting them when the host throttles. Unlimited by default.
+        timeouts (``dict``, *optional*):
+            The timeout of the requests of some routes, overriding ``timeout``, for example
+            ``{"embed": 5}``. The routes are the ones of :obj:`-anikimiapi.cache.ResponseCache`.
+        retry (:obj:`-anikimiapi.resilience.RetryPolicy`, *optional*):
+            Retries the requests which fail or get a transient error. No retries by default.
+        hedge (:obj:`-anikimiapi.resilience.HedgePolicy`, *optional*):
+            Sends a duplicate of the requests slower than most, using the first response.
+        breaker (:obj:`-anikimiapi.resilience.CircuitBreaker`, *optional*):
+            Fails fast, with :obj:`-anikimiapi.error_handlers.CircuitOpenError`, the requests
+            to a host which keeps failing.
+        instrumentation (:obj:`-anikimiapi.instrumentation.Instrumentation`, *optional*):
+            Reports the timed spans of every call, fetch and parse to its hooks.
+        link_cache (:obj:`-anikimiapi.link_cache.LinkCache`, *optional*):
+            A cache of the resolved episode links, see :obj:`-anikimiapi.AniKimi`. Its
+            refreshes run as tasks of the event loop.
+        single_flight (:obj:`-anikimiapi.coalescing.SingleFlight`, *optional*):
+            Coalesces the concurrent identical fetches and calls, see :obj:`-anikimiapi.AniKimi`.
+
+    Example:
+        .. code-block:: python
+
+            import asyncio
+            from anikimiapi import AsyncAniKimi
+
+            async def main():
+                async with AsyncAniKimi(
+                    gogoanime_token="baikdk32hk1nrek3hw9",
+                    auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+                ) as anime:
+                    details, links = await asyncio.gather(
+                        anime.get_details(animeid="clannad-dub"),
+                        anime.get_episode_link_advanced(animeid="clannad-dub", episode_num=3),
+                    )
+                    print(details.title, links.link_hdp)
+
+            asyncio.run(main())
+    """
+    def __init__(
+            self,
+            gogoanime_token: str,
+            auth_token: str,
+            host: str = "https://gogoanime.pe/",
+            user_agent: dict = {'User-Agent': 'Mozilla/5.0'},
+            limit: int = 100,
+            limit_per_host: int = 10,
+            timeout=(10, 30),
+            transport: AsyncTransport = None,
+            cache: ResponseCache = None,
+            parser=None,
+            catalog=None,
+            scheduler=None,
+            timeouts: dict = None,
+            retry=None,
+            hedge=None,
+            breaker=None,
+            instrumentation=None,
+            link_cache=None,
+            single_flight=None,
+    ):
+        self.gogoanime_token = gogoanime_token
+        self.auth_token = auth_token
+        if isinstance(host, str):
+            self.hosts = None
+            self.host = host
+        else:
+            from anikimiapi.hosts import HostPool
+
+            # a pool given by the caller may be shared, only the one created here is closed
+            self._own_hosts = not isinstance(host, HostPool)
+            self.hosts = HostPool(host, headers=user_agent) if self._own_hosts else host
+            self.host = self.hosts.hosts[0]
+        self.user_agent = user_agent
+        if transport is None:
+            transport = AsyncTransport(
+                headers=user_agent,
+                limit=limit,
+                limit_per_host=limit_per_host,
+                timeout=timeout,
+                scheduler=scheduler,
+                retry=retry,
+                hedge=hedge,
+                breaker=breaker,
+            )
+        self.transport = transport
+        self.parser = get_parser(parser)
+        self.cache = cache
+        self.timeouts = timeouts or {}
+        self.catalog = catalog
+        self.instrumentation = instrumentation
+        self.link_cache = link_cache
+        self.single_flight = single_flight
+        self._link_refreshes = set()
+
+    def __str__(self) -> str:
+        return "Anikimi API - Copyrights (c) 2020-2021 BaraniARR."
+
+    async def close(self) -> None:
+        """Close the pooled connections of the client."""
+        if self.hosts is not None and self._own_hosts:
+            self.hosts.close()
+        for task in self._link_refreshes:
+            task.cancel()
+        await self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _send(self, url: str, cookies: dict = None, timeout=None, headers: dict = None):
+        """send a request through the mirrors, if any, and the transport."""
+        if self.hosts is not None and url.startswith(self.host):
+            return await self.hosts.get_async(
+                self.transport, url[len(self.host):], cookies=cookies, headers=headers, timeout=timeout,
+            )
+        return await self.transport.get(url, cookies=cookies, headers=headers, timeout=timeout)
+
+    async def _fetch(self, url: str, route: str, cookies: dict, timeout):
+        """the page of ``url`` from the cache or the transport, and the response if it
+        was requested."""
+        fetched = None
+        if self.cache is None or cookies:
+            page = fetched = await self._send(url, cookies=cookies, timeout=timeout)
+        else:
+            page = self.cache.get(url)
+            if page is None:
+                stale = self.cache.stale(url)
+                headers = conditional_headers(stale) if stale is not None else None
+                page = fetched = await self._send(url, timeout=timeout, headers=headers)
+                if page.status == 304 and stale is not None:
+                    self.cache.renew(route, url, stale)
+                    page = stale
+                elif page.status == 200:
+                    page.parsed = {}
+                    self.cache.put(route, url, page)
+        if page.parsed is None and self.single_flight is not None:
+            page.parsed = {}  # the callers sharing the page share its parsing
+        return page, fetched
+
+    async def _get(self, url: str, route: str, cookies: dict = None, timeout=None):
+        """fetch a page through the single flight, if any, the cache, if any, and the
+        transport, a server error raises ``NetworkError``. ``timeout`` overrides the
+        one of the route."""
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            started = time.perf_counter()
+        if timeout is None:
+            timeout = self.timeouts.get(route)
+        shared = False  # whether the page was fetched for another caller
+        try:
+            if self.single_flight is None:
+                page, fetched = await self._fetch(url, route, cookies, timeout)
+            else:
+                (page, fetched), shared = await self.single_flight.acall(
+                    ("fetch", url, bool(cookies)), lambda: self._fetch(url, route, cookies, timeout),
+                )
+        except Exception as error:
+            if instrumentation is not None:
+                instrumentation.emit(
+                    "fetch", started, time.perf_counter() - started,
+                    route=route, template=TEMPLATES[route], url=url, error=type(error).__name__,
+                )
+            raise
+        if instrumentation is not None:
+            instrumentation.emit(
+                "fetch", started, time.perf_counter() - started, route=route, template=TEMPLATES[route],
+                url=url, status=page.status, bytes=len(page.text), cached=fetched is None,
+                not_modified=fetched is not None and fetched.status == 304, coalesced=shared,
+                wire_bytes=fetched.wire_bytes if fetched is not None and not shared else 0,
+                decoded_bytes=fetched.decoded_bytes if fetched is not None and not shared else 0,
+            )
+        if page.status >= 500:
+            raise NetworkError(f"The server answered {page.status}, try again later")
+        return page
+
+    def _parse(self, phase: str, page, parse=None):
+        """run the parser method ``phase`` on ``page``, timed if instrumented, reusing
+        the result already parsed from a cached page. ``parse`` runs in place of the
+        parser method, taking the page source, like the workers of a pipeline."""
+        parsed = page.parsed
+        if parsed is not None and phase in parsed:
+            return copy_parsed(parsed[phase])
+        if parse is None:
+            parse = getattr(self.parser, phase)
+        if self.instrumentation is None:
+            result = parse(page.text)
+        else:
+            result = self.instrumentation.parse(parse, phase, page.text)
+        if parsed is None:
+            return result
+        parsed[phase] = result
+        return copy_parsed(result)
+
+    @traced
+    @coalesced
+    async def search_anime(self, query: str, use_catalog: bool = True) -> list:
+        """Search anime, see :meth:`-anikimiapi.AniKimi.search_anime`."""
+        if self.catalog is not None and use_catalog:
+            res_list_search = self.catalog.search(query)
+            if res_list_search:
+                return res_list_search
+        try:
+            url1 = f"{self.host}/search.html?keyword={query}"
+            response = await self._get(url1, "search")
+            res_list_search = self._parse("search_results", response)
+            if not res_list_search:
+                raise NoSearchResultsError("No Search Results found for the query")
+            else:
+                if self.catalog is not None:
+                    self.catalog.add_results(res_list_search)
+                return res_list_search
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+
+    @traced
+    async def iter_search(self, query: str, prefetch: bool = True):
+        """Yield the results of every results page, see :meth:`-anikimiapi.AniKimi.iter_search`."""
+        url = f"{self.host}/search.html?keyword={query}&page="
+
+        async def fetch_page(page):
+            return await self._get(f'{url}{page}', "search")
+
+        results = aiter_pages(
+            fetch_page,
+            lambda page: self._parse("listing", page),
+            prefetch=prefetch,
+        )
+        try:
+            try:
+                first = await results.__anext__()
+            except StopAsyncIteration:
+                raise NoSearchResultsError("No Search Results found for the query")
+            yield first
+            async for result in results:
+                yield result
+        except AttributeError:
+            raise NoSearchResultsError("No Search Results found for the query")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+
+    @traced
+    @coalesced
+    async def get_details(self, animeid: str) -> MediaInfoObject:
+        """Get the details of an anime, see :meth:`-anikimiapi.AniKimi.get_details`."""
+        try:
+            animelink = f'{self.host}category/{animeid}'
+            response = await self._get(animelink, "category")
+            details = self._parse("details", response)
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid given")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+        if self.catalog is not None:
+            self.catalog.add_details(animeid, details)
+        return details
+
+    @traced
+    @coalesced
+    async def get_episode_link_advanced(self, animeid: str, episode_num: int, fields=None) -> MediaLinksObject:
+        """Get the links of an episode, see :meth:`-anikimiapi.AniKimi.get_episode_link_advanced`.
+
+        The category page and the episode page are fetched concurrently. There is no
+        ``lazy`` mode, since an attribute access can't await a request.
+        """
+        if fields is not None:
+            fields = MediaLinksObject.fields(fields)
+        links = self._cached_links(animeid, episode_num, "advanced")
+        if links is not None:
+            return links if fields is None else links.only(fields)
+        try:
+            return await self._resolve_links(animeid, episode_num, "advanced", fields)
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid or episode_num given")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+        except TypeError:
+            raise InvalidTokenError("Invalid tokens passed, Check your tokens")
+
+    @traced
+    @coalesced
+    async def get_episode_link_basic(self, animeid: str, episode_num: int, fields=None) -> MediaLinksObject:
+        """Get the links of an episode, see :meth:`-anikimiapi.AniKimi.get_episode_link_basic`.
+
+        The category page and the episode page are fetched concurrently. There is no
+        ``lazy`` mode, since an attribute access can't await a request.
+        """
+        if fields is not None:
+            fields = MediaLinksObject.fields(fields)
+        links = self._cached_links(animeid, episode_num, "basic")
+        if links is not None:
+            return links if fields is None else links.only(fields)
+        try:
+            return await self._resolve_links(animeid, episode_num, "basic", fields)
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid or episode_num given")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+        except TypeError:
+            raise InvalidTokenError("Invalid tokens passed, Check your tokens")
+
+    @traced
+    async def iter_mirror_links(self, animeid: str, episode_num: int, timeout: float = 15, extractors: dict = None):
+        """Extract a direct media url from every streaming mirror of an episode at once,
+        see :meth:`-anikimiapi.AniKimi.iter_mirror_links`.
+
+        The embed pages are fetched concurrently, an async generator yields each
+        :obj:`-anikimiapi.mirrors.MirrorLink` as soon as its mirror is done.
+        """
+        from anikimiapi.mirrors import MirrorLink, get_extractor
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        cookies = {
+            'gogoanime': self.gogoanime_token,
+            'auth': self.auth_token
+        }
+        try:
+            response = await self._get(f'{self.host}{animeid}-episode-{episode_num}', "episode", cookies=cookies)
+            mirrors = [
+                (name, embed_url, get_extractor(name, extractors))
+                for name, embed_url in self._parse("mirrors", response)
+            ]
+        except AttributeError:
+            raise InvalidAnimeIdError("Invalid animeid or episode_num given")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to the Server, Check your connection")
+
+        async def resolve_one(name, embed_url, extract):
+            started = time.perf_counter()
+            try:
+                page = await self._get(embed_url, "embed", timeout=max(0.001, deadline - loop.time()))
+                url = extract(page.text, embed_url)
+                error = None if url else LookupError("No media url found in the embed page")
+            except async_network_errors():
+                url, error = None, NetworkError("Unable to connect to the mirror")
+            except Exception as exc:
+                url, error = None, exc
+            return MirrorLink(name, embed_url, url or None, error, time.perf_counter() - started)
+
+        tasks = {
+            asyncio.ensure_future(resolve_one(*mirror)): mirror for mirror in mirrors if mirror[2] is not None
+        }
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    break
+                for task in done:
+                    yield task.result()
+            for task in pending:
+                name, embed_url, _ = tasks[task]
+                yield MirrorLink(
+                    name, embed_url, error=TimeoutError("The mirror did not answer before the deadline"),
+                    elapsed=timeout,
+                )
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _cached_links(self, animeid: str, episode_num: int, mode: str):
+        """the cached links of an episode, if any, refreshed in a task when due."""
+        if self.link_cache is None:
+            return None
+        key = (animeid, episode_num, mode)
+        links = self.link_cache.get(key)
+        if links is not None and self.link_cache.claim_refresh(key):
+            task = asyncio.ensure_future(self._refresh_links(key))
+            self._link_refreshes.add(task)
+            task.add_done_callback(self._link_refreshes.discard)
+        return links
+
+    async def _refresh_links(self, key: tuple) -> None:
+        try:
+            await self._resolve_links(*key)
+            self.link_cache.refreshes += 1
+        except Exception:  # the current links stay until they expire
+            pass
+        finally:
+            self.link_cache.release_refresh(key)
+
+    async def _resolve_links(self, animeid: str, episode_num: int, mode: str, fields=None) -> MediaLinksObject:
+        """resolve the links of an episode, and cache them if they are complete."""
+        resolve = self._resolve_advanced if mode == "advanced" else self._resolve_basic
+        links = await resolve(animeid, episode_num, fields)
+        if self.link_cache is not None and fields is None:
+            self.link_cache.put((animeid, episode_num, mode), links)
+        return links
+
+    async def _resolve_advanced(self, animeid: str, episode_num: int, fields=None) -> MediaLinksObject:
+        cookies = {
+            'gogoanime': self.gogoanime_token,
+            'auth': self.auth_token
+        }
+        category, episode = await asyncio.gather(
+            self._get(f'{self.host}category/{animeid}', "category"),
+            self._get(f'{self.host}{animeid}-episode-{episode_num}', "episode", cookies=cookies),
+        )
+        self._parse("anime_title", category)
+        links_final, chumma_list = self._parse("episode_links", episode)
+        if fields is None or "link_hdp" in fields:
+            res = await self._get(chumma_list[0], "embed")
+            links_final.link_hdp = self._parse("embed_hdp_link", res)
+        return links_final if fields is None else links_final.only(fields)
+
+    async def _resolve_basic(self, animeid: str, episode_num: int, fields=None) -> MediaLinksObject:
+        category, episode = await asyncio.gather(
+            self._get(f'{self.host}category/{animeid}', "category"),
+            self._get(f'{self.host}{animeid}-episode-{episode_num}', "episode"),
+        )
+        self._parse("anime_title", category)
+        vidstream_link = self._parse("download_page_link", episode)
+        response = await self._get(vidstream_link, "download")
+        links = self._parse("download_links", response)
+        return links if fields is None else links.only(fields)
+
+    @traced
+    @coalesced
+    async def get_by_genres(self, genre_name, limit=60, workers=4) -> list:
+        """Get anime by genres, see :meth:`-anikimiapi.AniKimi.get_by_genres`.
+
+        Up to ``workers`` pages are fetched concurrently.
+        """
+        try:
+            url = f"{self.host}genre/{genre_name}?page="
+
+            async def fetch_page(page):
+                return await self._get(f'{url}{page}', "genre")
+
+            results = await apaginate(
+                fetch_page,
+                lambda page: self._parse("listing", page),
+                limit=limit,
+                workers=workers,
+            )
+        except (AttributeError, KeyError):
+            raise InvalidGenreNameError("Invalid genre_name or page_num")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to server")
+        if self.catalog is not None:
+            self.catalog.add_results(results)
+        return results
+
+    @traced
+    async def iter_genre(self, genre_name: str, prefetch: bool = True):
+        """Yield the results of every genre page, see :meth:`-anikimiapi.AniKimi.iter_genre`."""
+        url = f"{self.host}genre/{genre_name}?page="
+
+        async def fetch_page(page):
+            return await self._get(f'{url}{page}', "genre")
+
+        def parse_page(page):
+            return self._parse("listing", page)
+
+        try:
+            async for result in aiter_pages(fetch_page, parse_page, prefetch=prefetch):
+                yield result
+        except (AttributeError, KeyError):
+            raise InvalidGenreNameError("Invalid genre_name or page_num")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to server")
+
+    @traced
+    @coalesced
+    async def get_airing_anime(self, count=10) -> list:
+        """Get the currently airing anime, see :meth:`-anikimiapi.AniKimi.get_airing_anime`."""
+        try:
+            if int(count) >= 20:
+                raise CountError("count parameter cannot exceed 20")
+            else:
+                response = await self._get(f"{self.host}", "home")
+                air = self._parse("airing", response)
+                return air[0:int(count)]
+        except (IndexError, AttributeError, TypeError):
+            raise AiringIndexError("No content found on the given page number")
+        except async_network_errors():
+            raise NetworkError("Unable to connect to server")
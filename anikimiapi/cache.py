@@ -0,0 +1,195 @@
+from collections import OrderedDict
+import threading
+import time
+from anikimiapi.data_classes import MediaLinksObject
+
+
+def conditional_headers(page) -> dict:
+    """The headers of a conditional request for ``page``, empty if it has no validator."""
+    headers = {}
+    etag = page.header("ETag")
+    if etag:
+        headers["If-None-Match"] = etag
+    last_modified = page.header("Last-Modified")
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+
+def copy_parsed(value):
+    """A copy of a result parsed from a cached page, to hand it out again without
+    sharing its mutable parts: the lists and the ``MediaLinksObject``."""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, tuple):
+        return tuple(copy_parsed(item) for item in value)
+    if isinstance(value, MediaLinksObject):
+        return MediaLinksObject(*value.astuple())
+    return value
+
+
+class ResponseCache:
+    """An in-memory LRU cache of fetched pages, keyed by url.
+
+    Every page fetched by the client belongs to a route, which sets how long the
+    page stays fresh. The routes are ``"search"``, ``"category"``, ``"genre"``,
+    ``"home"`` (the front page, behind ``get_airing_anime``), ``"episode"``,
+    ``"embed"`` and ``"download"``. A route with a ttl of ``0`` is never cached,
+    and pages requested with the auth cookies are never cached whatever their
+    route is.
+
+    With ``revalidate``, an expired page with an ``ETag`` or a ``Last-Modified``
+    header is kept, and the client asks the server whether it changed with a
+    conditional request: on a ``304 Not Modified`` the page, and the results
+    already parsed from it, are reused for another ttl.
+
+    When the cache holds more than ``max_entries`` pages or more than
+    ``max_bytes`` bytes of page sources, encoded in UTF-8, the least recently
+    used pages are evicted. The cache is thread-safe.
+
+    Parameters:
+        max_entries (``int``, *optional*):
+            The maximum number of cached pages. Defaults to 1024.
+        max_bytes (``int``, *optional*):
+            The maximum total size of the cached page sources in UTF-8, in bytes.
+            Unlimited by default.
+        ttls (``dict``, *optional*):
+            The time to live in seconds of each route, merged over :attr:`DEFAULT_TTLS`.
+        default_ttl (``float``, *optional*):
+            The time to live of a route missing from ``ttls``. Defaults to 0.
+        revalidate (``bool``, *optional*):
+            Keep the expired pages which can be revalidated with a conditional request.
+            Defaults to ``True``.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.cache import ResponseCache
+
+            cache = ResponseCache(max_entries=5000, ttls={"category": 600, "home": 5})
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                cache=cache
+            )
+            anime.get_details(animeid="clannad-dub")
+            print(cache.stats())
+    """
+    DEFAULT_TTLS = {
+        "search": 60,
+        "category": 300,
+        "genre": 300,
+        "home": 10,
+        "episode": 0,
+        "embed": 0,
+        "download": 0,
+    }
+
+    def __init__(
+            self,
+            max_entries: int = 1024,
+            max_bytes: int = None,
+            ttls: dict = None,
+            default_ttl: float = 0,
+            revalidate: bool = True,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.revalidate = revalidate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+        self._size = 0
+        self._entries = OrderedDict()  # url -> (expires_at, size, page)
+        self._lock = threading.Lock()
+
+    def ttl(self, route: str) -> float:
+        """Get the time to live of a route, in seconds."""
+        return self.ttls.get(route, self.default_ttl)
+
+    def get(self, url: str):
+        """Get a fresh cached page, ``None`` on a miss."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, page = entry
+            if expires_at <= time.monotonic():
+                if not (self.revalidate and conditional_headers(page)):
+                    del self._entries[url]
+                    self._size -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return page
+
+    def stale(self, url: str):
+        """Get the expired page of ``url`` kept for revalidation, ``None`` if there is none."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry[0] > time.monotonic():
+                return None
+            return entry[2]
+
+    def renew(self, route: str, url: str, page) -> None:
+        """Keep ``page``, the stale page of ``url``, for another ttl: the server
+        answered ``304 Not Modified`` for it."""
+        with self._lock:
+            self.revalidations += 1
+        self.put(route, url, page)
+
+    def put(self, route: str, url: str, page) -> None:
+        """Cache a page, if its route is cacheable."""
+        ttl = self.ttl(route)
+        if ttl <= 0:
+            return
+        text = page.text
+        # the ASCII pages, most of them, are sized without being encoded
+        size = len(text) if text.isascii() else len(text.encode("utf-8"))
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[url] = (time.monotonic() + ttl, size, page)
+            self._size += size
+            while self._entries and (
+                    len(self._entries) > self.max_entries
+                    or (self.max_bytes is not None and self._size > self.max_bytes)
+            ):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached page, the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        """Get the cache counters, to size the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "revalidations": self.revalidations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,208 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from anikimiapi.data_classes import MediaInfoObject, ResultObject
+
+
+class CatalogIndex:
+    """A local index of the anime already seen, searchable offline with SQLite FTS5.
+
+    The index is filled with the results of ``search_anime``, ``get_by_genres`` and
+    ``get_details`` when it is passed to a client, and ``search_anime`` answers from
+    it, only falling back to the network when nothing matches. Every entry records
+    when it was last refreshed, so stale entries can be reported and refreshed
+    incrementally with :meth:`refresh`.
+
+    The index is thread-safe, and persistent when ``path`` is a file.
+
+    Parameters:
+        path (``str``, *optional*):
+            The SQLite database file. Defaults to ``":memory:"``, an index which
+            lives as long as the object.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.catalog import CatalogIndex
+
+            catalog = CatalogIndex("catalog.db")
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                catalog=catalog
+            )
+            anime.get_by_genres(genre_name="romance", limit=600)  # fills the index
+            anime.search_anime(query="clannad")  # answered locally
+
+            # refresh the details older than a day, 50 at a time
+            catalog.refresh(anime, max_age=86400, limit=50)
+    """
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS anime (
+                    animeid TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    other_names TEXT NOT NULL DEFAULT '',
+                    details TEXT,
+                    seen_at REAL NOT NULL,
+                    details_at REAL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS anime_fts USING fts5(
+                    title, other_names, animeid UNINDEXED,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                );
+                """
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM anime").fetchone()[0]
+
+    def _upsert(self, animeid: str, title: str, other_names: str = None, details: str = None) -> None:
+        """insert or update an entry and its full-text row, the lock must be held."""
+        now = time.time()
+        row = self._db.execute("SELECT rowid, other_names FROM anime WHERE animeid = ?", (animeid,)).fetchone()
+        if row is None:
+            self._db.execute(
+                "INSERT INTO anime (animeid, title, other_names, details, seen_at, details_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (animeid, title, other_names or "", details, now, now if details else None),
+            )
+            rowid = self._db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        else:
+            rowid = row[0]
+            if other_names is None:
+                other_names = row[1]
+            if details is None:
+                self._db.execute(
+                    "UPDATE anime SET title = ?, seen_at = ? WHERE rowid = ?",
+                    (title, now, rowid),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE anime SET title = ?, other_names = ?, details = ?, seen_at = ?, details_at = ? "
+                    "WHERE rowid = ?",
+                    (title, other_names, details, now, now, rowid),
+                )
+            self._db.execute("DELETE FROM anime_fts WHERE rowid = ?", (rowid,))
+        self._db.execute(
+            "INSERT INTO anime_fts (rowid, title, other_names, animeid) VALUES (?, ?, ?, ?)",
+            (rowid, title, other_names or "", animeid),
+        )
+
+    def add_results(self, results) -> None:
+        """Add or refresh ``ResultObject`` entries."""
+        with self._lock, self._db:
+            for result in results:
+                self._upsert(result.animeid, result.title)
+
+    def add_details(self, animeid: str, details: MediaInfoObject) -> None:
+        """Add or refresh the ``MediaInfoObject`` of an anime, its other names get indexed too."""
+        with self._lock, self._db:
+            self._upsert(
+                animeid,
+                details.title,
+                other_names=details.other_names,
+                details=json.dumps(details.to_dict(), ensure_ascii=False),
+            )
+
+    @staticmethod
+    def _match_query(query: str):
+        """the FTS5 query matching every word of ``query`` as a prefix, ``None`` if it has no word."""
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return None
+        return " ".join(f'"{word}"*' for word in words)
+
+    def search(self, query: str, limit: int = 20, with_age: bool = False) -> list:
+        """Search the index, every word of the query must match a word prefix of the
+        title or of the other names. The best matches come first.
+
+        Parameters:
+            query(``str``):
+                The query String.
+            limit(``int``, *optional*):
+                The maximum number of results. Defaults to 20.
+            with_age(``bool``, *optional*):
+                Return ``(ResultObject, age)`` tuples, ``age`` being the seconds since
+                the entry was last refreshed. Defaults to ``False``.
+
+        Returns:
+            List of :obj:`-anikimiapi.data_classes.ResultObject`, empty when nothing matches.
+        """
+        match = self._match_query(query)
+        if match is None:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT anime.animeid, anime.title, anime.seen_at FROM anime_fts "
+                "JOIN anime ON anime.rowid = anime_fts.rowid "
+                "WHERE anime_fts MATCH ? ORDER BY bm25(anime_fts, 10.0, 1.0) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        if with_age:
+            now = time.time()
+            return [(ResultObject(title=title, animeid=animeid), now - seen_at) for animeid, title, seen_at in rows]
+        return [ResultObject(title=title, animeid=animeid) for animeid, title, _ in rows]
+
+    def get_details(self, animeid: str, max_age: float = None):
+        """Get the indexed ``MediaInfoObject`` of an anime, ``None`` if it was never
+        fetched or, with ``max_age``, if it is older than ``max_age`` seconds."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT details, details_at FROM anime WHERE animeid = ?", (animeid,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        if max_age is not None and time.time() - row[1] > max_age:
+            return None
+        return MediaInfoObject.from_dict(json.loads(row[0]))
+
+    def staleness(self, animeid: str):
+        """The seconds since an entry was last refreshed, ``None`` if it isn't indexed."""
+        with self._lock:
+            row = self._db.execute("SELECT seen_at FROM anime WHERE animeid = ?", (animeid,)).fetchone()
+        return None if row is None else time.time() - row[0]
+
+    def stale(self, max_age: float, limit: int = None) -> list:
+        """The animeids whose details are missing or older than ``max_age`` seconds, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT animeid FROM anime WHERE details_at IS NULL OR details_at < ? "
+                "ORDER BY coalesce(details_at, 0), seen_at LIMIT ?",
+                (time.time() - max_age, -1 if limit is None else limit),
+            ).fetchall()
+        return [animeid for animeid, in rows]
+
+    def refresh(self, client, max_age: float, limit: int = None) -> int:
+        """Refresh the stale details through ``client.get_details``, see :meth:`stale`.
+
+        The entries which fail to refresh are left as they are.
+
+        Returns:
+            ``int``: The number of entries refreshed.
+        """
+        from anikimiapi.error_handlers import InvalidAnimeIdError, NetworkError
+
+        refreshed = 0
+        for animeid in self.stale(max_age, limit):
+            try:
+                details = client.get_details(animeid)
+            except (InvalidAnimeIdError, NetworkError):
+                continue
+            if getattr(client, "catalog", None) is not self:
+                self.add_details(animeid, details)
+            refreshed += 1
+        return refreshed
@@ -0,0 +1,189 @@
+import functools
+import threading
+from anikimiapi.cache import copy_parsed
+from anikimiapi.instrumentation import _COROUTINE
+
+
+class _Flight:
+    """a call in flight, and its outcome once it is done."""
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """De-duplicates the identical fetches and calls in flight at the same time.
+
+    When a caller asks for something already being fetched or computed by another
+    caller, it waits for the outstanding one and shares its outcome, result or
+    error, instead of starting its own. Given to a client as ``single_flight``, it
+    coalesces the concurrent fetches of a same url, and the concurrent calls of a
+    same public method with the same arguments, like many users opening the same
+    episode at once. The results are copied for each caller, so they can be
+    modified safely, and a shared page shares its parsed results too.
+
+    A ``SingleFlight`` is thread-safe, an :obj:`-anikimiapi.AsyncAniKimi` one only
+    coalesces the callers of its event loop.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.coalescing import SingleFlight
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                single_flight=SingleFlight()
+            )
+            # from many threads at once, a single category page is fetched
+            details = anime.get_details(animeid="clannad-dub")
+            print(anime.single_flight.stats())
+    """
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = {}  # kind -> count
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def call(self, key: tuple, function, copy=None):
+        """Run ``function`` unless a call of ``key`` is in flight, then wait for it.
+
+        Parameters:
+            key (``tuple``):
+                What is computed, its first item being the kind counted by :meth:`stats`.
+            function (``callable``):
+                Takes no argument and computes the result.
+            copy (``callable``, *optional*):
+                Copies the result for each caller, so they don't share it.
+
+        Returns:
+            A ``(result, shared)`` tuple, ``shared`` being ``True`` for the callers
+            which waited for another one. The error of the call is raised to all of them.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.executed += 1
+            else:
+                self.coalesced[key[0]] = self.coalesced.get(key[0], 0) + 1
+        if leader:
+            try:
+                flight.result = function()
+                # the callers get copies, so none of them sees the changes of another
+                return (flight.result if copy is None else copy(flight.result)), False
+            except BaseException as error:
+                flight.error = error
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return (flight.result if copy is None else copy(flight.result)), True
+
+    async def acall(self, key: tuple, function, copy=None):
+        """The asyncio version of :meth:`call`, ``function`` is a coroutine function.
+
+        The call runs in a task of its own, so it goes on for the other callers
+        when the one which started it is cancelled.
+        """
+        import asyncio
+
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(function())
+            with self._lock:
+                self.executed += 1
+
+            def landed(task):
+                if self._tasks.get(key) is task:
+                    del self._tasks[key]
+                if not task.cancelled():
+                    task.exception()  # retrieved, even when every caller was cancelled
+
+            task.add_done_callback(landed)
+        else:
+            with self._lock:
+                self.coalesced[key[0]] = self.coalesced.get(key[0], 0) + 1
+        result = await asyncio.shield(task)
+        return (result if copy is None else copy(result)), not leader
+
+    def stats(self) -> dict:
+        """The calls in flight, the calls run, and the callers coalesced in total and by
+        kind: ``"fetch"`` for the pages, the method name for the calls."""
+        with self._lock:
+            return {
+                "in_flight": len(self._flights) + len(self._tasks),
+                "executed": self.executed,
+                "coalesced": sum(self.coalesced.values()),
+                "coalesced_by_kind": dict(self.coalesced),
+            }
+
+
+def _freeze(value):
+    """a hashable form of an argument."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def coalesced(method):
+    """Decorate a public client method, so concurrent calls with the same arguments
+    share one call when the client has a ``single_flight``.
+
+    The arguments are matched whether they are given by position or by name,
+    defaults included. Calls with ``lazy=True`` are never shared, since their
+    result fetches more on access.
+    """
+    name = method.__name__
+    code = method.__code__
+    names = code.co_varnames[1:code.co_argcount]
+    defaults = dict(zip(names[len(names) - len(method.__defaults__ or ()):], method.__defaults__ or ()))
+
+    def key_of(args, kwargs):
+        bound = dict(defaults)
+        bound.update(zip(names, args))
+        bound.update(kwargs)
+        if bound.get("lazy") or len(args) > len(names):
+            return None
+        try:
+            key = (name, tuple(sorted((arg, _freeze(value)) for arg, value in bound.items())))
+            hash(key)
+        except TypeError:  # an argument which can't be compared, never shared
+            return None
+        return key
+
+    if code.co_flags & _COROUTINE:
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            single_flight = self.single_flight
+            key = None if single_flight is None else key_of(args, kwargs)
+            if key is None:
+                return await method(self, *args, **kwargs)
+            result, _ = await single_flight.acall(key, lambda: method(self, *args, **kwargs), copy_parsed)
+            return result
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            single_flight = self.single_flight
+            key = None if single_flight is None else key_of(args, kwargs)
+            if key is None:
+                return method(self, *args, **kwargs)
+            result, _ = single_flight.call(key, lambda: method(self, *args, **kwargs), copy_parsed)
+            return result
+
+    return wrapper
@@ -0,0 +1,292 @@
+"""Crawl the catalog: the details of every anime of the genres, as JSON lines.
+
+The crawl lists the anime of each genre, de-duplicates the animeids found in
+several genres, then gets the details of each anime with a bounded number of
+concurrent requests, writing every record to the output as soon as it is
+fetched, one JSON object per line: the ``animeid`` and the fields of its
+:obj:`-anikimiapi.data_classes.MediaInfoObject`, which
+:func:`-anikimiapi.serialization.iter_jsonl` reads back.
+
+The progress is checkpointed: the genres listed and the animeids found are
+saved next to the output, and the animeids already in the output are not
+fetched again, so an interrupted crawl resumes where it stopped when it is run
+again. A finished crawl removes its checkpoint: running it again lists the
+genres again and only fetches the anime which are not in the output yet, use
+``--restart`` to start over.
+
+    python -m anikimiapi.crawl --output catalog.jsonl
+    python -m anikimiapi.crawl --output catalog.jsonl --genres action romance --workers 16
+    python -m anikimiapi.crawl --output catalog.jsonl --processes 4 --host https://gogoanime.pe/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from anikimiapi.error_handlers import InvalidAnimeIdError, InvalidGenreNameError, NetworkError
+
+# the genres listed by get_by_genres, less the unavailable ones
+GENRES = (
+    "action", "adventure", "cars", "comedy", "dementia", "demons", "drama", "dub", "ecchi", "fantasy",
+    "game", "harem", "historical", "horror", "josei", "kids", "magic", "martial-arts", "mecha",
+    "military", "music", "mystery", "parody", "police", "psychological", "romance", "samurai", "school",
+    "sci-fi", "seinen", "shoujo", "shoujo-ai", "shounen-ai", "shounen", "slice-of-life", "space",
+    "sports", "super-power", "supernatural", "thriller", "vampire", "yaoi", "yuri",
+)
+
+# raised parsing a page which is not laid out as expected, the anime is failed
+_PARSE_ERRORS = (IndexError, KeyError, TypeError, ValueError)
+
+
+class Crawler:
+    """Crawls the details of the anime of some genres into a JSON lines file, see
+    :mod:`anikimiapi.crawl`.
+
+    Parameters:
+        client (:obj:`-anikimiapi.AniKimi`):
+            The client fetching the pages.
+        output (``str``):
+            The JSON lines file the records are appended to.
+        checkpoint (``str``, *optional*):
+            The checkpoint file. Defaults to the output with a ``.checkpoint`` suffix.
+        workers (``int``, *optional*):
+            The anime whose details are fetched at the same time. Defaults to 8.
+        limit (``int``, *optional*):
+            The maximum number of anime listed per genre. Defaults to 100000.
+        processes (``int``, *optional*):
+            Parse the pages in this many processes, with a
+            :obj:`-anikimiapi.pipeline.Pipeline`. In the threads by default.
+        report (``callable``, *optional*):
+            Called with a line of progress, like the records per second. Prints
+            to stderr by default.
+        report_interval (``float``, *optional*):
+            The seconds between the progress reports. Defaults to 5.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.crawl import Crawler
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+            stats = Crawler(anime, "catalog.jsonl", workers=16).run(["action", "romance"])
+            print(stats["records"], "records at", stats["records_per_s"], "records/s")
+    """
+    def __init__(
+            self,
+            client,
+            output: str,
+            checkpoint: str = None,
+            workers: int = 8,
+            limit: int = 100000,
+            processes: int = None,
+            report=None,
+            report_interval: float = 5.0,
+    ):
+        self.client = client
+        self.output = output
+        self.checkpoint = checkpoint or output + ".checkpoint"
+        self.workers = workers
+        self.limit = limit
+        self.processes = processes
+        self.report = report or (lambda line: print(line, file=sys.stderr, flush=True))
+        self.report_interval = report_interval
+        self.genres_done = []
+        self.animeids = {}  # animeid -> None, in the order found
+        self.failed = {}  # animeid -> why, never retried
+        self.errors = 0
+
+    def _load(self) -> set:
+        """restore the checkpoint, and return the animeids already in the output, cutting
+        a last line left incomplete by an interruption."""
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding="utf-8") as fh:
+                saved = json.load(fh)
+            self.genres_done = saved["genres_done"]
+            self.animeids = dict.fromkeys(saved["animeids"])
+            self.failed = saved["failed"]
+        done = set()
+        if not os.path.exists(self.output):
+            return done
+        with open(self.output, "rb+") as fh:
+            complete = 0
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    done.add(json.loads(line)["animeid"])
+                except (ValueError, KeyError):
+                    break
+                complete += len(line)
+            fh.truncate(complete)
+        return done
+
+    def _save(self) -> None:
+        saved = {"genres_done": self.genres_done, "animeids": list(self.animeids), "failed": self.failed}
+        with open(self.checkpoint + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(saved, fh)
+        os.replace(self.checkpoint + ".tmp", self.checkpoint)
+
+    def _list(self, genres) -> None:
+        """list the anime of the genres not listed yet, checkpointing after each one."""
+        for genre in genres:
+            if genre in self.genres_done:
+                continue
+            try:
+                results = self.client.get_by_genres(genre_name=genre, limit=self.limit)
+            except InvalidGenreNameError:
+                self.report(f"genre {genre}: invalid, skipped")
+                results = []
+            except NetworkError as error:  # listed again on the next run
+                self.errors += 1
+                self.report(f"genre {genre}: {error}, skipped until the next run")
+                continue
+            found = len(self.animeids)
+            self.animeids.update(dict.fromkeys(result.animeid for result in results))
+            self.genres_done.append(genre)
+            self._save()
+            self.report(f"genre {genre}: {len(results)} anime, {len(self.animeids) - found} new,"
+                        f" {len(self.animeids)} in total")
+
+    def _details(self, animeids):
+        """yield the ``(animeid, result)`` of the details of ``animeids``, with at most
+        ``workers`` in flight."""
+        if self.processes:
+            from anikimiapi.pipeline import Pipeline
+
+            with Pipeline(self.client, fetchers=self.workers, processes=self.processes) as pipeline:
+                yield from pipeline.get_details(animeids)
+            return
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+        def fetch(animeid):
+            try:
+                return animeid, self.client.get_details(animeid=animeid)
+            except Exception as error:  # the crawl goes on, see run
+                return animeid, error
+
+        animeids = iter(animeids)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = set()
+            try:
+                for animeid in animeids:
+                    pending.add(executor.submit(fetch, animeid))
+                    if len(pending) >= self.workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield future.result()
+                for future in as_completed(pending):
+                    yield future.result()
+                pending = ()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def run(self, genres=GENRES) -> dict:
+        """Crawl the ``genres``, resuming from the checkpoint if there is one.
+
+        Returns:
+            ``dict``: The ``records`` written by this run, the ones already in the
+            output (``resumed``), the ``failed`` anime, invalid or whose page could
+            not be parsed, the ``errors`` left to retry,
+            the ``elapsed`` seconds and the ``records_per_s``.
+        """
+        from anikimiapi.serialization import _json_line
+
+        started = time.perf_counter()
+        done = self._load()
+        self._list(genres)
+        pending = [animeid for animeid in self.animeids if animeid not in done and animeid not in self.failed]
+        self.report(f"{len(done)} anime already crawled, {len(pending)} to go")
+        line = _json_line()
+        records = 0
+        reported = time.perf_counter()
+        details_started = reported
+        try:
+            with open(self.output, "a", encoding="utf-8") as fh:
+                for animeid, details in self._details(pending):
+                    if isinstance(details, InvalidAnimeIdError):
+                        self.failed[animeid] = str(details)
+                        continue
+                    if isinstance(details, _PARSE_ERRORS):
+                        self.failed[animeid] = f"{type(details).__name__}: {details}"
+                        self.report(f"anime {animeid}: {self.failed[animeid]}, failed")
+                        continue
+                    if isinstance(details, Exception):  # fetched again on the next run
+                        self.errors += 1
+                        continue
+                    record = {"animeid": animeid}
+                    record.update(details.to_dict())
+                    fh.write(line(record))
+                    fh.flush()
+                    records += 1
+                    now = time.perf_counter()
+                    if now - reported >= self.report_interval:
+                        reported = now
+                        self.report(f"{records}/{len(pending)} records, "
+                                    f"{records / (now - details_started):.1f} records/s")
+                        self._save()
+        finally:
+            self._save()
+        elapsed = time.perf_counter() - started
+        rate = records / max(time.perf_counter() - details_started, 1e-9)
+        if not self.errors and len(self.genres_done) >= len(set(genres)):
+            os.remove(self.checkpoint)  # complete, the next run lists the genres again
+        self.report(f"{records} records in {elapsed:.1f}s, {rate:.1f} records/s, "
+                    f"{len(self.failed)} failed, {self.errors} errors left to retry")
+        return {
+            "records": records,
+            "resumed": len(done),
+            "failed": len(self.failed),
+            "errors": self.errors,
+            "elapsed": round(elapsed, 3),
+            "records_per_s": round(rate, 2),
+        }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m anikimiapi.crawl", description=__doc__.split("\n")[0])
+    parser.add_argument("--output", default="catalog.jsonl", help="the JSON lines file, appended to")
+    parser.add_argument("--checkpoint", default=None, help="defaults to the output with a .checkpoint suffix")
+    parser.add_argument("--genres", nargs="+", default=list(GENRES), help="all the genres by default")
+    parser.add_argument("--limit", type=int, default=100000, help="the anime listed per genre, at most")
+    parser.add_argument("--workers", type=int, default=8, help="the details fetched at the same time")
+    parser.add_argument("--processes", type=int, default=None, help="parse in this many processes")
+    parser.add_argument("--host", default="https://gogoanime.pe/")
+    parser.add_argument("--parser", default="lxml", choices=["soup", "lxml"])
+    parser.add_argument("--gogoanime-token", default=os.environ.get("GOGOANIME_TOKEN", ""),
+                        help="defaults to $GOGOANIME_TOKEN, the crawl does not need it")
+    parser.add_argument("--auth-token", default=os.environ.get("GOGOANIME_AUTH_TOKEN", ""),
+                        help="defaults to $GOGOANIME_AUTH_TOKEN, the crawl does not need it")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="seconds between the progress lines")
+    parser.add_argument("--restart", action="store_true", help="remove the output and the checkpoint first")
+    args = parser.parse_args(argv)
+
+    from anikimiapi import AniKimi
+
+    crawler_checkpoint = args.checkpoint or args.output + ".checkpoint"
+    if args.restart:
+        for path in (args.output, crawler_checkpoint):
+            if os.path.exists(path):
+                os.remove(path)
+    with AniKimi(
+            args.gogoanime_token, args.auth_token, host=args.host, parser=args.parser,
+            pool_maxsize=max(10, args.workers),
+    ) as client:
+        crawler = Crawler(
+            client, args.output, checkpoint=crawler_checkpoint, workers=args.workers, limit=args.limit,
+            processes=args.processes, report_interval=args.report_interval,
+        )
+        try:
+            stats = crawler.run(args.genres)
+        except KeyboardInterrupt:
+            print("interrupted, run the same command again to resume", file=sys.stderr)
+            return 130
+    return 0 if not stats["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
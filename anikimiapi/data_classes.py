@@ -1,30 +1,120 @@
-class ResultObject:
+_setattr = object.__setattr__  # sets the fields of the immutable objects
+
+
+class _Record:
+    """Base of the api objects: slotted, compared and serialized by value, field by field."""
+    __slots__ = ()
+
+    def __eq__(self, other):
+        # the subclasses adding no field, like LazyMediaLinksObject, compare with their base
+        if not isinstance(other, _Record) or other.__slots__ is not self.__slots__:
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+    def astuple(self) -> tuple:
+        """The values of the fields, in declaration order."""
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_dict(self) -> dict:
+        """The fields as a ``dict``, ready for ``json.dumps``."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Build the object back from :meth:`to_dict`, unknown keys are ignored."""
+        try:
+            return cls(**data)
+        except TypeError:
+            return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+class _FrozenRecord(_Record):
+    """An immutable, hashable record."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{self.__class__.__name__} objects are immutable")
+
+    def __hash__(self) -> int:
+        return hash(self.astuple())
+
+    def __reduce__(self):
+        return self.__class__, self.astuple()
+
+
+class ResultObject(_FrozenRecord):
+    __slots__ = ("title", "animeid")
+
     def __init__(self, title: str, animeid: str):
-        self.title = title
-        self.animeid = animeid
+        _setattr(self, "title", title)
+        _setattr(self, "animeid", animeid)
+
+
+class MediaInfoObject(_FrozenRecord):
+    __slots__ = (
+        "title",
+        "year",
+        "other_names",
+        "season",
+        "status",
+        "genres",
+        "episodes",
+        "image_url",
+        "summary",
+    )
 
-class MediaInfoObject:
     def __init__(self,
                  title: str,
                  year: int,
                  other_names: str,
                  season: str,
                  status: str,
-                 genres: list,
+                 genres: tuple,
                  episodes: int,
                  image_url: str,
                  summary: str):
-        self.title = title
-        self.year = year
-        self.other_names = other_names
-        self.season = season
-        self.status = status
-        self.genres = genres
-        self.episodes = episodes
-        self.image_url = image_url
-        self.summary = summary
-
-class MediaLinksObject:
+        _setattr(self, "title", title)
+        _setattr(self, "year", year)
+        _setattr(self, "other_names", other_names)
+        _setattr(self, "season", season)
+        _setattr(self, "status", status)
+        _setattr(self, "genres", tuple(genres))
+        _setattr(self, "episodes", episodes)
+        _setattr(self, "image_url", image_url)
+        _setattr(self, "summary", summary)
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data["genres"] = list(self.genres)
+        return data
+
+
+class MediaLinksObject(_Record):
+    """The links of an episode. Unlike the other objects it stays mutable, since
+    the resolvers fill it in as they go, so it is not hashable."""
+    __slots__ = (
+        "link_360p",
+        "link_480p",
+        "link_720p",
+        "link_1080p",
+        "link_hdp",
+        "link_sdp",
+        "link_streamsb",
+        "link_xstreamcdn",
+        "link_streamtape",
+        "link_mixdrop",
+        "link_mp4upload",
+        "link_doodstream",
+    )
+    __hash__ = None
+
     def __init__(self,
                  link_360p=None,
                  link_480p=None,
@@ -46,8 +136,106 @@ class MediaLinksObject:
         self.link_hdp = link_hdp
         self.link_sdp = link_sdp
         self.link_streamsb = link_streamsb
-        self. link_xstreamcdn = link_xstreamcdn
+        self.link_xstreamcdn = link_xstreamcdn
         self.link_streamtape = link_streamtape
         self.link_mixdrop = link_mixdrop
         self.link_mp4upload = link_mp4upload
         self.link_doodstream = link_doodstream
+
+    @classmethod
+    def fields(cls, names) -> frozenset:
+        """The field names matching ``names``, which may omit the ``link_`` prefix,
+        like ``("720p", "hdp", "mixdrop")``.
+
+        Raises:
+            ``ValueError``: If a name is not a field.
+        """
+        fields = frozenset(name if name.startswith("link_") else f"link_{name}" for name in names)
+        unknown = fields.difference(cls.__slots__)
+        if unknown:
+            raise ValueError(f"Unknown link fields: {', '.join(sorted(unknown))}")
+        return fields
+
+    def only(self, fields) -> "MediaLinksObject":
+        """Clear every field but ``fields``, names as given to :meth:`fields`, returns the object."""
+        fields = self.fields(fields)
+        for name in self.__slots__:
+            if name not in fields:
+                setattr(self, name, None)
+        return self
+
+
+def _lazy_field(name: str):
+    """a property resolving the field ``name`` of a ``LazyMediaLinksObject`` on first access."""
+    slot = MediaLinksObject.__dict__[name]
+
+    def get(self):
+        if name in self._pending:
+            self._resolve(name)
+        return slot.__get__(self)
+
+    def set(self, value):
+        self._pending.pop(name, None)
+        slot.__set__(self, value)
+
+    return property(get, set)
+
+
+class LazyMediaLinksObject(MediaLinksObject):
+    """A ``MediaLinksObject`` whose expensive fields are fetched on first access.
+
+    Each pending field has a loader, a callable fetching the page the field is
+    read from and returning a ``MediaLinksObject``. On the first access to a
+    pending field, its loader runs once and fills every field pending on it, so
+    the fields read from the same page cost a single request. The errors of a
+    loader are raised by the attribute access.
+
+    Comparing, serializing or pickling the object resolves every pending field.
+    """
+    # no __slots__ of its own: the records list their fields in __slots__, so the
+    # loaders and the lock live in the instance __dict__
+
+    def __init__(self, links: MediaLinksObject = None, pending: dict = None):
+        import threading
+
+        self._pending = {}
+        self._lock = threading.Lock()
+        super().__init__(*(links.astuple() if links is not None else ()))
+        self._pending = dict(pending or {})
+
+    @property
+    def pending(self) -> tuple:
+        """The names of the fields not resolved yet."""
+        return tuple(self._pending)
+
+    def _resolve(self, name: str) -> None:
+        with self._lock:
+            loader = self._pending.get(name)
+            if loader is None:  # resolved by another thread meanwhile
+                return
+            links = loader()
+            for field, pending in list(self._pending.items()):
+                if pending is loader:
+                    MediaLinksObject.__dict__[field].__set__(self, getattr(links, field))
+                    del self._pending[field]
+
+    def resolve(self) -> "LazyMediaLinksObject":
+        """Resolve every pending field now, returns the object."""
+        for name in self.pending:
+            getattr(self, name)
+        return self
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}=<pending>" if name in self._pending else f"{name}={getattr(self, name)!r}"
+            for name in MediaLinksObject.__slots__
+        )
+        return f"{self.__class__.__name__}({fields})"
+
+    def __reduce__(self):
+        return MediaLinksObject, self.astuple()
+
+
+for _name in MediaLinksObject.__slots__:
+    setattr(LazyMediaLinksObject, _name, _lazy_field(_name))
+del _name
@@ -0,0 +1,604 @@
+import json
+import os
+import threading
+import time
+from anikimiapi.error_handlers import NetworkError
+
+# the links tried by Downloader.download_links, best first
+QUALITIES = ("link_1080p", "link_720p", "link_480p", "link_360p", "link_sdp")
+
+
+class DownloadProgress:
+    """The progress of a download, sent to the ``progress`` callback of a :class:`Downloader`.
+
+    Parameters:
+        downloaded (``int``):
+            The bytes of the file on disk, including the ones of a resumed download.
+        total (``int``):
+            The size of the file, ``None`` if the server did not tell.
+        rate (``float``):
+            The throughput since the previous report, in bytes per second.
+        average (``float``):
+            The throughput since the download started, in bytes per second.
+        elapsed (``float``):
+            The seconds since the download started.
+        connections (``int``):
+            The connections downloading.
+    """
+    __slots__ = ("downloaded", "total", "rate", "average", "elapsed", "connections")
+
+    def __init__(self, downloaded: int, total: int, rate: float, average: float, elapsed: float, connections: int):
+        self.downloaded = downloaded
+        self.total = total
+        self.rate = rate
+        self.average = average
+        self.elapsed = elapsed
+        self.connections = connections
+
+    @property
+    def fraction(self) -> float:
+        """The share of the file downloaded, between 0 and 1, ``None`` if the size is unknown."""
+        if not self.total:
+            return None if self.total is None else 1.0
+        return self.downloaded / self.total
+
+    def __repr__(self) -> str:
+        return (f"DownloadProgress({self.downloaded}/{self.total} bytes, "
+                f"{self.rate / 1e6:.2f} MB/s, {self.connections} connections)")
+
+
+class DownloadResult:
+    """A finished download, returned by :meth:`Downloader.download`.
+
+    Parameters:
+        path (``str``):
+            The downloaded file.
+        size (``int``):
+            The size of the file.
+        downloaded (``int``):
+            The bytes transferred by this download.
+        resumed (``int``):
+            The bytes kept from an interrupted download.
+        elapsed (``float``):
+            The seconds taken.
+        chunks (``int``):
+            The range requests which succeeded.
+        retries (``int``):
+            The range requests which failed and were retried.
+    """
+    __slots__ = ("path", "size", "downloaded", "resumed", "elapsed", "chunks", "retries")
+
+    def __init__(self, path: str, size: int, downloaded: int, resumed: int, elapsed: float, chunks: int, retries: int):
+        self.path = path
+        self.size = size
+        self.downloaded = downloaded
+        self.resumed = resumed
+        self.elapsed = elapsed
+        self.chunks = chunks
+        self.retries = retries
+
+    @property
+    def rate(self) -> float:
+        """The throughput of this download, in bytes per second."""
+        return self.downloaded / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self) -> str:
+        return f"DownloadResult({self.path!r}, {self.size} bytes, {self.rate / 1e6:.2f} MB/s)"
+
+
+class _Fatal(Exception):
+    """a range answered in a way retrying can't fix."""
+
+
+class _Partial(Exception):
+    """a range which failed after ``position``."""
+    def __init__(self, position: int, error: Exception):
+        super().__init__(position, error)
+        self.position = position
+        self.error = error
+
+
+class _Bandwidth:
+    """a token bucket shared by the connections, starting empty and holding up to a
+    second of bytes."""
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate) - size
+            self._updated = now
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _Segments:
+    """the byte ranges of a file, downloaded or not, as sorted ``[start, end)`` lists."""
+    def __init__(self, size: int, done: list = ()):
+        self.done = []
+        for start, end in sorted(done):
+            self._merge(start, end)
+        self.gaps = []
+        position = 0
+        for start, end in self.done:
+            if start > position:
+                self.gaps.append([position, start])
+            position = end
+        if position < size:
+            self.gaps.append([position, size])
+        self.remaining = sum(end - start for start, end in self.gaps)
+
+    def _merge(self, start: int, end: int) -> None:
+        done = self.done
+        if done and done[-1][1] >= start >= done[-1][0]:
+            done[-1][1] = max(done[-1][1], end)
+            return
+        done.append([start, end])
+        done.sort()
+        merged = [done[0]]
+        for range_ in done[1:]:
+            if range_[0] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], range_[1])
+            else:
+                merged.append(range_)
+        self.done = merged
+
+    def claim(self, size: int):
+        """the next ``(start, end)`` range to download, of at most ``size`` bytes, ``None``
+        if every range is downloaded or claimed."""
+        if not self.gaps:
+            return None
+        gap = self.gaps[0]
+        start, end = gap[0], min(gap[1], gap[0] + size)
+        if end == gap[1]:
+            self.gaps.pop(0)
+        else:
+            gap[0] = end
+        return start, end
+
+    def release(self, start: int, end: int) -> None:
+        """give back the part of a claimed range which was not downloaded."""
+        if start < end:
+            self.gaps.append([start, end])
+            self.gaps.sort()
+
+    def complete(self, start: int, end: int) -> None:
+        self._merge(start, end)
+        self.remaining -= end - start
+
+
+class _Transfer:
+    """the state of one download, shared by its connections."""
+    def __init__(self, url: str, size: int, validator: dict, segments: _Segments, write):
+        self.url = url
+        self.size = size
+        self.validator = validator
+        self.segments = segments
+        self.write = write
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.finished = threading.Event()
+        self.running = 0
+        self.error = None
+        self.downloaded = 0
+        self.chunks = 0
+        self.retries = 0
+        self.active = 0
+
+    def fail(self, error: Exception) -> None:
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stopped.set()
+
+
+class Downloader:
+    """Downloads the resolved links of the episodes over several connections at once.
+
+    A single connection to the CDNs is often much slower than the bandwidth
+    available. The file is preallocated, then its byte ranges are fetched by
+    ``connections`` parallel HTTP Range requests and written in place, directly or
+    through a memory map. The size of the ranges adapts to the throughput of each
+    connection, so every request takes about ``chunk_seconds``, and the last ones
+    get smaller so the connections finish together. A server which ignores the
+    ranges gets a single streamed request.
+
+    The downloaded ranges are saved to a ``.manifest`` file next to the ``.part``
+    file being written, so an interrupted download resumes from where it stopped,
+    even from a newly resolved link, as long as the file has the same size and
+    validators. Both files are replaced by the downloaded file at the end.
+
+    Parameters:
+        connections (``int``, *optional*):
+            The parallel range requests. Defaults to 4.
+        chunk_size (``int``, *optional*):
+            The size of the first range of each connection, in bytes. Defaults to 1 MiB.
+        min_chunk (``int``, *optional*):
+            The smallest range. Defaults to 256 KiB.
+        max_chunk (``int``, *optional*):
+            The largest range. Defaults to 32 MiB.
+        chunk_seconds (``float``, *optional*):
+            The duration the ranges are sized for. Defaults to 2.
+        bandwidth (``float``, *optional*):
+            The cap of the total throughput, in bytes per second. Unlimited by default.
+        progress (``callable``, *optional*):
+            Called with a :class:`DownloadProgress` every ``progress_interval`` seconds,
+            and once at the end. An exception raised there stops the download,
+            which can be resumed later.
+        progress_interval (``float``, *optional*):
+            The seconds between the progress reports. Defaults to 0.5.
+        retries (``int``, *optional*):
+            The consecutive failures of a connection after which the download stops,
+            to be resumed later. Defaults to 3.
+        timeout (``float`` | ``tuple``, *optional*):
+            The timeout of the requests, or a ``(connect, read)`` tuple. Defaults to ``(10, 30)``.
+        headers (``dict``, *optional*):
+            The headers sent with every request. Defaults to a browser ``User-Agent``.
+        use_mmap (``bool``, *optional*):
+            Write through a memory map of the file instead of positioned writes.
+            Defaults to ``False``.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.download import Downloader
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+            links = anime.get_episode_link_basic(animeid="clannad-dub", episode_num=3)
+
+            with Downloader(connections=8, bandwidth=20e6, progress=print) as downloader:
+                result = downloader.download_links(links, "clannad-3.mp4")
+            print(result.rate / 1e6, "MB/s")
+    """
+    block_size = 64 * 1024
+
+    def __init__(
+            self,
+            connections: int = 4,
+            chunk_size: int = 1 << 20,
+            min_chunk: int = 256 * 1024,
+            max_chunk: int = 32 << 20,
+            chunk_seconds: float = 2.0,
+            bandwidth: float = None,
+            progress=None,
+            progress_interval: float = 0.5,
+            retries: int = 3,
+            timeout=(10, 30),
+            headers: dict = None,
+            use_mmap: bool = False,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.chunk_seconds = chunk_seconds
+        self.bandwidth = bandwidth
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.retries = retries
+        self.timeout = timeout
+        self.use_mmap = use_mmap
+        self.session = requests.Session()
+        self.session.headers.update(headers or {'User-Agent': 'Mozilla/5.0'})
+        # ranges of a compressed body would not be the ranges of the file
+        self.session.headers["Accept-Encoding"] = "identity"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def download_links(self, links, path: str, qualities=QUALITIES, resume: bool = True) -> DownloadResult:
+        """Download the best of the resolved links of an episode.
+
+        Parameters:
+            links (:obj:`-anikimiapi.data_classes.MediaLinksObject`):
+                The links of the episode.
+            path (``str``):
+                The file to write.
+            qualities (``tuple``, *optional*):
+                The links to try, best first, like ``("720p", "480p")``. Defaults to the
+                direct links from 1080p to SDP. The HLS playlists can't be downloaded.
+            resume (``bool``, *optional*):
+                Resume an interrupted download of ``path``. Defaults to ``True``.
+
+        Returns:
+            :class:`DownloadResult`: The finished download.
+
+        Raises:
+            ``ValueError``: If none of the ``qualities`` has a link.
+        """
+        from anikimiapi.data_classes import MediaLinksObject
+
+        for name in MediaLinksObject.fields(qualities):
+            url = getattr(links, name)
+            if url:
+                return self.download(url, path, resume)
+        raise ValueError(f"None of the links {', '.join(qualities)} was found")
+
+    def download(self, url: str, path: str, resume: bool = True) -> DownloadResult:
+        """Download ``url`` to ``path``.
+
+        Parameters:
+            url (``str``):
+                The url of the file.
+            path (``str``):
+                The file to write.
+            resume (``bool``, *optional*):
+                Resume an interrupted download of ``path``. Defaults to ``True``.
+
+        Returns:
+            :class:`DownloadResult`: The finished download.
+
+        Raises:
+            ``NetworkError``: If the file could not be downloaded, what was downloaded
+            is kept to resume from.
+        """
+        started = time.perf_counter()
+        size, validator, ranged = self._probe(url)
+        part, manifest = path + ".part", path + ".manifest"
+        done = self._load_manifest(manifest, part, size, validator) if resume and ranged else []
+        segments = _Segments(size, done) if ranged else None
+        resumed = size - segments.remaining if ranged else 0
+        mode = "r+b" if done else "w+b"
+        with open(part, mode) as fh:
+            if ranged:
+                fh.truncate(size)
+            mapped = None
+            if ranged and self.use_mmap and size:
+                import mmap
+
+                mapped = mmap.mmap(fh.fileno(), size)
+            transfer = _Transfer(url, size, validator, segments, self._writer(fh, mapped))
+            try:
+                if ranged:
+                    self._run(transfer, manifest, started, resumed)
+                else:
+                    self._stream(transfer, fh, started)
+            finally:
+                if mapped is not None:
+                    mapped.flush()
+                    mapped.close()
+        os.replace(part, path)
+        if os.path.exists(manifest):
+            os.remove(manifest)
+        size = os.path.getsize(path)
+        return DownloadResult(
+            path, size, transfer.downloaded, resumed, time.perf_counter() - started,
+            transfer.chunks, transfer.retries,
+        )
+
+    def _probe(self, url: str):
+        """the size of the file, its validators, and whether the server serves ranges."""
+        try:
+            response = self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=self.timeout)
+            response.close()
+        except self._network_errors() as error:
+            raise NetworkError(f"Unable to reach the file: {error}")
+        if response.status_code >= 400:
+            raise NetworkError(f"The server answered {response.status_code}")
+        validator = {
+            name: response.headers[name] for name in ("ETag", "Last-Modified") if name in response.headers
+        }
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code == 206 and "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+            return int(content_range.rsplit("/", 1)[1]), validator, True
+        length = response.headers.get("Content-Length")
+        return (int(length) if length and length.isdigit() else None), validator, False
+
+    @staticmethod
+    def _network_errors() -> tuple:
+        import requests
+
+        return requests.exceptions.RequestException, OSError
+
+    @staticmethod
+    def _load_manifest(manifest: str, part: str, size: int, validator: dict) -> list:
+        """the downloaded ranges of an interrupted download of the same file, if any."""
+        try:
+            with open(manifest) as fh:
+                saved = json.load(fh)
+        except (OSError, ValueError):
+            return []
+        if saved.get("size") != size or saved.get("validator") != validator or not os.path.exists(part):
+            return []
+        return [tuple(range_) for range_ in saved.get("done", ())]
+
+    @staticmethod
+    def _save_manifest(manifest: str, transfer: _Transfer) -> None:
+        with transfer.lock:
+            saved = {
+                "url": transfer.url,
+                "size": transfer.size,
+                "validator": transfer.validator,
+                "done": [list(range_) for range_ in transfer.segments.done],
+            }
+        with open(manifest + ".tmp", "w") as fh:
+            json.dump(saved, fh)
+        os.replace(manifest + ".tmp", manifest)
+
+    @staticmethod
+    def _writer(fh, mapped):
+        """a ``write(offset, data)`` function safe to call from every connection."""
+        if mapped is not None:
+            def write(offset, data):
+                mapped[offset:offset + len(data)] = data
+        elif hasattr(os, "pwrite"):
+            fd = fh.fileno()
+
+            def write(offset, data):
+                os.pwrite(fd, data, offset)
+        else:
+            lock = threading.Lock()
+
+            def write(offset, data):
+                with lock:
+                    fh.seek(offset)
+                    fh.write(data)
+        return write
+
+    def _run(self, transfer: _Transfer, manifest: str, started: float, resumed: int) -> None:
+        """download the missing ranges with the connections, reporting the progress."""
+        bandwidth = _Bandwidth(self.bandwidth) if self.bandwidth else None
+        workers = [
+            threading.Thread(target=self._connection, args=(transfer, bandwidth), name=f"anikimi-download-{i}",
+                             daemon=True)
+            for i in range(min(self.connections, max(1, transfer.segments.remaining // self.min_chunk)))
+        ]
+        transfer.running = len(workers)
+        for worker in workers:
+            worker.start()
+        reported = (started, 0)
+        try:
+            while not transfer.finished.wait(self.progress_interval):
+                reported = self._report(transfer, started, resumed, reported)
+                self._save_manifest(manifest, transfer)
+        except BaseException as error:
+            transfer.fail(error)
+            raise
+        finally:
+            transfer.stopped.set()
+            for worker in workers:
+                worker.join()
+            if transfer.segments.remaining:
+                self._save_manifest(manifest, transfer)
+        if transfer.segments.remaining:
+            raise NetworkError(f"The download stopped, it can be resumed: {transfer.error!r}")
+        self._report(transfer, started, resumed, reported)
+
+    def _report(self, transfer: _Transfer, started: float, resumed: int, reported: tuple) -> tuple:
+        """send the progress to the callback, returns the time and the bytes reported."""
+        now = time.perf_counter()
+        downloaded = transfer.downloaded
+        if self.progress is not None:
+            elapsed = now - started
+            rate = (downloaded - reported[1]) / (now - reported[0]) if now > reported[0] else 0.0
+            self.progress(DownloadProgress(
+                resumed + downloaded, transfer.size, rate, downloaded / elapsed if elapsed else 0.0,
+                elapsed, transfer.active,
+            ))
+        return now, downloaded
+
+    def _connection(self, transfer: _Transfer, bandwidth: _Bandwidth) -> None:
+        """download ranges until there are none left, sizing them to ``chunk_seconds``."""
+        chunk = self.chunk_size
+        failures = 0
+        with transfer.lock:
+            transfer.active += 1
+        try:
+            while not transfer.stopped.is_set():
+                with transfer.lock:
+                    # split the end of the file between the connections
+                    share = max(self.min_chunk, transfer.segments.remaining // self.connections)
+                    claimed = transfer.segments.claim(min(chunk, share))
+                if claimed is None:
+                    return
+                start, end = claimed
+                began = time.perf_counter()
+                position = start
+                try:
+                    position = self._fetch_range(transfer, start, end, bandwidth)
+                except _Fatal as error:
+                    transfer.fail(error.args[0])
+                except Exception as error:
+                    if isinstance(error, _Partial):
+                        position, error = error.position, error.error
+                    failures += 1
+                    with transfer.lock:
+                        transfer.retries += 1
+                    if failures > self.retries:
+                        transfer.fail(error)
+                    else:
+                        time.sleep(min(0.25 * 2 ** failures, 5))
+                finally:
+                    with transfer.lock:
+                        transfer.segments.release(position, end)
+                if position == end:
+                    failures = 0
+                    with transfer.lock:
+                        transfer.chunks += 1
+                    elapsed = max(time.perf_counter() - began, 1e-3)
+                    chunk = max(self.min_chunk, min(self.max_chunk, int(chunk * self.chunk_seconds / elapsed)))
+        finally:
+            with transfer.lock:
+                transfer.active -= 1
+                transfer.running -= 1
+                if not transfer.running:
+                    transfer.finished.set()
+
+    def _fetch_range(self, transfer: _Transfer, start: int, end: int, bandwidth: _Bandwidth) -> int:
+        """download ``[start, end)`` into the file, returns the position reached."""
+        headers = {"Range": f"bytes={start}-{end - 1}"}
+        validator = transfer.validator.get("ETag") or transfer.validator.get("Last-Modified")
+        if validator:
+            headers["If-Range"] = validator
+        with self.session.get(transfer.url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 200:
+                raise _Fatal(NetworkError("The file changed on the server, or it stopped serving ranges"))
+            if response.status_code != 206:
+                raise NetworkError(f"The server answered {response.status_code}")
+            if not response.headers.get("Content-Range", "").startswith(f"bytes {start}-"):
+                raise _Fatal(NetworkError("The server answered another range"))
+            position = start
+            try:
+                for block in response.iter_content(self.block_size):
+                    if transfer.stopped.is_set():
+                        break
+                    block = block[:end - position]
+                    if bandwidth is not None:
+                        bandwidth.consume(len(block))
+                    transfer.write(position, block)
+                    with transfer.lock:
+                        transfer.segments.complete(position, position + len(block))
+                        transfer.downloaded += len(block)
+                    position += len(block)
+                    if position >= end:
+                        break
+            except Exception as error:
+                raise _Partial(position, error)
+        if position < end and not transfer.stopped.is_set():
+            raise _Partial(position, NetworkError("The connection closed before the end of the range"))
+        return position
+
+    def _stream(self, transfer: _Transfer, fh, started: float) -> None:
+        """download the whole file with a single request, for the servers without ranges."""
+        bandwidth = _Bandwidth(self.bandwidth) if self.bandwidth else None
+        reported = (started, 0)
+        transfer.active = 1
+        try:
+            with self.session.get(transfer.url, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    raise NetworkError(f"The server answered {response.status_code}")
+                for block in response.iter_content(self.block_size):
+                    if bandwidth is not None:
+                        bandwidth.consume(len(block))
+                    fh.write(block)
+                    transfer.downloaded += len(block)
+                    if time.perf_counter() - reported[0] >= self.progress_interval:
+                        reported = self._report(transfer, started, 0, reported)
+        except self._network_errors() as error:
+            raise NetworkError(f"The download failed: {error}")
+        fh.truncate()
+        transfer.size = transfer.downloaded
+        transfer.active = 0
+        self._report(transfer, started, 0, reported)
@@ -17,4 +17,7 @@ class AiringIndexError(Exception):
     pass
 
 class CountError(Exception):
-    pass
\ No newline at end of file
+    pass
+
+class CircuitOpenError(NetworkError):
+    pass
@@ -0,0 +1,245 @@
+from collections import deque
+import threading
+import time
+from urllib.parse import urlsplit
+from anikimiapi.error_handlers import NetworkError
+
+
+class _Mirror:
+    """the rolling latency and errors of one mirror."""
+    __slots__ = ("host", "outcomes", "latencies", "probes", "last_used")
+
+    def __init__(self, host: str, window: int):
+        self.host = host
+        self.outcomes = deque(maxlen=window)  # True for a success, False for a failure
+        self.latencies = deque(maxlen=window)  # of the requests, in seconds
+        self.probes = deque(maxlen=window)  # time to the headers of the probes, in seconds
+        self.last_used = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    @property
+    def probe_latency(self):
+        return sum(self.probes) / len(self.probes) if self.probes else None
+
+
+class HostPool:
+    """A set of gogoanime mirrors, ranked by their recent latency and errors.
+
+    Each request goes to the fastest healthy mirror, and to the next one if it
+    fails: a connection error, a timeout, a server error, or a wrong page (a
+    client error, a redirect to another domain, or a page ``validate`` rejects).
+    The page of a client error is still returned if no mirror does better. A mirror is
+    healthy while less than ``max_error_rate`` of its last ``window`` requests
+    failed. The mirrors not used for ``probe_interval`` seconds are probed in
+    the background, so the failed mirrors get a chance to recover. A probe only
+    reads the headers of the front page, its latency is kept apart and only ranks
+    the mirrors no request succeeded on yet, after the other healthy ones.
+
+    Parameters:
+        hosts (``list``):
+            The base urls of the mirrors, the first one is used until the others are measured.
+        window (``int``, *optional*):
+            The number of recent requests the ranking is based on. Defaults to 20.
+        max_error_rate (``float``, *optional*):
+            The error rate above which a mirror is only tried after the others. Defaults to 0.5.
+        probe_interval (``float``, *optional*):
+            The idle time after which a mirror is probed, in seconds, ``None`` to never
+            probe. Defaults to 60.
+        validate (``callable``, *optional*):
+            Called with the :obj:`-anikimiapi.transport.Page` of a mirror, returns whether
+            it is a gogoanime page.
+        headers (``dict``, *optional*):
+            The headers of the probes.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                host=["https://gogoanime.pe/", "https://gogoanime.ai/", "https://gogoanime.vc/"]
+            )
+            anime.search_anime(query="clannad")
+            print(anime.hosts.stats())
+    """
+    def __init__(
+            self,
+            hosts,
+            window: int = 20,
+            max_error_rate: float = 0.5,
+            probe_interval: float = 60.0,
+            validate=None,
+            headers: dict = None,
+    ):
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        self.hosts = [host if host.endswith("/") else f"{host}/" for host in hosts]
+        if not self.hosts:
+            raise ValueError("At least one host is needed")
+        self.max_error_rate = max_error_rate
+        self.probe_interval = probe_interval
+        self.validate = validate
+        self.headers = headers
+        self._mirrors = {host: _Mirror(host, window) for host in self.hosts}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._prober = None
+
+    def ranked(self) -> list:
+        """The mirrors, best first: the healthy ones by latency, then the ones not
+        measured yet by their probe latency, then the unhealthy ones."""
+        self._start_probing()
+        with self._lock:
+            def rank(host):
+                mirror = self._mirrors[host]
+                latency = mirror.latency
+                if mirror.error_rate > self.max_error_rate:
+                    return 2, mirror.error_rate
+                if latency is not None:
+                    return 0, latency
+                probe_latency = mirror.probe_latency
+                return (1, probe_latency) if probe_latency is not None else (1, float("inf"))
+            return sorted(self.hosts, key=rank)
+
+    def record(self, host: str, latency: float = None, probe: bool = False) -> None:
+        """Record the latency of a successful request to ``host``, or a failure if ``None``.
+        With ``probe``, the latency is the one of a probe, kept apart."""
+        with self._lock:
+            mirror = self._mirrors[host]
+            mirror.outcomes.append(latency is not None)
+            if latency is not None:
+                (mirror.probes if probe else mirror.latencies).append(latency)
+            mirror.last_used = time.monotonic()
+
+    def is_valid(self, host: str, page) -> bool:
+        """Whether ``page``, fetched from ``host``, is a page of the mirror: a success or
+        a redirect within the mirror, not an error like a 403 of a blocked client."""
+        if not 200 <= page.status < 400 or urlsplit(page.url).netloc != urlsplit(host).netloc:
+            return False
+        return self.validate is None or self.validate(page)
+
+    def get(self, transport, path: str, **kwargs):
+        """Fetch ``path`` from the best mirror through ``transport``, failing over to
+        the next mirrors. The keyword arguments are passed to ``transport.get``.
+
+        Returns:
+            The page of the first valid mirror. When none is valid but some answered
+            with a client error, like the 404 of a missing anime, the page of the
+            first of them.
+
+        Raises:
+            The error of the last mirror if they all failed to answer, ``NetworkError``
+            if some answered a wrong page.
+        """
+        from anikimiapi.transport import network_errors
+
+        error = None
+        answered = None  # the first page with a client error
+        for host in self.ranked():
+            start = time.monotonic()
+            try:
+                page = transport.get(f"{host}{path}", **kwargs)
+            except network_errors() + (NetworkError,) as exc:
+                self.record(host)
+                error = exc
+                continue
+            if self.is_valid(host, page):
+                self.record(host, time.monotonic() - start)
+                return page
+            self.record(host)
+            answered = answered or self._client_error(host, page)
+            error = NetworkError(f"{host} answered a wrong page")
+        if answered is not None:
+            return answered
+        raise error
+
+    async def get_async(self, transport, path: str, **kwargs):
+        """The asyncio counterpart of :meth:`get`, with an :obj:`-anikimiapi.transport.AsyncTransport`."""
+        from anikimiapi.transport import async_network_errors
+
+        error = None
+        answered = None
+        for host in self.ranked():
+            start = time.monotonic()
+            try:
+                page = await transport.get(f"{host}{path}", **kwargs)
+            except async_network_errors() + (NetworkError,) as exc:
+                self.record(host)
+                error = exc
+                continue
+            if self.is_valid(host, page):
+                self.record(host, time.monotonic() - start)
+                return page
+            self.record(host)
+            answered = answered or self._client_error(host, page)
+            error = NetworkError(f"{host} answered a wrong page")
+        if answered is not None:
+            return answered
+        raise error
+
+    @staticmethod
+    def _client_error(host: str, page):
+        """``page`` if the mirror answered it with a client error, else ``None``."""
+        if 400 <= page.status < 500 and urlsplit(page.url).netloc == urlsplit(host).netloc:
+            return page
+        return None
+
+    def _start_probing(self) -> None:
+        if self._prober is not None or not self.probe_interval or len(self.hosts) == 1:
+            return
+        with self._lock:
+            if self._prober is None and not self._stopped.is_set():
+                self._prober = threading.Thread(target=self._probe_loop, name="anikimi-probe", daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self) -> None:
+        from anikimiapi.transport import Transport
+
+        with Transport(headers=self.headers, pool_connections=len(self.hosts), timeout=(5, 10)) as transport:
+            while not self._stopped.wait(self.probe_interval / 4):
+                now = time.monotonic()
+                with self._lock:
+                    idle = [host for host, mirror in self._mirrors.items()
+                            if now - mirror.last_used >= self.probe_interval]
+                for host in idle:
+                    start = time.monotonic()
+                    try:
+                        # only the headers are read, the body is left on the wire
+                        with transport.session.get(host, stream=True, timeout=transport.timeout) as response:
+                            elapsed = time.monotonic() - start
+                            valid = 200 <= response.status_code < 400 and (
+                                urlsplit(response.url).netloc == urlsplit(host).netloc
+                            )
+                    except Exception:  # any failure fails the probe, never the prober
+                        self.record(host, probe=True)
+                        continue
+                    self.record(host, elapsed if valid else None, probe=True)
+
+    def close(self) -> None:
+        """Stop the background probes."""
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        """The mean latency of the requests and of the probes, in seconds, the error
+        rate and the number of recent requests and probes of every mirror, keyed by host."""
+        with self._lock:
+            return {
+                host: {
+                    "latency": mirror.latency,
+                    "probe_latency": mirror.probe_latency,
+                    "error_rate": round(mirror.error_rate, 3),
+                    "samples": len(mirror.outcomes),
+                }
+                for host, mirror in self._mirrors.items()
+            }
@@ -0,0 +1,377 @@
+"""Timed spans of the client calls, for hooks and metrics.
+
+A client given an :class:`Instrumentation` reports a :class:`Span` to its
+hooks for every:
+
+- ``"call"``: public method call, with its ``error`` if it failed.
+- ``"fetch"``: page fetched, with its ``route``, url ``template``, ``url``,
+  ``status``, ``bytes`` and whether it was served from the ``cached`` responses,
+  revalidated (``not_modified``) or fetched for another caller (``coalesced``),
+  or its ``error``. ``wire_bytes`` and
+  ``decoded_bytes`` are the size of the body received, before and after its
+  decompression, 0 when nothing was received.
+- ``"parse"``: page source turned into a tree, with the parser ``phase``
+  (the parser method) and the ``bytes`` of the source.
+- ``"extract"``: objects extracted from the tree, with the same ``phase``.
+
+Every span carries the public ``method`` it belongs to, even when its work runs
+in a worker thread. Without an ``Instrumentation``, nothing is measured.
+
+Example:
+    .. code-block:: python
+
+        from anikimiapi import AniKimi
+        from anikimiapi.instrumentation import Instrumentation, Metrics
+
+        metrics = Metrics()
+        anime = AniKimi(
+            gogoanime_token="baikdk32hk1nrek3hw9",
+            auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+            instrumentation=Instrumentation(hooks=[metrics, print])
+        )
+        anime.get_details(animeid="clannad-dub")
+        print(metrics.to_prometheus())
+"""
+from contextvars import ContextVar
+import functools
+import threading
+import time
+
+_method = ContextVar("anikimiapi_method", default=None)  # the public method running
+_trees = ContextVar("anikimiapi_trees", default=None)  # the tree build times of a parse
+
+# the code flags of the generator, coroutine and async generator functions,
+# checked directly so ``inspect`` is not imported with the clients
+_GENERATOR = 0x20
+_COROUTINE = 0x80
+_ASYNC_GENERATOR = 0x200
+
+# the url of each route, as built by the clients
+TEMPLATES = {
+    "search": "{host}/search.html?keyword={query}&page={page}",
+    "category": "{host}category/{animeid}",
+    "genre": "{host}genre/{genre_name}?page={page}",
+    "home": "{host}",
+    "episode": "{host}{animeid}-episode-{episode_num}",
+    "embed": "{embed_url}",
+    "download": "{download_url}",
+}
+
+
+class Span:
+    """A timed operation.
+
+    Parameters:
+        name (``str``):
+            ``"call"``, ``"fetch"``, ``"parse"`` or ``"extract"``.
+        method (``str``):
+            The public method the operation belongs to, ``None`` outside of one.
+        start (``float``):
+            The start time, a ``time.time()`` timestamp.
+        duration (``float``):
+            The duration in seconds.
+        attributes (``dict``):
+            The details of the operation, depending on ``name``.
+    """
+    __slots__ = ("name", "method", "start", "duration", "attributes")
+
+    def __init__(self, name: str, method: str, start: float, duration: float, attributes: dict):
+        self.name = name
+        self.method = method
+        self.start = start
+        self.duration = duration
+        self.attributes = attributes
+
+    def __repr__(self) -> str:
+        return (f"Span(name={self.name!r}, method={self.method!r}, "
+                f"duration={self.duration:.6f}, attributes={self.attributes!r})")
+
+
+class Instrumentation:
+    """The hooks the spans of a client are reported to.
+
+    Parameters:
+        hooks (``list``, *optional*):
+            Callables called with every :class:`Span`, in the thread which did the work.
+    """
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+
+    def add_hook(self, hook) -> None:
+        """Register a callable, called with every :class:`Span`."""
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self.hooks.remove(hook)
+
+    def emit(self, name: str, started: float, duration: float, **attributes) -> None:
+        """Report a span, ``started`` being a ``time.perf_counter()`` value."""
+        span = Span(name, _method.get(), time.time() - (time.perf_counter() - started), duration, attributes)
+        for hook in self.hooks:
+            hook(span)
+
+    def parse(self, parse, phase: str, page_source: str):
+        """Run the parser method ``parse``, reporting its tree building and its extraction."""
+        trees = []
+        token = _trees.set(trees)
+        started = time.perf_counter()
+        try:
+            return parse(page_source)
+        finally:
+            duration = time.perf_counter() - started
+            _trees.reset(token)
+            tree_time = sum(trees)
+            self.emit("parse", started, tree_time, phase=phase, bytes=len(page_source))
+            self.emit("extract", started + tree_time, duration - tree_time, phase=phase)
+
+
+def timed_tree(build):
+    """Decorate the tree building method of a parser, to time it while instrumented."""
+    @functools.wraps(build)
+    def wrapper(*args):
+        trees = _trees.get()
+        if trees is None:
+            return build(*args)
+        started = time.perf_counter()
+        try:
+            return build(*args)
+        finally:
+            trees.append(time.perf_counter() - started)
+    return wrapper
+
+
+def traced(method):
+    """Decorate a public client method, to report its ``"call"`` span and label
+    the spans of its work, when the client has an ``instrumentation``.
+
+    Works with plain, generator, coroutine and async generator methods.
+    """
+    name = method.__name__
+    flags = method.__code__.co_flags
+
+    def finish(instrumentation, started, error):
+        attributes = {} if error is None else {"error": type(error).__name__}
+        token = _method.set(name)
+        try:
+            instrumentation.emit("call", started, time.perf_counter() - started, **attributes)
+        finally:
+            _method.reset(token)
+
+    if flags & _ASYNC_GENERATOR:
+        async def traced_agen(instrumentation, agen):
+            started = time.perf_counter()
+            error = None
+            try:
+                while True:
+                    token = _method.set(name)
+                    try:
+                        item = await agen.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        _method.reset(token)
+                    yield item
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                await agen.aclose()
+                finish(instrumentation, started, error)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            agen = method(self, *args, **kwargs)
+            if self.instrumentation is None:
+                return agen
+            return traced_agen(self.instrumentation, agen)
+
+    elif flags & _GENERATOR:
+        def traced_gen(instrumentation, gen):
+            started = time.perf_counter()
+            error = None
+            try:
+                while True:
+                    token = _method.set(name)
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        return
+                    finally:
+                        _method.reset(token)
+                    yield item
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                gen.close()
+                finish(instrumentation, started, error)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            gen = method(self, *args, **kwargs)
+            if self.instrumentation is None:
+                return gen
+            return traced_gen(self.instrumentation, gen)
+
+    elif flags & _COROUTINE:
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if instrumentation is None:
+                return await method(self, *args, **kwargs)
+            token = _method.set(name)
+            started = time.perf_counter()
+            error = None
+            try:
+                return await method(self, *args, **kwargs)
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                _method.reset(token)
+                finish(instrumentation, started, error)
+
+    else:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            instrumentation = self.instrumentation
+            if instrumentation is None:
+                return method(self, *args, **kwargs)
+            token = _method.set(name)
+            started = time.perf_counter()
+            error = None
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as exc:
+                error = exc
+                raise
+            finally:
+                _method.reset(token)
+                finish(instrumentation, started, error)
+
+    return wrapper
+
+
+def _escape(value) -> str:
+    """a label value, escaped as the Prometheus text format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """A hook aggregating the spans into counters and latency histograms.
+
+    The counters are ``anikimiapi_calls_total`` and ``anikimiapi_call_errors_total``
+    per method, ``anikimiapi_fetches_total`` per route and status (``"error"``
+    for the fetches which failed),
+    ``anikimiapi_fetch_bytes_total``, ``anikimiapi_cache_hits_total``,
+    ``anikimiapi_not_modified_total`` and ``anikimiapi_coalesced_total`` per route, and ``anikimiapi_wire_bytes_total``
+    and ``anikimiapi_decoded_bytes_total``, the bandwidth used per method. The
+    histograms are ``anikimiapi_call_seconds`` per method, ``anikimiapi_fetch_seconds``
+    per route, and ``anikimiapi_parse_seconds`` and ``anikimiapi_extract_seconds``
+    per phase.
+
+    Parameters:
+        buckets (``tuple``, *optional*):
+            The upper bounds of the histogram buckets, in seconds.
+    """
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    _LABELS = {"call": "method", "fetch": "route", "parse": "phase", "extract": "phase"}
+
+    def __init__(self, buckets: tuple = None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, labels: tuple, value=1) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def __call__(self, span: Span) -> None:
+        label = self._LABELS.get(span.name)
+        if label is None:
+            return
+        attributes = span.attributes
+        value = span.method if label == "method" else attributes.get(label)
+        labels = ((label, value),)
+        with self._lock:
+            histogram = self._histograms.get((f"anikimiapi_{span.name}_seconds", labels))
+            if histogram is None:
+                histogram = self._histograms[(f"anikimiapi_{span.name}_seconds", labels)] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += span.duration
+            if span.name == "call":
+                self._count("anikimiapi_calls_total", labels)
+                if "error" in attributes:
+                    self._count("anikimiapi_call_errors_total", labels + (("error", attributes["error"]),))
+            elif span.name == "fetch":
+                status = attributes.get("status")
+                # a fetch which failed has no status
+                self._count("anikimiapi_fetches_total", labels + (("status", "error" if status is None else status),))
+                self._count("anikimiapi_fetch_bytes_total", labels, attributes.get("bytes") or 0)
+                if attributes.get("cached"):
+                    self._count("anikimiapi_cache_hits_total", labels)
+                if attributes.get("not_modified"):
+                    self._count("anikimiapi_not_modified_total", labels)
+                if attributes.get("coalesced"):
+                    self._count("anikimiapi_coalesced_total", labels)
+                if "wire_bytes" in attributes:
+                    method = (("method", span.method),)
+                    self._count("anikimiapi_wire_bytes_total", method, attributes["wire_bytes"] or 0)
+                    self._count("anikimiapi_decoded_bytes_total", method, attributes["decoded_bytes"] or 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_dict(self) -> dict:
+        """The counters and the histograms, keyed by metric name and labels.
+
+        A histogram has its ``count``, its ``sum`` in seconds, and its non
+        cumulative ``buckets``, keyed by upper bound.
+        """
+        with self._lock:
+            counters = {f"{name}{_labels(labels)}": value for (name, labels), value in self._counters.items()}
+            histograms = {
+                f"{name}{_labels(labels)}": {
+                    "count": values[-2],
+                    "sum": values[-1],
+                    "buckets": dict(zip(self.buckets + (float("inf"),), values[:-2] + [values[-2] - sum(values[:-2])])),
+                }
+                for (name, labels), values in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for metric in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {metric} counter")
+                for (name, labels), value in sorted(self._counters.items(), key=str):
+                    if name == metric:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+            for metric in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {metric} histogram")
+                for (name, labels), values in sorted(self._histograms.items(), key=str):
+                    if name != metric:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, values):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {values[-2]}")
+                    lines.append(f"{name}_sum{_labels(labels)} {values[-1]}")
+                    lines.append(f"{name}_count{_labels(labels)} {values[-2]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,215 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+from anikimiapi.data_classes import MediaLinksObject
+
+# the query parameters holding the expiry of a signed url, as a unix timestamp or
+# a number of seconds from now
+EXPIRY_PARAMS = ("expires", "expire", "expiry", "Expires")
+# the generic ones, only read when they hold a unix timestamp
+TIMESTAMP_PARAMS = ("exp", "e")
+
+
+def link_expiry(url: str, now: float = None):
+    """The time a signed url expires at, as a ``time.time()`` timestamp, ``None``
+    if the url does not say.
+
+    Reads an ``expires`` style parameter holding a unix timestamp (or a number of
+    seconds from ``now`` when it is too small to be one), an ``exp`` or ``e``
+    parameter holding a unix timestamp, and the ``X-Amz-Date`` and
+    ``X-Amz-Expires`` parameters of the S3 presigned urls.
+    """
+    if not isinstance(url, str) or "?" not in url:
+        return None
+    now = time.time() if now is None else now
+    params = dict(parse_qsl(urlsplit(url).query))
+    for name in EXPIRY_PARAMS + TIMESTAMP_PARAMS:
+        value = params.get(name)
+        if value is not None and value.isdigit():
+            value = int(value)
+            if value > 10 ** 12:  # milliseconds
+                value /= 1000
+            if value > 10 ** 9:
+                return value
+            if name in EXPIRY_PARAMS:
+                return now + value
+    if "X-Amz-Date" in params and params.get("X-Amz-Expires", "").isdigit():
+        try:
+            signed = datetime.strptime(params["X-Amz-Date"], "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+        return signed.timestamp() + int(params["X-Amz-Expires"])
+    return None
+
+
+class LinkCache:
+    """An in-memory cache of the resolved links of the episodes, which knows when
+    the signed links expire.
+
+    The links are keyed by ``(animeid, episode_num, mode)``, ``mode`` being
+    ``"advanced"`` or ``"basic"``. The expiry of each link is read from its url
+    (see :func:`link_expiry`), a link without one expires after ``ttl``, and the
+    links of an episode are served until ``margin`` seconds before the first of
+    them expires, so they are still valid when they are used.
+
+    With ``refresh_ahead``, a hit on links expiring within ``refresh_ahead``
+    seconds resolves them again in the background, so the popular episodes never
+    miss. When the cache holds more than ``max_entries`` episodes, the least
+    recently used ones are evicted. The cache is thread-safe.
+
+    Parameters:
+        ttl (``float``, *optional*):
+            The lifetime of the links without an expiry, in seconds. Defaults to 3600.
+        margin (``float``, *optional*):
+            The seconds before their expiry at which links are no longer served. Defaults to 60.
+        refresh_ahead (``float``, *optional*):
+            Refresh the links hit within this many seconds of their serving deadline.
+            Never by default.
+        max_entries (``int``, *optional*):
+            The maximum number of cached episodes. Defaults to 4096.
+        refresh_workers (``int``, *optional*):
+            The threads refreshing the links of an :obj:`-anikimiapi.AniKimi`. Defaults to 2.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.link_cache import LinkCache
+
+            links = LinkCache(ttl=1800, refresh_ahead=300)
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                link_cache=links
+            )
+            anime.get_episode_link_advanced(animeid="clannad-dub", episode_num=3)
+            anime.get_episode_link_advanced(animeid="clannad-dub", episode_num=3)  # cached
+            print(links.stats())
+    """
+    def __init__(
+            self,
+            ttl: float = 3600,
+            margin: float = 60,
+            refresh_ahead: float = None,
+            max_entries: int = 4096,
+            refresh_workers: int = 2,
+    ):
+        self.ttl = ttl
+        self.margin = margin
+        self.refresh_ahead = refresh_ahead
+        self.max_entries = max_entries
+        self.refresh_workers = refresh_workers
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.refreshes = 0
+        self._entries = OrderedDict()  # key -> (serve_until, {field: expires_at}, links tuple)
+        self._refreshing = set()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def expiries(self, links: MediaLinksObject, now: float = None) -> dict:
+        """The expiry of each link of ``links``, keyed by field, as ``time.time()`` timestamps."""
+        now = time.time() if now is None else now
+        expiries = {}
+        for name, url in zip(MediaLinksObject.__slots__, links.astuple()):
+            if url:
+                expires_at = link_expiry(url, now)
+                expiries[name] = expires_at if expires_at is not None else now + self.ttl
+        return expiries
+
+    def get(self, key: tuple):
+        """Get a copy of the cached links of ``key``, ``None`` on a miss or when they
+        are about to expire."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return MediaLinksObject(*entry[2])
+
+    def put(self, key: tuple, links: MediaLinksObject) -> None:
+        """Cache the links of ``key``, unless they are already about to expire."""
+        now = time.time()
+        expiries = self.expiries(links, now)
+        serve_until = min(expiries.values(), default=now + self.ttl) - self.margin
+        if serve_until <= now:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (serve_until, expiries, links.astuple())
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def claim_refresh(self, key: tuple) -> bool:
+        """Whether the links of ``key`` should be refreshed now: they are due for
+        ``refresh_ahead`` and no refresh of them is running. The caller then owns
+        the refresh until :meth:`release_refresh`."""
+        if self.refresh_ahead is None:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or key in self._refreshing or entry[0] - time.time() > self.refresh_ahead:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def release_refresh(self, key: tuple) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def refresh(self, key: tuple, resolve) -> None:
+        """Resolve the links of a claimed ``key`` again in a background thread,
+        ``resolve`` taking no argument and returning the new links."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def run():
+            try:
+                self.put(key, resolve())
+                with self._lock:
+                    self.refreshes += 1
+            except Exception:  # the current links stay until they expire
+                pass
+            finally:
+                self.release_refresh(key)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.refresh_workers, thread_name_prefix="anikimi-links")
+            executor = self._executor
+        executor.submit(run)
+
+    def clear(self) -> None:
+        """Drop every cached link, the counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def close(self) -> None:
+        """Stop the background refreshes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Get the cache counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "refreshes": self.refreshes,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
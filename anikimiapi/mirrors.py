@@ -0,0 +1,88 @@
+import re
+
+# a quoted url of a media file or a playlist, in the scripts or the tags of an embed page
+MEDIA_URL = re.compile(
+    r"""["'](?P<url>(?:https?:)?//[^"'\s<>]+?\.(?:m3u8|mp4|mkv|webm)(?:\?[^"'\s<>]*)?)["']"""
+)
+
+# mirror name -> extractor, see register_extractor
+EXTRACTORS = {}
+
+
+def extract_media_url(page_source: str, embed_url: str = None):
+    """The first media url quoted in an embed page, ``None`` if there is none.
+
+    The default extractor of the mirrors without one of their own, it finds the
+    ``.m3u8``, ``.mp4``, ``.mkv`` and ``.webm`` urls of the player setups and of the
+    ``<source>`` tags.
+    """
+    match = MEDIA_URL.search(page_source)
+    if match is None:
+        return None
+    url = match.group("url").replace("\\/", "/")
+    return f"https:{url}" if url.startswith("//") else url
+
+
+def register_extractor(name: str, extractor=None):
+    """Register the extractor of the mirror ``name``, replacing the default one.
+
+    An extractor is called with the source of the embed page and the embed url,
+    and returns the direct media url, or ``None`` if the page has none. The names
+    are the ones of :attr:`MirrorLink.name`, like ``"streamsb"`` or ``"mixdrop"``.
+    Can be used as a decorator.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi.mirrors import register_extractor
+
+            @register_extractor("doodstream")
+            def doodstream(page_source, embed_url):
+                ...
+    """
+    if extractor is None:
+        def decorator(extractor):
+            EXTRACTORS[name] = extractor
+            return extractor
+        return decorator
+    EXTRACTORS[name] = extractor
+    return extractor
+
+
+def get_extractor(name: str, extractors: dict = None):
+    """the extractor of the mirror ``name``, overridden by ``extractors``, ``None``
+    if the mirror is disabled there."""
+    if extractors is not None and name in extractors:
+        return extractors[name]
+    return EXTRACTORS.get(name, extract_media_url)
+
+
+class MirrorLink:
+    """The direct media url extracted from the embed page of a streaming mirror.
+
+    Parameters:
+        name (``str``):
+            The mirror, like ``"vidcdn"``, ``"streamsb"`` or ``"mixdrop"``.
+        embed_url (``str``):
+            The embed page of the mirror.
+        url (``str``):
+            The direct media url, ``None`` if it could not be extracted.
+        error (``Exception``):
+            Why ``url`` is ``None``: the ``NetworkError`` of the embed page, the
+            ``TimeoutError`` of the deadline, the ``LookupError`` of a page without
+            a media url, or the error of the extractor.
+        elapsed (``float``):
+            The seconds taken by the mirror.
+    """
+    __slots__ = ("name", "embed_url", "url", "error", "elapsed")
+
+    def __init__(self, name: str, embed_url: str, url: str = None, error: Exception = None, elapsed: float = 0.0):
+        self.name = name
+        self.embed_url = embed_url
+        self.url = url
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self) -> str:
+        result = self.url if self.error is None else f"error={self.error!r}"
+        return f"MirrorLink({self.name!r}, {result}, {self.elapsed:.3f}s)"
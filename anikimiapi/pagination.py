@@ -0,0 +1,181 @@
+import contextvars
+import math
+
+
+def submit_in_context(executor, function, *args):
+    """Submit ``function`` to ``executor`` to run in a copy of the current context,
+    so it sees the context variables of the caller, like the method its
+    instrumentation spans belong to."""
+    return executor.submit(contextvars.copy_context().run, function, *args)
+
+
+def _next_batch(collected: int, per_page: int, limit: int, next_page: int, last_page: int) -> range:
+    """the pages still needed to reach limit, within the known page count."""
+    needed = math.ceil((limit - collected) / max(per_page, 1))
+    return range(next_page, min(last_page, next_page + needed - 1) + 1)
+
+
+def paginate(fetch_page, parse_page, limit: int, workers: int = 4) -> list:
+    """Collect up to ``limit`` results from a paginated listing.
+
+    The first page is fetched alone to read the page count, then the remaining
+    pages are fetched concurrently, a batch of just the pages needed to reach
+    ``limit`` at a time. The results always keep the page order. Pagination on
+    the site only links a window of pages, so the page count is updated from
+    every page fetched and the engine keeps going until ``limit`` is reached or
+    no page is left.
+
+    Parameters:
+        fetch_page (``callable``):
+            Takes a page number (starting at 1) and returns the page.
+        parse_page (``callable``):
+            Takes a page and returns a ``(results, last_page)`` tuple,
+            like :meth:`-anikimiapi.parsers.SoupParser.listing`.
+        limit (``int``):
+            The maximum number of results to return.
+        workers (``int``, *optional*):
+            The maximum number of pages fetched at the same time. Defaults to 4.
+
+    Returns:
+        ``list``: The results of the pages, in page order.
+
+    The errors raised for the first page are propagated. An ``AttributeError``
+    from a later page, i.e. a page which is not a listing, ends the listing there.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    results, last_page = parse_page(fetch_page(1))
+    collected = results[:limit]
+    per_page = len(results)
+    next_page = 2
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while results and len(collected) < limit and next_page <= last_page:
+            batch = _next_batch(len(collected), per_page, limit, next_page, last_page)
+            futures = [submit_in_context(executor, fetch_page, page) for page in batch]
+            for future in futures:
+                page_source = future.result()
+                try:
+                    results, page_last = parse_page(page_source)
+                except AttributeError:
+                    results = []
+                if not results:
+                    break
+                last_page = max(last_page, page_last)
+                collected.extend(results[:limit - len(collected)])
+            next_page = batch.stop
+    return collected
+
+
+async def apaginate(fetch_page, parse_page, limit: int, workers: int = 4) -> list:
+    """The asyncio version of :func:`paginate`, ``fetch_page`` is a coroutine function."""
+    import asyncio
+
+    results, last_page = parse_page(await fetch_page(1))
+    collected = results[:limit]
+    per_page = len(results)
+    next_page = 2
+    semaphore = asyncio.Semaphore(workers)
+
+    async def fetch(page):
+        async with semaphore:
+            return await fetch_page(page)
+
+    while results and len(collected) < limit and next_page <= last_page:
+        batch = _next_batch(len(collected), per_page, limit, next_page, last_page)
+        sources = await asyncio.gather(*(fetch(page) for page in batch))
+        for page_source in sources:
+            try:
+                results, page_last = parse_page(page_source)
+            except AttributeError:
+                results = []
+            if not results:
+                break
+            last_page = max(last_page, page_last)
+            collected.extend(results[:limit - len(collected)])
+        next_page = batch.stop
+    return collected
+
+
+def iter_pages(fetch_page, parse_page, prefetch: bool = True):
+    """Lazily yield the results of a paginated listing, page after page.
+
+    Nothing is fetched before the first result is requested, and a page is only
+    fetched when the results of the previous one are being consumed, so the
+    caller can stop at any time. With ``prefetch``, the next page is fetched in
+    the background while the current one is being consumed.
+
+    Parameters:
+        fetch_page (``callable``):
+            Takes a page number (starting at 1) and returns the page.
+        parse_page (``callable``):
+            Takes a page and returns a ``(results, last_page)`` tuple.
+        prefetch (``bool``, *optional*):
+            Fetch one page ahead. Defaults to ``True``.
+
+    The errors raised for the first page are propagated. An ``AttributeError``
+    from a later page ends the listing there.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = 1
+        page_source = fetch_page(page)
+        last_page = 1
+        while True:
+            try:
+                results, page_last = parse_page(page_source)
+            except AttributeError:
+                if page == 1:
+                    raise
+                return
+            if not results:
+                return
+            last_page = max(last_page, page_last)
+            pending = None
+            if executor is not None and page < last_page:
+                pending = submit_in_context(executor, fetch_page, page + 1)
+            yield from results
+            if page >= last_page:
+                return
+            page += 1
+            page_source = pending.result() if pending is not None else fetch_page(page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+async def aiter_pages(fetch_page, parse_page, prefetch: bool = True):
+    """The asyncio version of :func:`iter_pages`, ``fetch_page`` is a coroutine function."""
+    import asyncio
+
+    page = 1
+    page_source = await fetch_page(page)
+    last_page = 1
+    pending = None
+    try:
+        while True:
+            try:
+                results, page_last = parse_page(page_source)
+            except AttributeError:
+                if page == 1:
+                    raise
+                return
+            if not results:
+                return
+            last_page = max(last_page, page_last)
+            if prefetch and page < last_page:
+                pending = asyncio.ensure_future(fetch_page(page + 1))
+            for result in results:
+                yield result
+            if page >= last_page:
+                return
+            page += 1
+            if pending is not None:
+                page_source = await pending
+                pending = None
+            else:
+                page_source = await fetch_page(page)
+    finally:
+        if pending is not None:
+            pending.cancel()
@@ -0,0 +1,505 @@
+from anikimiapi.data_classes import MediaInfoObject, MediaLinksObject, ResultObject
+from anikimiapi.instrumentation import timed_tree
+import re
+
+
+def _element_source(page_source: str, tag: str, attr: str, value: str):
+    """the outer html of the first ``tag`` element whose ``attr`` holds every token of
+    ``value``, ``None`` if there is no such element."""
+    tokens = value.split()
+    pattern = re.compile(
+        rf'<{tag}\b[^>]*?\b{attr}\s*=\s*(["\'])([^"\']*?(?<![\w-]){re.escape(tokens[0])}(?![\w-])[^"\']*)\1',
+        re.IGNORECASE,
+    )
+    start = None
+    for match in pattern.finditer(page_source):
+        if set(tokens) <= set(match.group(2).split()):
+            start = match
+            break
+    if start is None:
+        return None
+    depth = 0
+    for match in re.compile(rf'<(/?){tag}\b', re.IGNORECASE).finditer(page_source, start.start()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            end = page_source.find('>', match.end())
+            return page_source[start.start():end + 1 if end != -1 else len(page_source)]
+    return page_source[start.start():]  # never closed, the html parser will recover
+
+
+class BaseParser:
+    """The interface of the parser backends, which extract the api objects from the gogoanime pages.
+
+    A parser only works on page sources, it never touches the network, so the same
+    parser is shared by :obj:`-anikimiapi.AniKimi` and :obj:`-anikimiapi.AsyncAniKimi`.
+    Every method raises ``AttributeError`` (or ``TypeError``/``IndexError``) when the
+    page does not look like the expected one, the clients map those to the errors in
+    :mod:`anikimiapi.error_handlers`. Every backend gives identical results.
+
+    Backends only implement the tree access, the mapping of the link labels to the
+    :obj:`-anikimiapi.data_classes.MediaLinksObject` fields is shared here.
+
+    Parameters:
+        partial (``bool``, *optional*):
+            Only parse the elements each method needs instead of the whole page.
+            If a target element can't be located, the whole page is parsed.
+            Defaults to ``True``.
+    """
+    def __init__(self, partial: bool = True):
+        self.partial = partial
+
+    def _restrict(self, page_source: str, *targets) -> str:
+        """the source of the target elements, ``(tag, attr, value)`` tuples, or the whole page."""
+        if not self.partial or not targets:
+            return page_source
+        fragments = []
+        for tag, attr, value in targets:
+            fragment = _element_source(page_source, tag, attr, value)
+            if fragment is None:
+                return page_source
+            fragments.append(fragment)
+        return "".join(fragments)
+
+    @staticmethod
+    def _set_cf_download(links_final, q_name_raw: str, download_links: str) -> None:
+        q_name_raw_list = q_name_raw.strip().split('x')
+        quality_name = q_name_raw_list[1]  # 360, 720, 1080p links .just append to keyb lists with name and href
+        if quality_name == "360":
+            links_final.link_360p = download_links
+        elif quality_name == "480":
+            links_final.link_480p = download_links
+        elif quality_name == "720":
+            links_final.link_720p = download_links
+        elif quality_name == "1080":
+            links_final.link_1080p = download_links
+
+    @staticmethod
+    def _embed_url(video_links: str) -> str:
+        valid = video_links[0:4]
+        if valid == "http":
+            return video_links
+        return f"https:{video_links}"
+
+    @staticmethod
+    def _set_mirror(links_final, label: str, downlink: str) -> None:
+        quality_name = label.strip().split('C')[0]  # other links name quality
+        if quality_name == "Streamsb":
+            links_final.link_streamsb = downlink
+        elif quality_name == "Xstreamcdn":
+            links_final.link_xstreamcdn = downlink
+        elif quality_name == "Streamtape":
+            links_final.link_streamtape = downlink
+        elif quality_name == "Mixdrop":
+            links_final.link_mixdrop = downlink
+        elif quality_name == "Mp4Upload":
+            links_final.link_mp4upload = downlink
+        elif quality_name == "Doodstream":
+            links_final.link_doodstream = downlink
+
+    @staticmethod
+    def _set_download(links_final, str_: str, downlink: str) -> None:
+        str_spl = str_.split()
+        str_spl.remove(str_spl[0])
+        quality_name = "".join(str_spl)
+        if "(HDP-mp4)" in quality_name:
+            links_final.link_hdp = downlink
+        elif "(SDP-mp4)" in quality_name:
+            links_final.link_sdp = downlink
+        elif "(360P-mp4)" in quality_name:
+            links_final.link_360p = downlink
+        elif "(720P-mp4)" in quality_name:
+            links_final.link_720p = downlink
+        elif "(1080P-mp4)" in quality_name:
+            links_final.link_1080p = downlink
+        elif "Streamsb" in quality_name:
+            links_final.link_streamsb = downlink
+        elif "Xstreamcdn" in quality_name:
+            links_final.link_xstreamcdn = downlink
+        elif "Streamtape" in quality_name:
+            links_final.link_streamtape = downlink
+        elif "Mixdrop" in quality_name:
+            links_final.link_mixdrop = downlink
+        elif "Mp4Upload" in quality_name:
+            links_final.link_mp4upload = downlink
+        elif "Doodstream" in quality_name:
+            links_final.link_doodstream = downlink
+
+    @staticmethod
+    def _mirror_name(classes) -> str:
+        """the name of a mirror from the classes of its ``li``, a string or a list of them,
+        single spaced whatever the markup."""
+        if isinstance(classes, str):
+            classes = classes.split()
+        return " ".join(classes)
+
+    @staticmethod
+    def _hdp_link(hdp_js: str) -> str:
+        hdp_link_initial = re.search(r"(?P<url>https?://[^\s]+)", hdp_js).group("url")
+        hdp_link_initial_list = hdp_link_initial.split("'")
+        return hdp_link_initial_list[0]  # final hdp links
+
+    def search_results(self, page_source: str) -> list:
+        """Scrape the ``ResultObject`` list from a search or genre page."""
+        return self.listing(page_source)[0]
+
+    def listing(self, page_source: str):
+        """Scrape a page of a paginated listing, like the genre pages, in one pass.
+
+        Returns:
+            A ``(list, int)`` tuple, the ``ResultObject`` list of the page and the
+            highest page number linked from its pagination, ``1`` if it has none.
+        """
+        raise NotImplementedError
+
+    def details(self, page_source: str) -> MediaInfoObject:
+        """Scrape the ``MediaInfoObject`` from a ``category/{animeid}`` page."""
+        raise NotImplementedError
+
+    def anime_title(self, page_source: str) -> str:
+        """Get the title of a ``category/{animeid}`` page, used to validate the animeid."""
+        raise NotImplementedError
+
+    def episode_links(self, page_source: str):
+        """Scrape an episode page opened with the auth cookies.
+
+        Returns:
+            A ``(MediaLinksObject, list)`` tuple, the links found on the page and
+            the embed urls of every streaming mirror. ``link_hdp`` is resolved
+            from the first embed url with :meth:`embed_hdp_link`.
+        """
+        raise NotImplementedError
+
+    def mirrors(self, page_source: str) -> list:
+        """Scrape the streaming mirrors of an episode page.
+
+        Returns:
+            A list of ``(name, embed_url)`` tuples, the name being the class of the
+            mirror, like ``"vidcdn"`` or ``"streamsb"``, in the order of the page,
+            the embed urls being the ones returned by :meth:`episode_links`.
+        """
+        raise NotImplementedError
+
+    def embed_hdp_link(self, page_source: str) -> str:
+        """Extract the direct HDP stream from the embed page of the first mirror."""
+        raise NotImplementedError
+
+    def download_page_link(self, page_source: str) -> str:
+        """Get the url of the download page from an episode page."""
+        raise NotImplementedError
+
+    def download_links(self, page_source: str) -> MediaLinksObject:
+        """Scrape the ``MediaLinksObject`` from the download page of an episode."""
+        raise NotImplementedError
+
+    def airing(self, page_source: str) -> list:
+        """Scrape the currently airing anime from the front page."""
+        raise NotImplementedError
+
+    def airing_fragment(self, page_source: str):
+        """The source of the airing menu of the front page, which :meth:`airing` reads,
+        ``None`` if the page has none."""
+        return _element_source(page_source, "nav", "class", "menu_series cron")
+
+
+class SoupParser(BaseParser):
+    """The BeautifulSoup parser backend, the default one.
+
+    Parameters:
+        partial (``bool``, *optional*):
+            Only parse the elements each method needs. Defaults to ``True``.
+        features (``str``, *optional*):
+            The BeautifulSoup tree builder. Defaults to ``"lxml"``.
+    """
+    def __init__(self, partial: bool = True, features: str = "lxml"):
+        super().__init__(partial)
+        self.features = features
+
+    @timed_tree
+    def _soup(self, page_source: str, *targets):
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(self._restrict(page_source, *targets), self.features)
+
+    def listing(self, page_source: str):
+        soup = self._soup(page_source, ("ul", "class", "items"), ("ul", "class", "pagination-list"))
+        animes = soup.find("ul", {"class": "items"}).find_all("li")
+        results = []
+        for anime in animes:  # For every anime found
+            tit = anime.a["title"]
+            urll = anime.a["href"]
+            r = urll.split('/')
+            results.append(ResultObject(title=f"{tit}", animeid=f"{r[2]}"))
+        last_page = 1
+        pagination = soup.find("ul", {"class": "pagination-list"})
+        if pagination is not None:
+            for a in pagination.find_all("a"):
+                page = a.get("data-page")
+                if page and page.isdigit():
+                    last_page = max(last_page, int(page))
+        return results, last_page
+
+    def details(self, page_source: str) -> MediaInfoObject:
+        soup = self._soup(page_source, ("div", "class", "anime_info_body_bg"), ("ul", "id", "episode_page"))
+        source_url = soup.find("div", {"class": "anime_info_body_bg"}).img
+        imgg = source_url.get('src')
+        tit_url = soup.find("div", {"class": "anime_info_body_bg"}).h1.string
+        lis = soup.find_all('p', {"class": "type"})
+        plot_sum = lis[1]
+        pl = plot_sum.get_text().split(':')
+        pl.remove(pl[0])
+        plot_summary = "".join(pl)
+        type_of_show = lis[0].a['title']
+        genres = []
+        for link in lis[2].find_all('a'):
+            genres.append(link.get('title'))
+        year = lis[3].get_text().split(" ")[1]
+        status = lis[4].a.get_text()
+        oth_names = lis[5].get_text()
+        last_ep_range = soup.find(id="episode_page").find_all("li")[-1].a.get_text()
+        ep_num = last_ep_range.strip().split("-")[-1]
+        return MediaInfoObject(
+            title=f"{tit_url}",
+            year=int(year),
+            other_names=f"{oth_names}",
+            season=f"{type_of_show}",
+            status=f"{status}",
+            genres=genres,
+            episodes=int(ep_num),
+            image_url=f"{imgg}",
+            summary=f"{plot_summary}"
+        )
+
+    def anime_title(self, page_source: str) -> str:
+        soup = self._soup(page_source, ("div", "class", "anime_info_body_bg"), ("ul", "id", "episode_page"))
+        lnk = soup.find(id="episode_page")
+        lnk.find("li").a.get("ep_end")
+        title = soup.find("div", {"class": "anime_info_body_bg"}).h1.string
+        return None if title is None else str(title)
+
+    def episode_links(self, page_source: str):
+        soup = self._soup(page_source, ("div", "class", "cf-download"), ("div", "class", "anime_muti_link"))
+        links_final = MediaLinksObject()
+        for links in soup.find("div", {'class': 'cf-download'}).findAll('a'):
+            self._set_cf_download(links_final, links.text, links['href'])
+        anime_multi_link_initial = soup.find('div', {'class': 'anime_muti_link'}).findAll('li')
+        anime_multi_link_initial.remove(anime_multi_link_initial[0])
+        chumma_list = []
+        for l in anime_multi_link_initial:
+            chumma_list.append(self._embed_url(l.find('a')['data-video']))
+        anime_multi_link_initial.remove(anime_multi_link_initial[0])
+        for other_links in anime_multi_link_initial:
+            downlink = other_links.find('a')['data-video']  # video links other websites
+            self._set_mirror(links_final, other_links.text, downlink)
+        return links_final, chumma_list
+
+    def mirrors(self, page_source: str) -> list:
+        soup = self._soup(page_source, ("div", "class", "anime_muti_link"))
+        mirrors = soup.find('div', {'class': 'anime_muti_link'}).findAll('li')[1:]
+        return [(self._mirror_name(l.get('class', ())), self._embed_url(l.find('a')['data-video'])) for l in mirrors]
+
+    def embed_hdp_link(self, page_source: str) -> str:
+        s = self._soup(page_source)
+        t = s.findAll('script')
+        return self._hdp_link(t[2].string)
+
+    def download_page_link(self, page_source: str) -> str:
+        soup = self._soup(page_source, ("li", "class", "dowloads"))
+        source_url = soup.find("li", {"class": "dowloads"}).a
+        return source_url.get('href')
+
+    def download_links(self, page_source: str) -> MediaLinksObject:
+        soup = self._soup(page_source)
+        links_final = MediaLinksObject()
+        for dow_url in soup.findAll('div', {'class': 'dowload'}):
+            Url = dow_url.find('a')
+            self._set_download(links_final, Url.string, Url.get('href'))
+        return links_final
+
+    def airing(self, page_source: str) -> list:
+        soup = self._soup(page_source, ("nav", "class", "menu_series cron"))
+        anime = soup.find("nav", {"class": "menu_series cron"}).find("ul")
+        air = []
+        for link in anime.find_all('a'):
+            airing_link = link.get('href')
+            name = link.get('title')  # name of the anime
+            link = airing_link.split('/')
+            lnk_final = link[2]  # animeid of anime
+            air.append(ResultObject(title=f"{name}", animeid=f"{lnk_final}"))
+        return air
+
+
+def _class(name: str) -> str:
+    """xpath predicate matching a class token, like BeautifulSoup does."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _first(elements):
+    """the first element found, raising AttributeError when nothing was found,
+    like accessing an attribute of a ``None`` BeautifulSoup result."""
+    if not elements:
+        raise AttributeError("element not found")
+    return elements[0]
+
+
+def _subscript(element, attribute: str) -> str:
+    """``element[attribute]`` with the errors of BeautifulSoup."""
+    if element is None:
+        raise TypeError("'NoneType' object is not subscriptable")
+    return element.attrib[attribute]
+
+
+def _string(element):
+    """the ``.string`` of a BeautifulSoup tag: its text if it has a single child, else ``None``."""
+    if len(element) == 0:
+        return element.text
+    if len(element) == 1 and not element.text and not element[0].tail:
+        return _string(element[0])
+    return None
+
+
+class LxmlParser(BaseParser):
+    """The lxml parser backend, which walks the tree with XPath queries from C.
+
+    Noticeably faster than :class:`SoupParser` and gives identical results.
+
+    Parameters:
+        partial (``bool``, *optional*):
+            Only parse the elements each method needs. Defaults to ``True``.
+    """
+
+    @timed_tree
+    def _tree(self, page_source: str, *targets):
+        import lxml.etree
+        import lxml.html
+
+        try:
+            return lxml.html.document_fromstring(self._restrict(page_source, *targets))
+        except lxml.etree.ParserError:  # empty document
+            raise AttributeError("empty page")
+
+    def listing(self, page_source: str):
+        tree = self._tree(page_source, ("ul", "class", "items"), ("ul", "class", "pagination-list"))
+        items = _first(tree.xpath(f"//ul[{_class('items')}]"))
+        results = []
+        for anime in items.iter("li"):  # For every anime found
+            a = next(anime.iter("a"), None)
+            tit = _subscript(a, "title")
+            urll = _subscript(a, "href")
+            r = urll.split('/')
+            results.append(ResultObject(title=f"{tit}", animeid=f"{r[2]}"))
+        last_page = 1
+        for page in tree.xpath(f"(//ul[{_class('pagination-list')}])[1]//a/@data-page"):
+            if page and page.isdigit():
+                last_page = max(last_page, int(page))
+        return results, last_page
+
+    def details(self, page_source: str) -> MediaInfoObject:
+        tree = self._tree(page_source, ("div", "class", "anime_info_body_bg"), ("ul", "id", "episode_page"))
+        info = _first(tree.xpath(f"//div[{_class('anime_info_body_bg')}]"))
+        imgg = _first(info.xpath(".//img")).get('src')
+        tit_url = _string(_first(info.xpath(".//h1")))
+        lis = tree.xpath(f"//p[{_class('type')}]")
+        pl = lis[1].text_content().split(':')
+        pl.remove(pl[0])
+        plot_summary = "".join(pl)
+        type_of_show = _subscript(next(lis[0].iter("a"), None), 'title')
+        genres = [link.get('title') for link in lis[2].xpath(".//a")]
+        year = lis[3].text_content().split(" ")[1]
+        status = _first(lis[4].xpath(".//a")).text_content()
+        oth_names = lis[5].text_content()
+        episode_page = _first(tree.xpath("//*[@id='episode_page']"))
+        last_li = list(episode_page.iter("li"))[-1]
+        last_ep_range = _first(last_li.xpath(".//a")).text_content()
+        ep_num = last_ep_range.strip().split("-")[-1]
+        return MediaInfoObject(
+            title=f"{tit_url}",
+            year=int(year),
+            other_names=f"{oth_names}",
+            season=f"{type_of_show}",
+            status=f"{status}",
+            genres=genres,
+            episodes=int(ep_num),
+            image_url=f"{imgg}",
+            summary=f"{plot_summary}"
+        )
+
+    def anime_title(self, page_source: str) -> str:
+        tree = self._tree(page_source, ("div", "class", "anime_info_body_bg"), ("ul", "id", "episode_page"))
+        episode_page = _first(tree.xpath("//*[@id='episode_page']"))
+        _first(_first(episode_page.xpath(".//li")).xpath(".//a")).get("ep_end")
+        info = _first(tree.xpath(f"//div[{_class('anime_info_body_bg')}]"))
+        return _string(_first(info.xpath(".//h1")))
+
+    def episode_links(self, page_source: str):
+        tree = self._tree(page_source, ("div", "class", "cf-download"), ("div", "class", "anime_muti_link"))
+        links_final = MediaLinksObject()
+        cf_download = _first(tree.xpath(f"//div[{_class('cf-download')}]"))
+        for links in cf_download.iter("a"):
+            self._set_cf_download(links_final, links.text_content(), links.attrib['href'])
+        muti_link = _first(tree.xpath(f"//div[{_class('anime_muti_link')}]"))
+        anime_multi_link_initial = list(muti_link.iter("li"))
+        anime_multi_link_initial.remove(anime_multi_link_initial[0])
+        chumma_list = []
+        for l in anime_multi_link_initial:
+            chumma_list.append(self._embed_url(_subscript(next(l.iter("a"), None), 'data-video')))
+        anime_multi_link_initial.remove(anime_multi_link_initial[0])
+        for other_links in anime_multi_link_initial:
+            downlink = _subscript(next(other_links.iter("a"), None), 'data-video')
+            self._set_mirror(links_final, other_links.text_content(), downlink)
+        return links_final, chumma_list
+
+    def mirrors(self, page_source: str) -> list:
+        tree = self._tree(page_source, ("div", "class", "anime_muti_link"))
+        muti_link = _first(tree.xpath(f"//div[{_class('anime_muti_link')}]"))
+        return [
+            (self._mirror_name(l.get('class', '')), self._embed_url(_subscript(next(l.iter("a"), None), 'data-video')))
+            for l in list(muti_link.iter("li"))[1:]
+        ]
+
+    def embed_hdp_link(self, page_source: str) -> str:
+        t = list(self._tree(page_source).iter("script"))
+        return self._hdp_link(_string(t[2]))
+
+    def download_page_link(self, page_source: str) -> str:
+        tree = self._tree(page_source, ("li", "class", "dowloads"))
+        li = _first(tree.xpath(f"//li[{_class('dowloads')}]"))
+        return _first(li.xpath(".//a")).get('href')
+
+    def download_links(self, page_source: str) -> MediaLinksObject:
+        links_final = MediaLinksObject()
+        for dow_url in self._tree(page_source).xpath(f"//div[{_class('dowload')}]"):
+            Url = _first(dow_url.xpath(".//a"))
+            self._set_download(links_final, _string(Url), Url.get('href'))
+        return links_final
+
+    def airing(self, page_source: str) -> list:
+        tree = self._tree(page_source, ("nav", "class", "menu_series cron"))
+        nav = _first(tree.xpath("//nav[@class='menu_series cron']"))
+        anime = _first(nav.xpath(".//ul"))
+        air = []
+        for link in anime.iter("a"):
+            airing_link = link.get('href')
+            name = link.get('title')  # name of the anime
+            link = airing_link.split('/')
+            lnk_final = link[2]  # animeid of anime
+            air.append(ResultObject(title=f"{name}", animeid=f"{lnk_final}"))
+        return air
+
+
+PARSERS = {
+    "soup": SoupParser,
+    "lxml": LxmlParser,
+}
+
+
+def get_parser(parser=None) -> BaseParser:
+    """Get a parser backend from its name in :data:`PARSERS`, ``None`` for the default
+    :class:`SoupParser`. A :class:`BaseParser` instance is returned as is."""
+    if parser is None:
+        return SoupParser()
+    if isinstance(parser, BaseParser):
+        return parser
+    try:
+        return PARSERS[parser]()
+    except KeyError:
+        raise ValueError(f"Unknown parser {parser!r}, use one of {', '.join(PARSERS)}")
@@ -0,0 +1,267 @@
+import queue
+import threading
+from anikimiapi.data_classes import MediaInfoObject, ResultObject
+from anikimiapi.error_handlers import InvalidAnimeIdError, InvalidGenreNameError, NetworkError
+from anikimiapi.instrumentation import _trees
+from anikimiapi.pagination import _next_batch
+from anikimiapi.transport import network_errors
+
+# the end of a stage
+_DONE = object()
+
+# the parser of a worker process, see _init_worker
+_parser = None
+
+
+def _slim_listing(result):
+    results, last_page = result
+    return tuple(anime.astuple() for anime in results), last_page
+
+
+def _fat_listing(slim):
+    rows, last_page = slim
+    return [ResultObject(*row) for row in rows], last_page
+
+
+# phase -> (to the slim tuples sent back by the workers, from them)
+PHASES = {
+    "details": (MediaInfoObject.astuple, lambda row: MediaInfoObject(*row)),
+    "listing": (_slim_listing, _fat_listing),
+    "search_results": (lambda results: tuple(anime.astuple() for anime in results),
+                       lambda rows: [ResultObject(*row) for row in rows]),
+    "airing": (lambda results: tuple(anime.astuple() for anime in results),
+               lambda rows: [ResultObject(*row) for row in rows]),
+}
+
+
+def _init_worker(parser) -> None:
+    global _parser
+    _parser = parser
+
+
+def _parse_in_worker(phase: str, data: bytes):
+    """parse a page in a worker process, returns the slim tuples of the result and the
+    time spent building its tree."""
+    trees = []
+    token = _trees.set(trees)
+    try:
+        return PHASES[phase][0](getattr(_parser, phase)(data.decode("utf-8"))), sum(trees)
+    finally:
+        _trees.reset(token)
+
+
+def _in_worker(pool, phase: str):
+    """a parse running the parser method ``phase`` in a worker of ``pool``, for
+    the ``_parse`` of the client."""
+    def parse(page_source: str):
+        slim, tree_time = pool.submit(_parse_in_worker, phase, page_source.encode("utf-8")).result()
+        trees = _trees.get()
+        if trees is not None:  # instrumented, the tree was built in the worker
+            trees.append(tree_time)
+        return PHASES[phase][1](slim)
+    return parse
+
+
+class Pipeline:
+    """Runs the bulk jobs of a client with the fetching and the parsing split, the
+    pages being parsed by a pool of processes.
+
+    Once the pages are fetched in parallel, a bulk job is bound by parsing, which
+    holds the GIL: the threads of :meth:`-anikimiapi.AniKimi.get_by_genres` end up
+    waiting on each other. Here, ``fetchers`` threads fetch the pages through the
+    client (its cache, scheduler, retries and mirrors included) and hand over their
+    bytes to ``processes`` worker processes, which parse them with the parser of the
+    client and send back slim tuples, turned into the api objects again. The pages
+    go through the parse of the client all the same, so the results parsed from a
+    cached page are reused and the parses are reported to its instrumentation.
+    When the parsers fall behind, the fetchers wait for them, and when the caller
+    stops consuming the results, everything waits, so a crawl of any size runs in
+    constant memory.
+
+    Parameters:
+        client (:obj:`-anikimiapi.AniKimi`):
+            The client fetching the pages.
+        fetchers (``int``, *optional*):
+            The threads fetching the pages. Defaults to 8.
+        processes (``int``, *optional*):
+            The worker processes parsing them. Defaults to the number of CPUs.
+        queue_size (``int``, *optional*):
+            The results waiting for the caller, at most, each fetcher holding one
+            page at most. Defaults to twice the ``processes``.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.pipeline import Pipeline
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+            with Pipeline(anime, fetchers=16) as pipeline:
+                results = pipeline.get_by_genres("action", limit=2000)
+                for animeid, details in pipeline.get_details(result.animeid for result in results):
+                    print(animeid, details)
+    """
+    def __init__(self, client, fetchers: int = 8, processes: int = None, queue_size: int = None):
+        import os
+
+        self.client = client
+        self.fetchers = fetchers
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.processes
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._pool = ProcessPoolExecutor(
+                    self.processes, initializer=_init_worker, initargs=(self.client.parser,),
+                )
+            return self._pool
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, jobs):
+        """Fetch and parse pages, yielding the results as soon as they are parsed.
+
+        Parameters:
+            jobs (``iterable``):
+                ``(key, url, route, phase)`` tuples: the page ``url`` is fetched as a
+                page of the ``route`` of the client, and parsed by its parser method
+                ``phase``, one of :data:`PHASES`. The iterable is consumed lazily.
+
+        Yields:
+            ``(key, result)`` tuples, not in the order of the jobs, where ``result``
+            is the parsed result, or the exception raised fetching or parsing.
+        """
+        pool = self._executor()
+        results = queue.Queue()  # parsed results, bounded by the slots
+        slots = threading.BoundedSemaphore(self.queue_size)  # results waiting for the caller
+        stopped = threading.Event()
+        jobs = iter(jobs)
+        jobs_lock = threading.Lock()
+        running = self.fetchers
+
+        def fetch():
+            nonlocal running
+            try:
+                while not stopped.is_set():
+                    with jobs_lock:
+                        job = next(jobs, _DONE)
+                    if job is _DONE:
+                        break
+                    key, url, route, phase = job
+                    try:
+                        page = self.client._get(url, route)
+                        result = self.client._parse(phase, page, _in_worker(pool, phase))
+                    except Exception as error:  # a RuntimeError once the pool is shut down
+                        result = error
+                    while not slots.acquire(timeout=0.1):
+                        if stopped.is_set():
+                            return
+                    results.put((key, result))
+            finally:
+                with jobs_lock:
+                    running -= 1
+                    if not running:
+                        results.put(_DONE)
+
+        threads = [threading.Thread(target=fetch, name=f"anikimi-fetch-{i}", daemon=True)
+                   for i in range(self.fetchers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    return
+                slots.release()
+                yield item
+        finally:
+            stopped.set()
+            for thread in threads:
+                thread.join()
+
+    def get_details(self, animeids):
+        """Get the details of many anime, see :meth:`-anikimiapi.AniKimi.get_details`.
+
+        Parameters:
+            animeids (``iterable`` of ``str``):
+                The animeids, consumed lazily.
+
+        Yields:
+            ``(animeid, result)`` tuples, not in order, where ``result`` is a
+            :obj:`-anikimiapi.data_classes.MediaInfoObject` on success, or the
+            ``InvalidAnimeIdError`` or ``NetworkError`` of that anime.
+        """
+        host = self.client.host
+        catalog = self.client.catalog
+        jobs = ((animeid, f'{host}category/{animeid}', "category", "details") for animeid in animeids)
+        for animeid, result in self.run(jobs):
+            if isinstance(result, AttributeError):
+                result = InvalidAnimeIdError(f"Invalid animeid {animeid} given")
+            elif isinstance(result, network_errors()):
+                result = NetworkError("Unable to connect to the Server, Check your connection")
+            elif catalog is not None and not isinstance(result, Exception):
+                catalog.add_details(animeid, result)
+            yield animeid, result
+
+    def get_by_genres(self, genre_name: str, limit: int = 60) -> list:
+        """Get anime by genres, see :meth:`-anikimiapi.AniKimi.get_by_genres`.
+
+        The first page is fetched to read the page count, then the pages needed to
+        reach ``limit`` go through the pipeline, and the results are put back in
+        page order.
+
+        Raises:
+            ``InvalidGenreNameError``: If the genre_name is invalid.
+            ``NetworkError``: If a page could not be fetched.
+        """
+        url = f"{self.client.host}genre/{genre_name}?page="
+
+        def listings(pages):
+            parsed = dict(self.run((page, f'{url}{page}', "genre", "listing") for page in pages))
+            return [parsed[page] for page in pages]
+
+        first = listings(range(1, 2))[0]
+        if isinstance(first, (AttributeError, KeyError)):
+            raise InvalidGenreNameError("Invalid genre_name or page_num")
+        if isinstance(first, Exception):
+            raise NetworkError("Unable to connect to server")
+        results, last_page = first
+        collected = results[:limit]
+        per_page = len(results)
+        next_page = 2
+        while results and len(collected) < limit and next_page <= last_page:
+            batch = _next_batch(len(collected), per_page, limit, next_page, last_page)
+            for listing in listings(batch):
+                if isinstance(listing, AttributeError):
+                    results = []
+                elif isinstance(listing, Exception):
+                    raise NetworkError("Unable to connect to server")
+                else:
+                    results, page_last = listing
+                    last_page = max(last_page, page_last)
+                if not results:
+                    break
+                collected.extend(results[:limit - len(collected)])
+            next_page = batch.stop
+        if self.client.catalog is not None:
+            self.client.catalog.add_results(collected)
+        return collected
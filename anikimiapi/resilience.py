@@ -0,0 +1,183 @@
+from collections import deque
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+from anikimiapi.error_handlers import CircuitOpenError
+
+
+class RetryPolicy:
+    """Retries the requests which fail to connect, time out or get a transient status.
+
+    The ``n``-th retry waits a random time between 0 and ``backoff * 2 ** n``
+    seconds ("full jitter"), capped at ``max_backoff``, or the ``Retry-After``
+    of the response if it is longer.
+
+    Parameters:
+        retries (``int``, *optional*):
+            The maximum number of retries of a request. Defaults to 2.
+        backoff (``float``, *optional*):
+            The base of the backoff, in seconds. Defaults to 0.25.
+        max_backoff (``float``, *optional*):
+            The maximum time to wait before a retry, in seconds. Defaults to 5.
+        statuses (``tuple``, *optional*):
+            The response statuses retried. Defaults to 429, 500, 502, 503 and 504.
+    """
+    def __init__(
+            self,
+            retries: int = 2,
+            backoff: float = 0.25,
+            max_backoff: float = 5.0,
+            statuses: tuple = (429, 500, 502, 503, 504),
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.retried = 0
+
+    def delay(self, attempt: int, retry_after=None) -> float:
+        """The seconds to wait before the retry following the ``attempt``-th try, from 0."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        try:
+            return max(delay, min(self.max_backoff, float(retry_after)))
+        except (TypeError, ValueError):
+            return delay
+
+
+class HedgePolicy:
+    """Sends a second, identical request when the first is slower than most.
+
+    The latencies of the last ``window`` responses of each host are kept, and
+    once a request has taken longer than their ``percentile``, a duplicate is
+    sent and the first response of the two is used. Until ``min_samples``
+    responses are known, requests are not hedged.
+
+    Parameters:
+        percentile (``float``, *optional*):
+            The latency percentile after which a request is hedged. Defaults to 95.
+        window (``int``, *optional*):
+            The number of recent latencies kept per host. Defaults to 200.
+        min_samples (``int``, *optional*):
+            The number of latencies needed to start hedging. Defaults to 20.
+        min_delay (``float``, *optional*):
+            Never hedge before this many seconds. Defaults to 0.05.
+        max_workers (``int``, *optional*):
+            The threads sending the hedged requests of a :obj:`-anikimiapi.transport.Transport`.
+            Defaults to 16.
+    """
+    def __init__(
+            self,
+            percentile: float = 95,
+            window: int = 200,
+            min_samples: int = 20,
+            min_delay: float = 0.05,
+            max_workers: int = 16,
+    ):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def observe(self, url: str, seconds: float) -> None:
+        """Record the latency of a response."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            latencies = self._latencies.get(host)
+            if latencies is None:
+                latencies = self._latencies[host] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def delay(self, url: str):
+        """The seconds after which a request to ``url`` is hedged, ``None`` to not hedge it."""
+        with self._lock:
+            latencies = self._latencies.get(urlsplit(url).netloc)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(self.min_delay, ordered[index])
+
+
+class CircuitBreaker:
+    """Fails fast the requests to a host which keeps failing.
+
+    After ``failure_threshold`` consecutive failures (connection errors,
+    timeouts and ``5xx`` responses) to a host, the circuit of the host opens
+    and its requests raise :obj:`-anikimiapi.error_handlers.CircuitOpenError`
+    without being sent. After ``reset_timeout`` seconds, a single request goes
+    through: if it succeeds the circuit closes, else it opens again. A request
+    which never reports back does not hold the circuit half-open: another one
+    goes through ``reset_timeout`` seconds later.
+
+    Parameters:
+        failure_threshold (``int``, *optional*):
+            The consecutive failures which open the circuit. Defaults to 5.
+        reset_timeout (``float``, *optional*):
+            The seconds before a request is let through an open circuit. Defaults to 30.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}  # host -> [state, consecutive failures, opened at]
+        self._lock = threading.Lock()
+
+    def _circuit(self, url: str) -> list:
+        host = urlsplit(url).netloc
+        circuit = self._hosts.get(host)
+        if circuit is None:
+            circuit = self._hosts[host] = [self.CLOSED, 0, 0.0]
+        return circuit
+
+    def check(self, url: str) -> None:
+        """Let a request to ``url`` through, or raise ``CircuitOpenError``."""
+        with self._lock:
+            circuit = self._circuit(url)
+            if circuit[0] == self.CLOSED:
+                return
+            now = time.monotonic()
+            remaining = circuit[2] + self.reset_timeout - now
+            if remaining <= 0:
+                # a probe which never reported back is given up after reset_timeout too
+                circuit[0] = self.HALF_OPEN
+                circuit[2] = now
+                return
+        raise CircuitOpenError(
+            f"{urlsplit(url).netloc} is failing, not retrying it for {max(remaining, 0):.0f}s"
+        )
+
+    def success(self, url: str) -> None:
+        with self._lock:
+            circuit = self._circuit(url)
+            circuit[0] = self.CLOSED
+            circuit[1] = 0
+
+    def failure(self, url: str) -> None:
+        with self._lock:
+            circuit = self._circuit(url)
+            circuit[1] += 1
+            if circuit[0] == self.HALF_OPEN or circuit[1] >= self.failure_threshold:
+                circuit[0] = self.OPEN
+                circuit[2] = time.monotonic()
+
+    def state(self, url: str) -> str:
+        """The state of the circuit of the host of ``url``: ``"closed"``, ``"open"`` or ``"half-open"``."""
+        with self._lock:
+            return self._circuit(url)[0]
+
+    def stats(self) -> dict:
+        """The state and the consecutive failures of every host, keyed by host."""
+        with self._lock:
+            return {
+                host: {"state": state, "failures": failures}
+                for host, (state, failures, _) in self._hosts.items()
+            }
@@ -0,0 +1,251 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class _Host:
+    """the limits and counters of one host."""
+    __slots__ = (
+        "rate", "concurrency", "tokens", "updated", "in_flight", "queued",
+        "paused_until", "last_decrease", "requests", "throttled", "slow",
+        "errors", "max_queued", "wait_total", "wait_max",
+    )
+
+    def __init__(self, rate: float, concurrency: int, burst: float):
+        self.rate = rate
+        self.concurrency = float(concurrency)
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.queued = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.slow = 0
+        self.errors = 0
+        self.max_queued = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class Scheduler:
+    """A per-host rate limiter and concurrency limiter, adapting to the host.
+
+    Every request waits for a token of its host's token bucket, refilled at
+    ``rate`` tokens per second, and for one of the ``max_in_flight`` request
+    slots of the host. Both limits adapt AIMD-style: a ``429``/``503`` response,
+    or a response slower than ``slow_after`` seconds, multiplies the rate and
+    the slots by ``decrease`` (at most once per ``cooldown`` seconds), and each
+    other response raises them back slowly, by about ``increase`` requests per
+    second each second and one slot per window of responses, up to
+    ``max_rate`` and ``max_in_flight``. A ``Retry-After`` header pauses the host.
+
+    The scheduler is thread-safe and works for both :obj:`-anikimiapi.AniKimi`
+    and :obj:`-anikimiapi.AsyncAniKimi`.
+
+    Parameters:
+        rate (``float``, *optional*):
+            The initial requests per second per host. Defaults to 10.
+        burst (``float``, *optional*):
+            The size of the token buckets, the number of requests which can be sent
+            at once after an idle time. Defaults to ``rate``.
+        max_in_flight (``int``, *optional*):
+            The maximum number of requests in flight per host. Defaults to 8.
+        min_rate (``float``, *optional*):
+            The rate never goes below this. Defaults to 0.5.
+        max_rate (``float``, *optional*):
+            The rate never goes above this, the additive increase ramps up to it
+            while the host keeps up. Defaults to 4 times ``rate``.
+        slow_after (``float``, *optional*):
+            The response time, in seconds, above which the host is considered
+            overloaded. Defaults to 5.
+        increase (``float``, *optional*):
+            The additive increase, in requests per second per second. Defaults to 0.5.
+        decrease (``float``, *optional*):
+            The multiplicative decrease. Defaults to 0.5.
+        cooldown (``float``, *optional*):
+            The minimum time between two decreases, in seconds. Defaults to 1.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.scheduler import Scheduler
+
+            scheduler = Scheduler(rate=5, max_in_flight=4)
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI",
+                scheduler=scheduler
+            )
+            anime.get_by_genres(genre_name="romance", limit=600, workers=8)
+            print(scheduler.stats())
+    """
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(
+            self,
+            rate: float = 10.0,
+            burst: float = None,
+            max_in_flight: int = 8,
+            min_rate: float = 0.5,
+            max_rate: float = None,
+            slow_after: float = 5.0,
+            increase: float = 0.5,
+            decrease: float = 0.5,
+            cooldown: float = 1.0,
+    ):
+        self.rate = rate
+        self.burst = max(1.0, rate if burst is None else burst)
+        self.max_in_flight = max_in_flight
+        self.min_rate = min_rate
+        self.max_rate = 4 * rate if max_rate is None else max_rate
+        self.slow_after = slow_after
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._hosts = {}
+        self._condition = threading.Condition()
+
+    def _host(self, url: str) -> _Host:
+        """the state of the host of ``url``, the lock must be held."""
+        name = urlsplit(url).netloc
+        host = self._hosts.get(name)
+        if host is None:
+            host = self._hosts[name] = _Host(self.rate, self.max_in_flight, self.burst)
+        return host
+
+    def _take(self, host: _Host, now: float):
+        """take a token and a slot of ``host``: ``0`` when done, else the seconds to
+        wait for a token, or ``None`` to wait for a slot. The lock must be held."""
+        if now < host.paused_until:
+            return host.paused_until - now
+        host.tokens = min(self.burst, host.tokens + (now - host.updated) * host.rate)
+        host.updated = now
+        if host.in_flight >= int(host.concurrency):
+            return None
+        if host.tokens < 1:
+            return (1 - host.tokens) / host.rate
+        host.tokens -= 1
+        host.in_flight += 1
+        return 0
+
+    def _queue(self, host: _Host) -> None:
+        host.queued += 1
+        host.max_queued = max(host.max_queued, host.queued)
+
+    def _dequeue(self, host: _Host, waited: float) -> None:
+        host.queued -= 1
+        host.wait_total += waited
+        host.wait_max = max(host.wait_max, waited)
+
+    def acquire(self, url: str) -> float:
+        """Wait until a request to the host of ``url`` can be sent, and count it in flight.
+
+        Every :meth:`acquire` must be followed by a :meth:`release`.
+
+        Returns:
+            ``float``: The seconds waited.
+        """
+        start = time.monotonic()
+        with self._condition:
+            host = self._host(url)
+            self._queue(host)
+            try:
+                wait = self._take(host, start)
+                while wait != 0:
+                    self._condition.wait(wait)
+                    wait = self._take(host, time.monotonic())
+            finally:
+                waited = time.monotonic() - start
+                self._dequeue(host, waited)
+        return waited
+
+    async def acquire_async(self, url: str) -> float:
+        """The asyncio counterpart of :meth:`acquire`, the slots are polled every 10ms."""
+        import asyncio
+
+        start = time.monotonic()
+        with self._condition:
+            host = self._host(url)
+            self._queue(host)
+        try:
+            while True:
+                with self._condition:
+                    wait = self._take(host, time.monotonic())
+                if wait == 0:
+                    break
+                await asyncio.sleep(0.01 if wait is None else wait)
+        finally:
+            waited = time.monotonic() - start
+            with self._condition:
+                self._dequeue(host, waited)
+        return waited
+
+    def release(self, url: str, status: int = None, elapsed: float = None, retry_after=None) -> None:
+        """Release the slot taken by :meth:`acquire`, and adapt the limits of the host.
+
+        Parameters:
+            url (``str``):
+                The url requested.
+            status (``int``, *optional*):
+                The status of the response, ``None`` if the request failed.
+            elapsed (``float``, *optional*):
+                The response time, in seconds.
+            retry_after (``str`` | ``float``, *optional*):
+                The ``Retry-After`` header of the response, in seconds.
+        """
+        with self._condition:
+            host = self._host(url)
+            now = time.monotonic()
+            host.in_flight -= 1
+            host.requests += 1
+            if status is None:
+                host.errors += 1
+            elif status in self.THROTTLE_STATUSES:
+                host.throttled += 1
+                self._decrease(host, now)
+                try:
+                    host.paused_until = max(host.paused_until, now + float(retry_after))
+                except (TypeError, ValueError):
+                    pass
+            elif elapsed is not None and elapsed > self.slow_after:
+                host.slow += 1
+                self._decrease(host, now)
+            else:
+                host.rate = min(self.max_rate, host.rate + self.increase / host.rate)
+                host.concurrency = min(self.max_in_flight, host.concurrency + 1 / host.concurrency)
+            self._condition.notify_all()
+
+    def _decrease(self, host: _Host, now: float) -> None:
+        if now - host.last_decrease < self.cooldown:
+            return
+        host.last_decrease = now
+        host.rate = max(self.min_rate, host.rate * self.decrease)
+        host.concurrency = max(1.0, host.concurrency * self.decrease)
+        host.tokens = min(host.tokens, 0.0)
+
+    def stats(self) -> dict:
+        """Get the current limits and the counters of every host, keyed by host.
+
+        ``queued`` is the number of requests waiting now, ``wait_mean`` and
+        ``wait_max`` the time the requests waited, in seconds.
+        """
+        with self._condition:
+            return {
+                name: {
+                    "rate": round(host.rate, 3),
+                    "concurrency": int(host.concurrency),
+                    "in_flight": host.in_flight,
+                    "queued": host.queued,
+                    "max_queued": host.max_queued,
+                    "requests": host.requests,
+                    "throttled": host.throttled,
+                    "slow": host.slow,
+                    "errors": host.errors,
+                    "wait_mean": host.wait_total / host.requests if host.requests else 0.0,
+                    "wait_max": host.wait_max,
+                }
+                for name, host in self._hosts.items()
+            }
@@ -0,0 +1,117 @@
+"""Bulk encoding and decoding of the api objects.
+
+Lists of :obj:`-anikimiapi.data_classes.ResultObject`,
+:obj:`-anikimiapi.data_classes.MediaInfoObject` or
+:obj:`-anikimiapi.data_classes.MediaLinksObject` can be converted to plain
+dicts, JSON lines or msgpack. The JSON functions use ``orjson`` when it is
+installed, the msgpack ones need ``msgpack`` (``pip3 install anikimiapi[msgpack]``).
+
+Example:
+    .. code-block:: python
+
+        from anikimiapi.data_classes import ResultObject
+        from anikimiapi import serialization
+
+        with open("catalog.jsonl", "w") as fp:
+            serialization.dump_jsonl(results, fp)
+
+        with open("catalog.jsonl") as fp:
+            results = serialization.load_jsonl(fp, ResultObject)
+
+        data = serialization.packb(results)
+        results = serialization.unpackb(data, ResultObject)
+"""
+import json
+
+
+def to_dicts(objects) -> list:
+    """Convert api objects to a list of dicts."""
+    return [obj.to_dict() for obj in objects]
+
+
+def from_dicts(dicts, cls) -> list:
+    """Build a list of ``cls`` objects from dicts, see :meth:`to_dicts`."""
+    from_dict = cls.from_dict
+    return [from_dict(data) for data in dicts]
+
+
+def to_rows(objects) -> list:
+    """Convert api objects to a list of tuples of their field values, the most compact form."""
+    return [obj.astuple() for obj in objects]
+
+
+def from_rows(rows, cls) -> list:
+    """Build a list of ``cls`` objects from the rows of :meth:`to_rows`."""
+    return [cls(*row) for row in rows]
+
+
+def _json_line():
+    """a function encoding a dict to a line of JSON, ``str`` with the newline."""
+    try:
+        import orjson
+    except ImportError:
+        encoder = json.JSONEncoder(ensure_ascii=False)
+        return lambda data: encoder.encode(data) + "\n"
+    option = orjson.OPT_APPEND_NEWLINE
+    return lambda data: orjson.dumps(data, option=option).decode()
+
+
+def _json_loads():
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+def dump_jsonl(objects, fp) -> int:
+    """Write api objects to a text file, one JSON object per line.
+
+    Returns:
+        ``int``: The number of objects written.
+    """
+    line = _json_line()
+    count = 0
+    batch = []
+    for obj in objects:
+        batch.append(line(obj.to_dict()))
+        if len(batch) == 1024:
+            fp.writelines(batch)
+            count += len(batch)
+            batch.clear()
+    fp.writelines(batch)
+    count += len(batch)
+    return count
+
+
+def iter_jsonl(fp, cls):
+    """Lazily read the ``cls`` objects of a JSON lines file, see :meth:`dump_jsonl`."""
+    loads = _json_loads()
+    from_dict = cls.from_dict
+    for line in fp:
+        if line.strip():
+            yield from_dict(loads(line))
+
+
+def load_jsonl(fp, cls) -> list:
+    """Read the ``cls`` objects of a JSON lines file, see :meth:`dump_jsonl`."""
+    return list(iter_jsonl(fp, cls))
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError("msgpack is required, install it with: pip3 install anikimiapi[msgpack]")
+    return msgpack
+
+
+def packb(objects) -> bytes:
+    """Encode api objects to msgpack, as an array of field value arrays."""
+    return _msgpack().packb(to_rows(objects), use_bin_type=True)
+
+
+def unpackb(data: bytes, cls) -> list:
+    """Decode the ``cls`` objects encoded with :meth:`packb`."""
+    return from_rows(_msgpack().unpackb(data, raw=False, use_list=False), cls)
+
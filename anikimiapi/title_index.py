@@ -0,0 +1,246 @@
+from bisect import bisect_left, insort
+from collections import Counter
+import re
+import unicodedata
+from anikimiapi.data_classes import MediaInfoObject, ResultObject
+
+
+def _normalize(text: str) -> str:
+    """lowercase ``text``, strip the accents and keep only the words, single spaced."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _grams(word: str) -> set:
+    """the bigrams of ``word``, padded at the start."""
+    word = f" {word}"
+    return {word[i:i + 2] for i in range(len(word) - 1)}
+
+
+def _distance(query: str, text: str, max_distance: int, prefix: bool = False):
+    """the edit distance between ``query`` and ``text``, or the closest prefix of
+    ``text`` with ``prefix``, ``None`` if it is above ``max_distance``.
+
+    The edits are the insertion, the deletion and the substitution of a
+    character, and the transposition of two adjacent ones.
+    """
+    if not prefix and abs(len(query) - len(text)) > max_distance:
+        return None
+    before = None
+    previous = list(range(len(query) + 1))
+    best = previous[-1]
+    for j, char in enumerate(text, 1):
+        current = [j]
+        for i, query_char in enumerate(query, 1):
+            cost = min(
+                previous[i] + 1,
+                current[i - 1] + 1,
+                previous[i - 1] + (query_char != char),
+            )
+            if before is not None and i > 1 and query_char == text[j - 2] and query[i - 2] == char:
+                cost = min(cost, before[i - 2] + 1)
+            current.append(cost)
+        if min(current) > max_distance:
+            return best if prefix and best <= max_distance else None
+        if current[-1] < best:
+            best = current[-1]
+        before, previous = previous, current
+    distance = best if prefix else previous[-1]
+    return distance if distance <= max_distance else None
+
+
+class TitleIndex:
+    """An in-memory index of anime titles for autocompletion and typo-tolerant search.
+
+    Every title, and every other name given by :meth:`add_details`, is indexed
+    by each of its words, so ``"after sto"`` completes to *Clannad: After Story*.
+    The titles are compared lowercased and without accents or punctuation.
+    :meth:`complete` matches prefixes only, :meth:`search` also corrects the
+    words of the query which are a few typos away from words of the titles,
+    and ranks the results by the number of typos. Titles can be added at any time.
+
+    Parameters:
+        results (``list``, *optional*):
+            The :obj:`-anikimiapi.data_classes.ResultObject` to index first.
+        max_distance (``int``, *optional*):
+            The maximum number of typos :meth:`search` tolerates. Defaults to 2.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.title_index import TitleIndex
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+            index = TitleIndex(anime.get_by_genres(genre_name="romance", limit=600))
+
+            index.complete("clan")  # Clannad, Clannad: After Story...
+            index.search("clanad")  # typo tolerant
+    """
+    def __init__(self, results=(), max_distance: int = 2):
+        self.max_distance = max_distance
+        self._results = {}  # animeid -> ResultObject
+        self._names = []  # name id -> (normalized name, animeid)
+        self._seen = set()  # (normalized name, animeid)
+        self._heads = []  # sorted (normalized name, name id)
+        self._tails = []  # sorted (name from its second word on, name id)
+        self._words = {}  # word of a name -> word id
+        self._vocabulary = []  # word id -> word
+        self._postings = {}  # bigram -> [word id]
+        self.add_results(results)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __contains__(self, animeid) -> bool:
+        return animeid in self._results
+
+    def _add_name(self, name: str, animeid: str, insert=insort) -> None:
+        name = _normalize(name)
+        if not name or (name, animeid) in self._seen:
+            return
+        self._seen.add((name, animeid))
+        name_id = len(self._names)
+        self._names.append((name, animeid))
+        insert(self._heads, (name, name_id))
+        for match in re.finditer(r" ", name):
+            insert(self._tails, (name[match.end():], name_id))
+        for word in name.split(" "):
+            if word not in self._words:
+                self._words[word] = len(self._vocabulary)
+                for gram in _grams(word):
+                    self._postings.setdefault(gram, []).append(len(self._vocabulary))
+                self._vocabulary.append(word)
+
+    def add(self, result: ResultObject) -> None:
+        """Index a ``ResultObject``, by its title."""
+        self._results[result.animeid] = result
+        self._add_name(result.title, result.animeid)
+
+    def add_results(self, results) -> None:
+        """Index ``ResultObject`` objects, see :meth:`add`."""
+        for result in results:
+            self._results[result.animeid] = result
+            self._add_name(result.title, result.animeid, insert=list.append)
+        self._heads.sort()
+        self._tails.sort()
+
+    def add_details(self, animeid: str, details: MediaInfoObject) -> None:
+        """Index an anime by its title and by each of its other names."""
+        self.add(ResultObject(title=details.title, animeid=animeid))
+        for name in re.split(r"[,;]", details.other_names or ""):
+            self._add_name(name, animeid)
+
+    def _scan(self, prefix: str, found: dict, limit: int, distance: int = 0) -> None:
+        """add to ``found`` the animeids of the names with a word sequence starting
+        with ``prefix``, the names starting with it first."""
+        names = self._names
+        for keys in (self._heads, self._tails):
+            for i in range(bisect_left(keys, (prefix,)), len(keys)):
+                key, name_id = keys[i]
+                if len(found) >= limit or not key.startswith(prefix):
+                    break
+                found.setdefault(names[name_id][1], distance)
+
+    def complete(self, prefix: str, limit: int = 10) -> list:
+        """Get the anime with a title or a title word starting with ``prefix``.
+
+        The titles starting with ``prefix`` come first, shortest first.
+
+        Returns:
+            List of :obj:`-anikimiapi.data_classes.ResultObject`.
+        """
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        found = {}
+        self._scan(prefix, found, limit)
+        return [self._results[animeid] for animeid in found]
+
+    def search(self, query: str, limit: int = 10, max_distance: int = None) -> list:
+        """Like :meth:`complete`, followed by the titles within ``max_distance`` typos
+        of the query, the closest first.
+
+        A typo is a missing, extra or wrong character, two swapped characters
+        or a missing space. Words of less than 3
+        characters are taken as typed, words of less than 6 characters tolerate
+        one typo at most.
+
+        Parameters:
+            query(``str``):
+                What was typed so far.
+            limit(``int``, *optional*):
+                The maximum number of results. Defaults to 10.
+            max_distance(``int``, *optional*):
+                The maximum number of typos, defaults to the one of the index.
+
+        Returns:
+            List of :obj:`-anikimiapi.data_classes.ResultObject`.
+        """
+        query = _normalize(query)
+        if not query:
+            return []
+        found = {}
+        self._scan(query, found, limit)
+        if max_distance is None:
+            max_distance = self.max_distance
+        if len(found) < limit and max_distance > 0:
+            words = query.split(" ")
+            choices = [
+                self._corrections(word, min(max_distance, self._budget(word)), i == len(words) - 1)
+                for i, word in enumerate(words)
+            ]
+            for distance, phrase in sorted(self._phrases(choices, max_distance)):
+                if len(found) >= limit:
+                    break
+                if distance:
+                    self._scan(phrase, found, limit, distance)
+        return [self._results[animeid] for animeid in found]
+
+    @staticmethod
+    def _budget(word: str) -> int:
+        return 0 if len(word) < 3 else 1 if len(word) < 6 else 2
+
+    def _corrections(self, word: str, max_distance: int, prefix: bool) -> list:
+        """the ``(distance, word)`` of the indexed words within ``max_distance`` of ``word``."""
+        corrections = [(0, word)]
+        if max_distance == 0:
+            return corrections
+        grams = _grams(word)
+        # an edit changes at most 3 bigrams, the words sharing less cannot match
+        min_shared = max(len(grams) - 3 * max_distance, 1)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        vocabulary = self._vocabulary
+        for checked, (word_id, count) in enumerate(shared.most_common()):
+            if count < min_shared or checked == 64:
+                break
+            candidate = vocabulary[word_id]
+            if candidate == word or (prefix and candidate.startswith(word)):
+                continue
+            distance = _distance(word, candidate, max_distance, prefix)
+            if distance:
+                corrections.append((distance, candidate[:len(word) + max_distance] if prefix else candidate))
+        # a missing space, both parts are words or, for the last word, the second a prefix
+        for i in range(2, len(word) - 1):
+            if word[:i] in self._words and (prefix or word[i:] in self._words):
+                corrections.append((1, f"{word[:i]} {word[i:]}"))
+        return sorted(set(corrections))[:8]
+
+    @staticmethod
+    def _phrases(choices: list, max_distance: int):
+        """the ``(distance, phrase)`` combining one correction of each word, within ``max_distance``."""
+        phrases = [(0, "")]
+        for corrections in choices:
+            phrases = [
+                (distance + extra, f"{phrase} {word}" if phrase else word)
+                for distance, phrase in phrases
+                for extra, word in corrections
+                if distance + extra <= max_distance
+            ]
+        return phrases
@@ -0,0 +1,453 @@
+import time
+
+
+def network_errors() -> tuple:
+    """The ``requests`` exceptions raised when a host can't be reached or times out."""
+    import requests
+
+    return requests.exceptions.ConnectionError, requests.exceptions.Timeout
+
+
+def async_network_errors() -> tuple:
+    """The ``aiohttp`` exceptions raised when a host can't be reached or times out."""
+    import asyncio
+    import aiohttp
+
+    return aiohttp.ClientConnectionError, asyncio.TimeoutError
+
+
+def accept_encoding() -> str:
+    """The content codings the transports decode: gzip and deflate, and brotli
+    when the ``brotli`` (or ``brotlicffi``) package is installed."""
+    import importlib.util
+
+    encodings = "gzip, deflate"
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        encodings += ", br"
+    return encodings
+
+
+class Page:
+    """A fetched page, as returned by :meth:`Transport.get`.
+
+    Parameters:
+        url (``str``):
+            The final url of the page, after redirects.
+        status (``int``):
+            The HTTP status code of the response.
+        text (``str``):
+            The decoded body of the response.
+        headers (``dict``):
+            The response headers.
+        wire_bytes (``int``, *optional*):
+            The size of the body as received, before decompression.
+        decoded_bytes (``int``, *optional*):
+            The size of the body after decompression.
+
+    A cached page also keeps the results parsed from it in :attr:`parsed`, keyed by
+    parser method, so an unchanged page is not parsed again.
+    """
+    def __init__(
+            self,
+            url: str,
+            status: int,
+            text: str,
+            headers: dict,
+            wire_bytes: int = None,
+            decoded_bytes: int = None,
+    ):
+        self.url = url
+        self.status = status
+        self.text = text
+        self.headers = headers
+        self.wire_bytes = wire_bytes
+        self.decoded_bytes = decoded_bytes
+        self.parsed = None
+
+    def header(self, name: str, default=None):
+        """Get a response header, whatever its case."""
+        value = self.headers.get(name)
+        if value is not None:
+            return value
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return default
+
+
+class Transport:
+    """The HTTP transport shared by every method of an `AniKimi` client.
+
+    A single keep-alive session is kept for the lifetime of the transport, so
+    consecutive requests to the same host reuse the pooled TCP/TLS connection
+    instead of paying a new handshake for every page. The underlying connection
+    pool is thread-safe, and per-request cookies are never stored on the
+    session, so one transport can be shared across threads. The responses are
+    compressed, see :func:`accept_encoding`.
+
+    A request goes through the circuit ``breaker``, is retried by ``retry``,
+    hedged by ``hedge`` and waits for the ``scheduler``, each of them if given.
+
+    Parameters:
+        headers (``dict``, *optional*):
+            Default headers sent with every request.
+        pool_connections (``int``, *optional*):
+            The number of per-host connection pools to keep cached. Defaults to 10.
+        pool_maxsize (``int``, *optional*):
+            The maximum number of keep-alive connections kept per host. Defaults to 10.
+        pool_block (``bool``, *optional*):
+            If ``True``, never open more than ``pool_maxsize`` connections to a
+            host and wait for a free connection instead. Defaults to ``False``.
+        timeout (``float`` | ``tuple``, *optional*):
+            The request timeout in seconds, or a ``(connect, read)`` tuple.
+            Defaults to ``(10, 30)``.
+        scheduler (:obj:`-anikimiapi.scheduler.Scheduler`, *optional*):
+            Limits the rate and the concurrency of the requests, per host.
+        retry (:obj:`-anikimiapi.resilience.RetryPolicy`, *optional*):
+            Retries the failed requests.
+        hedge (:obj:`-anikimiapi.resilience.HedgePolicy`, *optional*):
+            Sends a duplicate of the slow requests.
+        breaker (:obj:`-anikimiapi.resilience.CircuitBreaker`, *optional*):
+            Fails fast the requests to the hosts which keep failing.
+    """
+    def __init__(
+            self,
+            headers: dict = None,
+            pool_connections: int = 10,
+            pool_maxsize: int = 10,
+            pool_block: bool = False,
+            timeout=(10, 30),
+            scheduler=None,
+            retry=None,
+            hedge=None,
+            breaker=None,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.retry = retry
+        self.hedge = hedge
+        self.breaker = breaker
+        self._hedge_executor = None
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = accept_encoding()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url: str, cookies: dict = None, headers: dict = None, timeout=None) -> Page:
+        """Send a GET request through the pooled session.
+
+        Parameters:
+            timeout (``float`` | ``tuple``, *optional*):
+                The timeout of this request, defaults to the one of the transport.
+
+        Raises:
+            ``requests.exceptions.ConnectionError``: If the host cannot be reached.
+            ``requests.exceptions.Timeout``: If the request timed out.
+            :obj:`-anikimiapi.error_handlers.CircuitOpenError`: If the circuit of the host is open.
+        """
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.check(url)
+            try:
+                page = self._hedged(url, cookies, headers, timeout)
+            except network_errors():
+                if self.breaker is not None:
+                    self.breaker.failure(url)
+                if self.retry is None or attempt >= self.retry.retries:
+                    raise
+                retry_after = None
+            except BaseException:
+                # a broken body, too many redirects or a cancellation: never retried,
+                # but it must still resolve a half-open circuit
+                if self.breaker is not None:
+                    self.breaker.failure(url)
+                raise
+            else:
+                if self.breaker is not None:
+                    if page.status >= 500:
+                        self.breaker.failure(url)
+                    else:
+                        self.breaker.success(url)
+                if self.retry is None or attempt >= self.retry.retries or page.status not in self.retry.statuses:
+                    return page
+                retry_after = page.header("Retry-After")
+            self.retry.retried += 1
+            time.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+
+    def _hedged(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        """send a request, and a duplicate if it is slower than the hedge delay."""
+        delay = None if self.hedge is None else self.hedge.delay(url)
+        if delay is None:
+            return self._fetch(url, cookies, headers, timeout)
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(self.hedge.max_workers, thread_name_prefix="anikimi-hedge")
+        submit = self._hedge_executor.submit
+        pending = {submit(self._fetch, url, cookies, headers, timeout)}
+        hedge = None
+        if not wait(pending, timeout=delay).done:
+            self.hedge.hedged += 1
+            hedge = submit(self._fetch, url, cookies, headers, timeout)
+            pending.add(hedge)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is hedge:
+                        self.hedge.hedge_wins += 1
+                    return future.result()
+        raise error
+
+    def _fetch(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        """send a request through the scheduler, recording its latency."""
+        if self.scheduler is not None:
+            self.scheduler.acquire(url)
+        start = time.monotonic()
+        try:
+            page = self._send(url, cookies, headers, timeout)
+        except BaseException:
+            if self.scheduler is not None:
+                self.scheduler.release(url)
+            raise
+        elapsed = time.monotonic() - start
+        if self.scheduler is not None:
+            self.scheduler.release(url, page.status, elapsed, page.header("Retry-After"))
+        if self.hedge is not None and page.status < 500:
+            self.hedge.observe(url, elapsed)
+        return page
+
+    def _send(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        response = self.session.get(
+            url,
+            cookies=cookies,
+            headers=headers,
+            timeout=self.timeout if timeout is None else timeout,
+        )
+        text = response.text
+        return Page(
+            url=response.url,
+            status=response.status_code,
+            text=text,
+            headers=dict(response.headers),
+            wire_bytes=response.raw.tell(),
+            decoded_bytes=len(response.content),
+        )
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncTransport:
+    """The asyncio counterpart of :class:`Transport`, built on ``aiohttp``.
+
+    The ``aiohttp`` session is created on the first request, inside the running
+    event loop, and is reused for every following request.
+
+    Parameters:
+        headers (``dict``, *optional*):
+            Default headers sent with every request.
+        limit (``int``, *optional*):
+            The maximum number of simultaneous connections. Defaults to 100.
+        limit_per_host (``int``, *optional*):
+            The maximum number of simultaneous connections to one host. Defaults to 10.
+        timeout (``float`` | ``tuple``, *optional*):
+            The request timeout in seconds, or a ``(connect, read)`` tuple.
+            Defaults to ``(10, 30)``.
+        scheduler (:obj:`-anikimiapi.scheduler.Scheduler`, *optional*):
+            Limits the rate and the concurrency of the requests, per host.
+        retry (:obj:`-anikimiapi.resilience.RetryPolicy`, *optional*):
+            Retries the failed requests.
+        hedge (:obj:`-anikimiapi.resilience.HedgePolicy`, *optional*):
+            Sends a duplicate of the slow requests.
+        breaker (:obj:`-anikimiapi.resilience.CircuitBreaker`, *optional*):
+            Fails fast the requests to the hosts which keep failing.
+    """
+    def __init__(
+            self,
+            headers: dict = None,
+            limit: int = 100,
+            limit_per_host: int = 10,
+            timeout=(10, 30),
+            scheduler=None,
+            retry=None,
+            hedge=None,
+            breaker=None,
+    ):
+        self.headers = headers
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.scheduler = scheduler
+        self.retry = retry
+        self.hedge = hedge
+        self.breaker = breaker
+        self.session = None
+
+    @staticmethod
+    def _client_timeout(timeout):
+        import aiohttp
+
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return aiohttp.ClientTimeout(connect=connect, sock_read=read)
+        return aiohttp.ClientTimeout(total=timeout)
+
+    def _open_session(self):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+        # cookies are sent per request and never stored on the session
+        return aiohttp.ClientSession(
+            headers={"Accept-Encoding": accept_encoding(), **(self.headers or {})},
+            connector=connector,
+            timeout=self._client_timeout(self.timeout),
+            cookie_jar=aiohttp.DummyCookieJar(),
+        )
+
+    async def get(self, url: str, cookies: dict = None, headers: dict = None, timeout=None) -> Page:
+        """Send a GET request through the pooled session.
+
+        Parameters:
+            timeout (``float`` | ``tuple``, *optional*):
+                The timeout of this request, defaults to the one of the transport.
+
+        Raises:
+            ``aiohttp.ClientConnectionError``: If the host cannot be reached.
+            ``asyncio.TimeoutError``: If the request timed out.
+            :obj:`-anikimiapi.error_handlers.CircuitOpenError`: If the circuit of the host is open.
+        """
+        import asyncio
+
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.check(url)
+            try:
+                page = await self._hedged(url, cookies, headers, timeout)
+            except async_network_errors():
+                if self.breaker is not None:
+                    self.breaker.failure(url)
+                if self.retry is None or attempt >= self.retry.retries:
+                    raise
+                retry_after = None
+            except BaseException:
+                # a broken body, too many redirects or a cancellation: never retried,
+                # but it must still resolve a half-open circuit
+                if self.breaker is not None:
+                    self.breaker.failure(url)
+                raise
+            else:
+                if self.breaker is not None:
+                    if page.status >= 500:
+                        self.breaker.failure(url)
+                    else:
+                        self.breaker.success(url)
+                if self.retry is None or attempt >= self.retry.retries or page.status not in self.retry.statuses:
+                    return page
+                retry_after = page.header("Retry-After")
+            self.retry.retried += 1
+            await asyncio.sleep(self.retry.delay(attempt, retry_after))
+            attempt += 1
+
+    async def _hedged(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        """send a request, and a duplicate if it is slower than the hedge delay."""
+        delay = None if self.hedge is None else self.hedge.delay(url)
+        if delay is None:
+            return await self._fetch(url, cookies, headers, timeout)
+        import asyncio
+
+        pending = {asyncio.ensure_future(self._fetch(url, cookies, headers, timeout))}
+        hedge = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedge.hedged += 1
+                hedge = asyncio.ensure_future(self._fetch(url, cookies, headers, timeout))
+                pending.add(hedge)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if task is hedge:
+                            self.hedge.hedge_wins += 1
+                        return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fetch(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        """send a request through the scheduler, recording its latency."""
+        if self.scheduler is not None:
+            await self.scheduler.acquire_async(url)
+        start = time.monotonic()
+        try:
+            page = await self._send(url, cookies, headers, timeout)
+        except BaseException:
+            if self.scheduler is not None:
+                self.scheduler.release(url)
+            raise
+        elapsed = time.monotonic() - start
+        if self.scheduler is not None:
+            self.scheduler.release(url, page.status, elapsed, page.header("Retry-After"))
+        if self.hedge is not None and page.status < 500:
+            self.hedge.observe(url, elapsed)
+        return page
+
+    async def _send(self, url: str, cookies: dict, headers: dict, timeout) -> Page:
+        if self.session is None:
+            self.session = self._open_session()
+        options = {} if timeout is None else {"timeout": self._client_timeout(timeout)}
+        async with self.session.get(url, cookies=cookies, headers=headers, **options) as response:
+            body = await response.read()
+            text = await response.text()
+            # aiohttp only exposes the compressed size through Content-Length
+            compressed = response.headers.get("Content-Encoding") and response.content_length
+            return Page(
+                url=str(response.url),
+                status=response.status,
+                text=text,
+                headers=dict(response.headers),
+                wire_bytes=compressed or len(body),
+                decoded_bytes=len(body),
+            )
+
+    async def close(self) -> None:
+        """Close every pooled connection."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,252 @@
+import hashlib
+import threading
+
+
+class AiringChange:
+    """The change of the airing anime between two polls of an :class:`AiringWatcher`.
+
+    Parameters:
+        added (``list``):
+            The :obj:`-anikimiapi.data_classes.ResultObject` which started airing.
+        removed (``list``):
+            The :obj:`-anikimiapi.data_classes.ResultObject` which are no longer listed.
+        airing (``list``):
+            Every airing anime, in the order of the front page.
+    """
+    __slots__ = ("added", "removed", "airing")
+
+    def __init__(self, added: list, removed: list, airing: list):
+        self.added = added
+        self.removed = removed
+        self.airing = airing
+
+    def __repr__(self) -> str:
+        return f"AiringChange(added={self.added!r}, removed={self.removed!r})"
+
+
+class _Watcher:
+    """the subscribers and the change detection shared by the watchers."""
+    def __init__(self, client, interval: float = 30, initial: bool = True, on_error=None):
+        self.client = client
+        self.interval = interval
+        self.initial = initial
+        self.on_error = on_error
+        self.airing = None
+        self.polls = 0
+        self.skipped = 0
+        self.changes = 0
+        self._digest = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Register a callable called with every :class:`AiringChange`, returns it,
+        so it can be used as a decorator."""
+        with self._lock:
+            self._subscribers = self._subscribers + [callback]
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        with self._lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber is not callback]
+
+    def _change(self, page):
+        """the change shown by the front ``page``, ``None`` if there is none."""
+        fragment = self.client.parser.airing_fragment(page.text)
+        if fragment is None:
+            raise AttributeError("The front page has no airing anime")
+        digest = hashlib.blake2b(fragment.encode(), digest_size=16).digest()
+        if digest == self._digest:
+            self.skipped += 1
+            return None
+        # parsed by the client, timed and shared with get_airing_anime like its other pages
+        airing = self.client._parse("airing", page)
+        previous = self.airing
+        self._digest = digest
+        self.airing = airing
+        if previous is None:
+            return AiringChange(list(airing), [], list(airing)) if self.initial and airing else None
+        before, after = set(previous), set(airing)
+        added = [anime for anime in airing if anime not in before]
+        removed = [anime for anime in previous if anime not in after]
+        if not added and not removed:  # reordered only
+            return None
+        return AiringChange(added, removed, list(airing))
+
+    def _failed(self, error: Exception) -> None:
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def stats(self) -> dict:
+        """The number of polls, of polls skipped because the airing menu did not
+        change, and of changes sent."""
+        return {"polls": self.polls, "skipped": self.skipped, "changes": self.changes}
+
+
+class AiringWatcher(_Watcher):
+    """Polls the front page for the airing anime and sends the changes to its subscribers.
+
+    A single background thread polls every ``interval`` seconds, however many
+    subscribers there are. A poll hashes the airing menu of the front page and
+    stops there when it did not change, so only a change costs a parse. Every
+    airing anime is watched, not only the first 20 of :meth:`-anikimiapi.AniKimi.get_airing_anime`.
+    With a ``cache`` on the client, the front page is also revalidated with a
+    conditional request instead of being downloaded again.
+
+    Parameters:
+        client (:obj:`-anikimiapi.AniKimi`):
+            The client fetching the front page.
+        interval (``float``, *optional*):
+            The seconds between two polls. Defaults to 30.
+        initial (``bool``, *optional*):
+            Send the anime airing at the first poll as added. Defaults to ``True``.
+        on_error (``callable``, *optional*):
+            Called with the errors of the polls and of the subscribers, which are
+            ignored by default.
+
+    Example:
+        .. code-block:: python
+
+            from anikimiapi import AniKimi
+            from anikimiapi.watcher import AiringWatcher
+
+            anime = AniKimi(
+                gogoanime_token="baikdk32hk1nrek3hw9",
+                auth_token="NCONW9H48HNFONW9Y94NJT49YTHO45TU4Y8YT93HOGFNRKBI"
+            )
+            watcher = AiringWatcher(anime, interval=10)
+
+            @watcher.subscribe
+            def on_change(change):
+                for result in change.added:
+                    print("now airing:", result.title)
+
+            watcher.start()
+    """
+    def __init__(self, client, interval: float = 30, initial: bool = True, on_error=None):
+        super().__init__(client, interval, initial, on_error)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Poll the front page once, and send the change, if any, to the subscribers.
+
+        Returns:
+            :class:`AiringChange`: The change, ``None`` if there is none.
+        """
+        self.polls += 1
+        change = self._change(self.client._get(self.client.host, "home"))
+        if change is not None:
+            self.changes += 1
+            for subscriber in self._subscribers:
+                try:
+                    subscriber(change)
+                except Exception as error:
+                    self._failed(error)
+        return change
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception as error:
+                self._failed(error)
+            self._stopped.wait(self.interval)
+
+    def start(self) -> "AiringWatcher":
+        """Start polling in a background thread."""
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="anikimi-airing", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop polling, after the running poll."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class AsyncAiringWatcher(_Watcher):
+    """The asyncio counterpart of :class:`AiringWatcher`, polling from a task with an
+    :obj:`-anikimiapi.AsyncAniKimi`.
+
+    The subscribers can be plain functions or coroutine functions, the coroutines
+    of a change run concurrently.
+
+    Example:
+        .. code-block:: python
+
+            async with AsyncAiringWatcher(anime, interval=10) as watcher:
+                watcher.subscribe(on_change)
+                await asyncio.sleep(3600)
+    """
+    def __init__(self, client, interval: float = 30, initial: bool = True, on_error=None):
+        super().__init__(client, interval, initial, on_error)
+        self._task = None
+
+    async def poll(self):
+        """Poll the front page once, see :meth:`AiringWatcher.poll`."""
+        import asyncio
+
+        self.polls += 1
+        change = self._change(await self.client._get(self.client.host, "home"))
+        if change is not None:
+            self.changes += 1
+            pending = []
+            for subscriber in self._subscribers:
+                try:
+                    result = subscriber(change)
+                except Exception as error:
+                    self._failed(error)
+                    continue
+                if asyncio.iscoroutine(result):
+                    pending.append(result)
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, Exception):
+                    self._failed(result)
+        return change
+
+    async def _run(self) -> None:
+        import asyncio
+
+        while True:
+            try:
+                await self.poll()
+            except Exception as error:
+                self._failed(error)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> "AsyncAiringWatcher":
+        """Start polling in a task of the running event loop."""
+        import asyncio
+
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        return self
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        import asyncio
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
@@ -0,0 +1,47 @@
+"""Throughput of the segmented downloader against the stub server.
+
+Downloads the synthetic file of ``benchmarks/stub_server.py``, whose every
+connection is limited to ``--rate`` bytes per second like a CDN, with an
+increasing number of connections, checks the downloaded bytes, and prints
+the throughput of each run.
+
+    python benchmarks/download.py
+    python benchmarks/download.py --size 67108864 --rate 4e6 --connections 1 4 8 16 --mmap
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anikimiapi.download import Downloader  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=16 << 20, help="bytes of the downloaded file")
+    parser.add_argument("--rate", type=float, default=2e6, help="bytes per second of each connection")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--bandwidth", type=float, default=None, help="the cap of the total throughput")
+    parser.add_argument("--mmap", action="store_true", help="write through a memory map")
+    args = parser.parse_args()
+
+    failed = 0
+    with StubServer(media_size=args.size, rate=args.rate) as server, tempfile.TemporaryDirectory() as directory:
+        url = f"{server.url}media/episode.mp4"
+        path = os.path.join(directory, "episode.mp4")
+        for connections in args.connections:
+            with Downloader(connections=connections, bandwidth=args.bandwidth, use_mmap=args.mmap) as downloader:
+                result = downloader.download(url, path, resume=False)
+            with open(path, "rb") as fh:
+                intact = fh.read() == server.media
+            failed += not intact
+            print(f"  {connections:3d} connections  {result.rate / 1e6:8.2f} MB/s  {result.elapsed:6.2f} s"
+                  f"  {result.chunks:4d} ranges  {'ok' if intact else 'CORRUPTED'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
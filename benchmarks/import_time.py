@@ -0,0 +1,91 @@
+"""Import-time regression benchmark for anikimiapi.
+
+Runs ``python -X importtime`` in fresh interpreters and reports the median
+cumulative import time of each statement, and which heavy dependencies got
+imported along the way. Exits with status 1 if a statement exceeds ``--max-ms``
+or imports a heavy dependency it should not, so it can guard CI.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 20 --max-ms 40 --json results.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# statement -> heavy modules it must not import
+STATEMENTS = {
+    "import anikimiapi": ["requests", "bs4", "lxml", "aiohttp", "asyncio", "requests_html"],
+    "import anikimiapi.anikimi": ["requests", "bs4", "lxml", "aiohttp", "asyncio", "requests_html"],
+    "from anikimiapi import AniKimi": ["requests", "bs4", "lxml", "aiohttp", "asyncio", "requests_html"],
+    "from anikimiapi import AsyncAniKimi": ["requests", "bs4", "lxml", "aiohttp", "requests_html"],
+}
+
+
+def measure(statement: str) -> tuple:
+    """import ``statement`` in a fresh interpreter, returns the cumulative time in
+    microseconds of the anikimiapi modules and the set of imported top-level modules."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        level = len(name) - len(name.lstrip())
+        name = name.strip()
+        modules.add(name.split(".")[0])
+        # top-level entries of the import tree which belong to the package
+        if level == 1 and name.startswith("anikimiapi"):
+            total += int(cumulative)
+    return total, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="interpreters started per statement")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail above this median import time")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    failed = False
+    results = {}
+    for statement, forbidden in STATEMENTS.items():
+        measure(statement)  # warm the bytecode cache
+        timings = []
+        for _ in range(args.runs):
+            total, modules = measure(statement)
+            timings.append(total / 1000)
+        leaked = sorted(set(forbidden) & modules)
+        median = statistics.median(timings)
+        results[statement] = {
+            "median_ms": round(median, 3),
+            "min_ms": round(min(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "heavy_imports": leaked,
+        }
+        status = "ok"
+        if leaked or (args.max_ms is not None and median > args.max_ms):
+            status = "FAIL"
+            failed = True
+        print(f"{statement:40s} median {median:8.2f} ms  min {min(timings):8.2f} ms  "
+              f"heavy: {', '.join(leaked) or '-'}  {status}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"python": sys.version, "runs": args.runs, "results": results}, fh, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
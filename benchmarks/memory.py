@@ -0,0 +1,136 @@
+"""Memory and serialization benchmark of the api objects.
+
+Compares the footprint of the slotted ``ResultObject``/``MediaInfoObject`` with
+the previous ``__dict__`` based classes, and times the bulk encoders of
+:mod:`anikimiapi.serialization`.
+
+    python benchmarks/memory.py
+    python benchmarks/memory.py --count 500000 --json results.json
+"""
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anikimiapi import serialization  # noqa: E402
+from anikimiapi.data_classes import MediaInfoObject, ResultObject  # noqa: E402
+
+
+class LegacyResultObject:
+    """ResultObject as it was before it got slots."""
+    def __init__(self, title: str, animeid: str):
+        self.title = title
+        self.animeid = animeid
+
+
+class LegacyMediaInfoObject:
+    """MediaInfoObject as it was before it got slots."""
+    def __init__(self, title, year, other_names, season, status, genres, episodes, image_url, summary):
+        self.title = title
+        self.year = year
+        self.other_names = other_names
+        self.season = season
+        self.status = status
+        self.genres = genres
+        self.episodes = episodes
+        self.image_url = image_url
+        self.summary = summary
+
+
+def result_args(count: int) -> list:
+    return [(f"Anime Title {i}", f"anime-title-{i}") for i in range(count)]
+
+
+def info_args(count: int) -> list:
+    return [
+        (f"Anime Title {i}", 2000 + i % 20, f"Other Name {i}", "Fall 2007 Anime", "Completed",
+         ("Comedy", "Drama", "Romance"), 24, f"https://gogocdn.net/cover/{i}.png", "A summary.")
+        for i in range(count)
+    ]
+
+
+def footprint(cls, args: list) -> int:
+    """bytes allocated by the objects alone, the field values are built beforehand."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [cls(*a) for a in args]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--count", type=int, default=200_000, help="objects per measure")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {"count": args.count, "memory": {}, "serialization": {}}
+    for name, legacy, new, make in (
+            ("ResultObject", LegacyResultObject, ResultObject, result_args),
+            ("MediaInfoObject", LegacyMediaInfoObject, MediaInfoObject, info_args),
+    ):
+        values = make(args.count)
+        old_size = footprint(legacy, values)
+        new_size = footprint(new, values)
+        results["memory"][name] = {
+            "legacy_bytes_per_object": round(old_size / args.count, 1),
+            "slotted_bytes_per_object": round(new_size / args.count, 1),
+            "saving": round(1 - new_size / old_size, 3),
+        }
+        print(f"{name:16s} legacy {old_size / args.count:7.1f} B/obj   "
+              f"slotted {new_size / args.count:7.1f} B/obj   saving {1 - new_size / old_size:6.1%}")
+
+    objects = [ResultObject(*a) for a in result_args(args.count)]
+    codecs = {
+        "json (stdlib, hand written)": (
+            lambda objs: json.dumps([{"title": o.title, "animeid": o.animeid} for o in objs]),
+            lambda data: [ResultObject(d["title"], d["animeid"]) for d in json.loads(data)],
+        ),
+        "jsonl": (
+            lambda objs: (lambda fp: (serialization.dump_jsonl(objs, fp), fp.getvalue())[1])(io.StringIO()),
+            lambda data: serialization.load_jsonl(io.StringIO(data), ResultObject),
+        ),
+    }
+    try:
+        import msgpack  # noqa: F401
+        codecs["msgpack"] = (
+            serialization.packb,
+            lambda data: serialization.unpackb(data, ResultObject),
+        )
+    except ImportError:
+        print("msgpack is not installed, skipping it")
+    for name, (encode, decode) in codecs.items():
+        data, encode_time = timed(encode, objects)
+        decoded, decode_time = timed(decode, data)
+        assert decoded == objects
+        results["serialization"][name] = {
+            "encode_s": round(encode_time, 4),
+            "decode_s": round(decode_time, 4),
+            "size_bytes": len(data),
+        }
+        print(f"{name:28s} encode {encode_time * 1000:8.1f} ms   decode {decode_time * 1000:8.1f} ms   "
+              f"size {len(data) / 1e6:6.2f} MB")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Throughput of a bulk get_details with threads only, and with the process pipeline.
+
+Fetches the details of ``--count`` anime from ``benchmarks/stub_server.py``,
+first with ``--fetchers`` threads calling ``get_details`` (parsing under the
+GIL), then through :class:`anikimiapi.pipeline.Pipeline` with each number of
+``--processes``, and prints the records per second of each run. The category
+page is padded with ``--pad`` KiB of markup, like the real pages, and parsed
+whole, so the parsing weighs like in a real crawl. The pipeline scales with the
+cores up to the point where fetching is the bottleneck.
+
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --count 2000 --processes 1 2 4 8 --parser lxml
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anikimiapi import AniKimi  # noqa: E402
+from anikimiapi.parsers import LxmlParser, SoupParser  # noqa: E402
+from anikimiapi.pipeline import Pipeline  # noqa: E402
+from stub_server import FIXTURES, StubServer  # noqa: E402
+
+
+def padded_fixtures(directory: str, pad_kb: int) -> str:
+    """a copy of the fixtures, with ``pad_kb`` KiB of markup in the category page."""
+    shutil.copytree(FIXTURES, directory, dirs_exist_ok=True)
+    path = os.path.join(directory, "category.html")
+    with open(path, encoding="utf-8") as fh:
+        page = fh.read()
+    row = '<div class="related"><a href="/category/other" title="Other">Other anime</a><span>2021</span></div>\n'
+    padding = row * (pad_kb * 1024 // len(row))
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(page.replace("</body>", padding + "</body>"))
+    return directory
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--count", type=int, default=500, help="anime to get the details of")
+    parser.add_argument("--fetchers", type=int, default=16, help="threads fetching the pages")
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="worker processes of each run")
+    parser.add_argument("--pad", type=int, default=64, help="KiB of markup added to the category page")
+    parser.add_argument("--parser", default="soup", choices=["soup", "lxml"])
+    parser.add_argument("--delay", type=float, default=0.005, help="seconds the stub delays every response")
+    args = parser.parse_args()
+
+    animeids = [f"anime-{i}" for i in range(args.count)]
+    # whole pages, the way a parser without partial parsing pays for them
+    backend = SoupParser(partial=False) if args.parser == "soup" else LxmlParser(partial=False)
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = padded_fixtures(directory, args.pad)
+        with StubServer(delay=args.delay, fixtures=fixtures) as server:
+            with AniKimi("token", "token", host=server.url, parser=backend, pool_maxsize=args.fetchers) as anime:
+                anime.get_details(animeids[0])
+                start = time.perf_counter()
+                with ThreadPoolExecutor(args.fetchers) as executor:
+                    expected = list(executor.map(anime.get_details, animeids))
+                rate = args.count / (time.perf_counter() - start)
+                print(f"  threads only          {rate:9.1f} records/s")
+                for processes in args.processes:
+                    with Pipeline(anime, fetchers=args.fetchers, processes=processes) as pipeline:
+                        list(pipeline.get_details(animeids[:processes]))  # start the workers
+                        start = time.perf_counter()
+                        details = dict(pipeline.get_details(animeids))
+                        elapsed = time.perf_counter() - start
+                    intact = [details[animeid] for animeid in animeids] == expected
+                    print(f"  {processes:3d} processes         {args.count / elapsed:9.1f} records/s"
+                          f"  x{rate and args.count / elapsed / rate:5.2f}  {'ok' if intact else 'MISMATCH'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""A local stand-in for gogoanime, with injectable latency and failures.
+
+Serves the pages of ``benchmarks/fixtures`` (synthetic pages with the markup
+of the gogoanime pages the parsers read) on the routes the clients request,
+so the clients can be exercised and measured without the network. Each
+request can be delayed, answered with a ``500``/``503``, have its connection
+dropped, its body cut short or hang, at random, on every route or only on
+some. The pages have an ``ETag`` and a ``Last-Modified`` header and
+conditional requests get a ``304``; with ``--gzip`` they are compressed for
+the clients accepting it.
+The ``/media/<name>`` route serves a synthetic video file of ``--media-size``
+bytes with HTTP Range requests, each connection limited to ``--rate`` bytes
+per second, to exercise :mod:`anikimiapi.download`.
+
+    python benchmarks/stub_server.py --port 8765
+    python benchmarks/stub_server.py --delay 0.05 --tail 0.05:2 --fail 0.1 --routes embed
+
+    from anikimiapi import AniKimi
+    anime = AniKimi("token", "token", host="http://127.0.0.1:8765/")
+
+It can also be started from a script::
+
+    with StubServer(delay=0.02, fail=0.1, routes=("embed",)) as server:
+        anime = AniKimi("token", "token", host=server.url)
+"""
+import argparse
+import gzip
+import hashlib
+import http.server
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ROUTES = ("search", "category", "genre", "home", "episode", "embed", "download", "media")
+
+
+def route_of(path: str):
+    """the route and the fixture serving ``path``, ``(None, None)`` for a 404."""
+    url = urllib.parse.urlsplit(path)
+    query = urllib.parse.parse_qs(url.query)
+    path = url.path
+    if path.startswith("/search.html"):
+        return "search", "search.html"
+    if path.startswith("/category/"):
+        if path.endswith("-broken"):  # served when the fixtures have a page which can't be parsed
+            return "category", "category-broken.html"
+        return ("category", "category.html") if not path.endswith("-invalid") else ("category", None)
+    if path.startswith("/genre/"):
+        return "genre", f"genre-{query.get('page', ['1'])[0] or '1'}.html"
+    if "-episode-" in path:
+        return "episode", "episode.html"
+    if path.startswith("/embedplus"):
+        return "embed", "embed.html"
+    if path.startswith("/download"):
+        return "download", "download.html"
+    if path == "/":
+        return "home", "home.html"
+    if path.startswith("/media/"):
+        return "media", path
+    return None, None
+
+
+def media_bytes(size: int) -> bytes:
+    """a deterministic incompressible file of ``size`` bytes, each 64 KiB block
+    different, so a block written at the wrong place is detected."""
+    blocks = []
+    for index in range(0, size, 65536):
+        seed = hashlib.blake2b(index.to_bytes(8, "big"), digest_size=64).digest()
+        blocks.append(hashlib.shake_256(seed).digest(min(65536, size - index)))
+    return b"".join(blocks)
+
+
+def parse_range(header: str, size: int):
+    """the ``(start, end)`` inclusive bounds of a single ``bytes=`` range, ``None`` if
+    it is not satisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:  # the last bytes
+        if not last.isdigit() or not int(last):
+            return None
+        return max(0, size - int(last)), size - 1
+    if not first.isdigit() or int(first) >= size or (last and not last.isdigit()):
+        return None
+    return int(first), min(size - 1, int(last)) if last else size - 1
+
+
+class StubServer:
+    """The stub server, run in a background thread.
+
+    Parameters:
+        port (``int``, *optional*):
+            The port to listen on, ``0`` for a free one. Defaults to 0.
+        delay (``float``, *optional*):
+            The seconds every response is delayed. Defaults to 0.
+        jitter (``float``, *optional*):
+            A random extra delay, up to this many seconds. Defaults to 0.
+        tail (``tuple``, *optional*):
+            ``(probability, seconds)``, the long tail: this extra delay for this
+            share of the responses. Defaults to none.
+        fail (``float``, *optional*):
+            The share of the responses which are a ``500``. Defaults to 0.
+        throttle (``float``, *optional*):
+            The share of the responses which are a ``503`` with a ``Retry-After: 1``. Defaults to 0.
+        drop (``float``, *optional*):
+            The share of the connections closed without a response. Defaults to 0.
+        hang (``float``, *optional*):
+            The share of the responses which never come, until the server stops. Defaults to 0.
+        truncate (``float``, *optional*):
+            The share of the responses whose body is cut in half, the connection being
+            closed before the announced ``Content-Length``. Defaults to 0.
+        routes (``tuple``, *optional*):
+            The routes the failures and the tail apply to, every route by default.
+        seed (``int``, *optional*):
+            The seed of the failures, for reproducible runs.
+        validators (``bool``, *optional*):
+            Send an ``ETag`` and a ``Last-Modified`` and answer ``304`` to the conditional
+            requests for an unchanged page. Defaults to ``True``.
+        gzip (``bool``, *optional*):
+            Compress the pages for the clients accepting gzip. Defaults to ``False``.
+        media_size (``int``, *optional*):
+            The size of the file served on ``/media/``. Defaults to 8 MiB.
+        rate (``float``, *optional*):
+            The bytes per second of each connection downloading the file, unlimited by default.
+        ranges (``bool``, *optional*):
+            Answer the Range requests for the file. Defaults to ``True``.
+    """
+    LAST_MODIFIED = "Wed, 01 Sep 2021 00:00:00 GMT"
+
+    def __init__(self, port=0, delay=0.0, jitter=0.0, tail=None, fail=0.0, throttle=0.0,
+                 drop=0.0, hang=0.0, routes=None, seed=None, fixtures=FIXTURES, validators=True, gzip=False,
+                 media_size=8 << 20, rate=None, ranges=True, truncate=0.0):
+        self.delay = delay
+        self.jitter = jitter
+        self.tail = tail
+        self.fail = fail
+        self.throttle = throttle
+        self.drop = drop
+        self.hang = hang
+        self.truncate = truncate
+        self.routes = tuple(routes or ROUTES)
+        self.fixtures = fixtures
+        self.validators = validators
+        self.gzip = gzip
+        self.media_size = media_size
+        self.rate = rate
+        self.ranges = ranges
+        self.ranges_served = 0
+        self._media = None  # (body, etag)
+        self.not_modified = 0
+        self.requests = dict.fromkeys(ROUTES, 0)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pages = {}
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/"
+
+    def page(self, name: str) -> bytes:
+        page = self._pages.get(name)
+        if page is None:
+            with open(os.path.join(self.fixtures, name), "rb") as fh:
+                page = fh.read().replace(b"EMBEDHOST", f"127.0.0.1:{self.port}".encode())
+            self._pages[name] = page
+        return page
+
+    def _media_file(self) -> tuple:
+        """the file served on ``/media/`` and its ``ETag``."""
+        if self._media is None:
+            self.media = media_bytes(self.media_size)
+        return self._media
+
+    @property
+    def media(self) -> bytes:
+        """The file served on ``/media/``, which can be replaced, like a file changed on a CDN."""
+        return self._media_file()[0]
+
+    @media.setter
+    def media(self, body: bytes) -> None:
+        self._media = body, f'"media-{hashlib.md5(body).hexdigest()}"'
+
+    def _fate(self, route: str):
+        """the extra delay and the failure, if any, of a request."""
+        with self._lock:
+            self.requests[route] += 1
+            roll = self._random.random
+            delay = self.delay + self.jitter * roll()
+            if route not in self.routes:
+                return delay, None
+            if self.tail and roll() < self.tail[0]:
+                delay += self.tail[1]
+            for failure in ("drop", "hang", "fail", "throttle"):
+                if roll() < getattr(self, failure):
+                    return delay, failure
+            # rolled only when used, so the seeded runs draw the same failures as before
+            if self.truncate and roll() < self.truncate:
+                return delay, "truncate"
+        return delay, None
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                route, fixture = route_of(self.path)
+                if route is None or route != "media" and (
+                        fixture is None or not os.path.exists(os.path.join(server.fixtures, fixture))):
+                    return self._send(404, b"<html></html>")
+                delay, failure = server._fate(route)
+                if delay:
+                    time.sleep(delay)
+                if failure == "drop":
+                    self.close_connection = True
+                    return
+                if failure == "hang":
+                    server._stopped.wait()
+                    self.close_connection = True
+                    return
+                if failure == "fail":
+                    return self._send(500, b"<html>Internal Server Error</html>")
+                if failure == "throttle":
+                    return self._send(503, b"<html>Service Unavailable</html>", {"Retry-After": "1"})
+                if route == "media":
+                    return self._media()
+                body = server.page(fixture)
+                headers = {}
+                if server.validators:
+                    etag = f'"{hashlib.md5(body).hexdigest()}"'
+                    headers = {"ETag": etag, "Last-Modified": server.LAST_MODIFIED}
+                    if etag in self.headers.get("If-None-Match", "") or (
+                            "If-None-Match" not in self.headers
+                            and self.headers.get("If-Modified-Since") == server.LAST_MODIFIED):
+                        with server._lock:
+                            server.not_modified += 1
+                        return self._send(304, b"", headers)
+                if server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, headers, truncate=failure == "truncate")
+
+            def _media(self):
+                body, etag = server._media_file()
+                headers = {"Content-Type": "video/mp4", "ETag": etag, "Last-Modified": server.LAST_MODIFIED}
+                status, start, end = 200, 0, len(body) - 1
+                if server.ranges:
+                    headers["Accept-Ranges"] = "bytes"
+                    if_range = self.headers.get("If-Range")
+                    if "Range" in self.headers and if_range in (None, etag, server.LAST_MODIFIED):
+                        bounds = parse_range(self.headers["Range"], len(body))
+                        if bounds is None:
+                            return self._send(416, b"", {"Content-Range": f"bytes */{len(body)}"})
+                        status, (start, end) = 206, bounds
+                        headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+                        with server._lock:
+                            server.ranges_served += 1
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(end + 1 - start))
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    view = memoryview(body)[start:end + 1]
+                    block = 16384
+                    began = time.monotonic()
+                    for offset in range(0, len(view), block):
+                        if server.rate:
+                            ahead = (offset + block) / server.rate - (time.monotonic() - began)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                        self.wfile.write(view[offset:offset + block])
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _send(self, status, body, headers=None, truncate=False):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    for name, value in (headers or {}).items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    if truncate:
+                        self.wfile.write(body[:len(body) // 2])
+                        self.close_connection = True
+                        return
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up: timed out, or a hedged request won
+                    self.close_connection = True
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds, up to this")
+    parser.add_argument("--tail", default=None, help="PROBABILITY:SECONDS of extra delay")
+    parser.add_argument("--fail", type=float, default=0.0, help="share of 500 responses")
+    parser.add_argument("--throttle", type=float, default=0.0, help="share of 503 responses")
+    parser.add_argument("--drop", type=float, default=0.0, help="share of dropped connections")
+    parser.add_argument("--hang", type=float, default=0.0, help="share of responses which never come")
+    parser.add_argument("--truncate", type=float, default=0.0, help="share of bodies cut in half")
+    parser.add_argument("--routes", nargs="*", choices=ROUTES, default=None,
+                        help="the routes the failures apply to, all by default")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-validators", action="store_true", help="no ETag, Last-Modified nor 304")
+    parser.add_argument("--gzip", action="store_true", help="compress the pages")
+    parser.add_argument("--media-size", type=int, default=8 << 20, help="bytes of the file served on /media/")
+    parser.add_argument("--rate", type=float, default=None, help="bytes per second of each media connection")
+    parser.add_argument("--no-ranges", action="store_true", help="ignore the Range requests")
+    args = parser.parse_args()
+    tail = tuple(float(v) for v in args.tail.split(":")) if args.tail else None
+    server = StubServer(
+        port=args.port, delay=args.delay, jitter=args.jitter, tail=tail, fail=args.fail,
+        throttle=args.throttle, drop=args.drop, hang=args.hang, routes=args.routes, seed=args.seed,
+        validators=not args.no_validators, gzip=args.gzip, media_size=args.media_size, rate=args.rate,
+        ranges=not args.no_ranges, truncate=args.truncate,
+    )
+    print(f"serving {FIXTURES} on {server.url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
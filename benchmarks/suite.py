@@ -0,0 +1,238 @@
+"""Offline benchmark suite of the public methods.
+
+Runs the clients against ``benchmarks/stub_server.py``, which serves the
+pages of ``benchmarks/fixtures`` with a configurable latency, and measures:
+
+- the end-to-end latency of each public method, sequentially;
+- the throughput of each method at several concurrency levels;
+- the parse time of each page type, with each parser backend;
+- the peak memory allocated by one call of each method.
+
+The results are written as JSON, and can be compared with a previous run:
+a measure which got worse than ``--threshold`` fails the comparison.
+
+    python benchmarks/suite.py --json baseline.json
+    python benchmarks/suite.py --delay 0.02 --concurrency 1 8 32 --json after.json
+    python benchmarks/suite.py --compare baseline.json after.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anikimiapi import AniKimi  # noqa: E402
+from anikimiapi.parsers import get_parser  # noqa: E402
+from stub_server import FIXTURES, StubServer  # noqa: E402
+
+# method -> the call, given a client
+METHODS = {
+    "search_anime": lambda client: client.search_anime(query="clannad"),
+    "get_details": lambda client: client.get_details(animeid="clannad-dub"),
+    "get_by_genres": lambda client: client.get_by_genres(genre_name="romance", limit=100),
+    "get_episode_link_basic": lambda client: client.get_episode_link_basic(animeid="clannad-dub", episode_num=3),
+    "get_episode_link_advanced": lambda client: client.get_episode_link_advanced(animeid="clannad-dub", episode_num=3),
+    "get_episode_links": lambda client: list(client.get_episode_links(animeid="clannad-dub", episodes=range(1, 6))),
+    "get_airing_anime": lambda client: client.get_airing_anime(count=10),
+}
+
+# fixture -> the parser methods reading it
+PAGES = {
+    "search.html": ("search_results",),
+    "category.html": ("details", "anime_title"),
+    "genre-1.html": ("listing",),
+    "home.html": ("airing",),
+    "episode.html": ("episode_links", "download_page_link"),
+    "embed.html": ("embed_hdp_link",),
+    "download.html": ("download_links",),
+}
+
+# the measures compared between runs, and whether higher is better
+MEASURES = {"p50_ms": False, "p90_ms": False, "calls_per_s": True, "mean_ms": False, "peak_kb": False}
+
+
+def percentile(values: list, p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def client(server: StubServer, parser: str) -> AniKimi:
+    return AniKimi("token", "token", host=server.url, parser=parser, pool_maxsize=64)
+
+
+def latency(server: StubServer, parser: str, runs: int) -> dict:
+    results = {}
+    with client(server, parser) as anime:
+        for name, call in METHODS.items():
+            call(anime)  # warm up the connections and the lazy imports
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                call(anime)
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                "p50_ms": round(percentile(timings, 50), 3),
+                "p90_ms": round(percentile(timings, 90), 3),
+                "p99_ms": round(percentile(timings, 99), 3),
+                "mean_ms": round(statistics.mean(timings), 3),
+            }
+            print(f"  {name:28s} p50 {results[name]['p50_ms']:8.2f} ms  p90 {results[name]['p90_ms']:8.2f} ms"
+                  f"  p99 {results[name]['p99_ms']:8.2f} ms")
+    return results
+
+
+def throughput(server: StubServer, parser: str, levels: list, duration: float) -> dict:
+    results = {}
+    with client(server, parser) as anime:
+        for name, call in METHODS.items():
+            results[name] = {}
+            for level in levels:
+                deadline = time.perf_counter() + duration
+
+                def worker():
+                    calls = 0
+                    while time.perf_counter() < deadline:
+                        call(anime)
+                        calls += 1
+                    return calls
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=level) as executor:
+                    calls = sum(executor.map(lambda _: worker(), range(level)))
+                rate = calls / (time.perf_counter() - start)
+                results[name][str(level)] = {"calls_per_s": round(rate, 2)}
+            print(f"  {name:28s} " + "  ".join(
+                f"x{level}: {results[name][str(level)]['calls_per_s']:8.1f}/s" for level in levels))
+    return results
+
+
+def parse_times(parser: str, runs: int) -> dict:
+    backend = get_parser(parser)
+    results = {}
+    for fixture, methods in PAGES.items():
+        with open(os.path.join(FIXTURES, fixture), encoding="utf-8") as fh:
+            page_source = fh.read().replace("EMBEDHOST", "127.0.0.1")
+        for method in methods:
+            parse = getattr(backend, method)
+            parse(page_source)
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                parse(page_source)
+                timings.append((time.perf_counter() - start) * 1000)
+            key = f"{fixture.split('.')[0]}:{method}"
+            results[key] = {
+                "p50_ms": round(percentile(timings, 50), 4),
+                "mean_ms": round(statistics.mean(timings), 4),
+                "bytes": len(page_source),
+            }
+            print(f"  {key:36s} p50 {results[key]['p50_ms']:8.3f} ms  ({len(page_source)} bytes)")
+    return results
+
+
+def peak_memory(server: StubServer, parser: str) -> dict:
+    results = {}
+    with client(server, parser) as anime:
+        for name, call in METHODS.items():
+            call(anime)
+            gc.collect()
+            tracemalloc.start()
+            call(anime)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {"peak_kb": round(peak / 1024, 1)}
+            print(f"  {name:28s} peak {results[name]['peak_kb']:8.1f} KB")
+    return results
+
+
+def run(args) -> dict:
+    results = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            "parsers": args.parsers, "delay": args.delay, "jitter": args.jitter, "runs": args.runs,
+            "concurrency": args.concurrency, "duration": args.duration,
+        },
+    }
+    with StubServer(delay=args.delay, jitter=args.jitter, seed=0) as server:
+        for parser in args.parsers:
+            print(f"[{parser}] latency")
+            results.setdefault("latency", {})[parser] = latency(server, parser, args.runs)
+            print(f"[{parser}] throughput")
+            results.setdefault("throughput", {})[parser] = throughput(
+                server, parser, args.concurrency, args.duration)
+            print(f"[{parser}] parse time")
+            results.setdefault("parse", {})[parser] = parse_times(parser, args.runs)
+            print(f"[{parser}] peak memory")
+            results.setdefault("memory", {})[parser] = peak_memory(server, parser)
+    return results
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """the compared measures of ``results``, keyed by their path."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}/{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif key in MEASURES and isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> int:
+    """print the change of every measure, returns 1 if one got worse than ``threshold``."""
+    before = flatten({k: baseline[k] for k in ("latency", "throughput", "parse", "memory") if k in baseline})
+    after = flatten({k: current[k] for k in ("latency", "throughput", "parse", "memory") if k in current})
+    regressions = 0
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if MEASURES[path.rsplit("/", 1)[1]] else change
+        status = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+        regressions += status == "REGRESSION"
+        print(f"{path:72s} {old:10.3f} -> {new:10.3f}  {change:+7.1%}  {status}")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--parsers", nargs="+", default=["soup", "lxml"], choices=["soup", "lxml"])
+    parser.add_argument("--delay", type=float, default=0.005, help="seconds the stub delays every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra seconds, up to this")
+    parser.add_argument("--runs", type=int, default=30, help="calls per latency and parse measure")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per throughput measure")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), default=None,
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative change counted as a regression by --compare")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as fh:
+            baseline = json.load(fh)
+        with open(args.compare[1]) as fh:
+            current = json.load(fh)
+        return compare(baseline, current, args.threshold)
+
+    results = run(args)
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
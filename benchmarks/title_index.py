@@ -0,0 +1,110 @@
+"""Query latency benchmark of :class:`anikimiapi.title_index.TitleIndex`.
+
+Builds an index of synthetic titles, then times prefix autocompletion, exact
+searches and searches with one and two typos, reporting the latency percentiles.
+
+    python benchmarks/title_index.py
+    python benchmarks/title_index.py --titles 100000 --queries 5000 --json results.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from anikimiapi.data_classes import ResultObject  # noqa: E402
+from anikimiapi.title_index import TitleIndex  # noqa: E402
+
+WORDS = (
+    "after story love live school idol sword art online attack titan hero academia "
+    "demon slayer kimetsu yaiba clannad kanon spirited away night sky blue spring "
+    "summer winter autumn moon star sun dragon ball magical girl knight princess "
+    "world another isekai reincarnated slime sister brother club tennis volleyball "
+    "soccer baseball cooking detective conan ghost shell cowboy bebop steins gate "
+    "fullmetal alchemist code geass death note hunter naruto bleach piece one two "
+    "season movie special ova dub sub the of no wa ga to kara made yori"
+).split()
+
+
+def make_titles(count: int, rng) -> list:
+    titles = set()
+    while len(titles) < count:
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+        titles.add(f"{title} {rng.randint(1, 999)}" if rng.random() < 0.5 else title)
+    return sorted(titles)
+
+
+def typo(text: str, count: int, rng) -> str:
+    """``text`` with ``count`` random substitutions, deletions or transpositions."""
+    chars = list(text)
+    for _ in range(count):
+        i = rng.randrange(1, len(chars) - 1)
+        kind = rng.randrange(3)
+        if kind == 0:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif kind == 1:
+            del chars[i]
+        else:
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return "".join(chars)
+
+
+def percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)] * 1e6  # noqa: E731
+    return {"p50_us": round(pick(0.5), 1), "p90_us": round(pick(0.9), 1), "p99_us": round(pick(0.99), 1)}
+
+
+def timed(function, queries: list) -> tuple:
+    samples, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        found = function(query)
+        samples.append(time.perf_counter() - start)
+        hits += bool(found)
+    return samples, hits / len(queries)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--titles", type=int, default=50_000, help="indexed titles")
+    parser.add_argument("--queries", type=int, default=2_000, help="queries per measure")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = make_titles(args.titles, rng)
+    results = [ResultObject(title, f"anime-{i}") for i, title in enumerate(titles)]
+    start = time.perf_counter()
+    index = TitleIndex(results)
+    build = time.perf_counter() - start
+    print(f"indexed {len(index)} titles in {build:.2f} s")
+
+    samples = [rng.choice(titles).lower() for _ in range(args.queries)]
+    workloads = {
+        "complete (3 chars)": (index.complete, [s[:3] for s in samples]),
+        "complete (8 chars)": (index.complete, [s[:8] for s in samples]),
+        "search (exact)": (index.search, [s[:12] for s in samples]),
+        "search (1 typo)": (index.search, [typo(s[:12], 1, rng) for s in samples]),
+        "search (2 typos)": (index.search, [typo(s[:12], 2, rng) for s in samples]),
+    }
+    report = {"titles": len(index), "build_s": round(build, 3), "queries": {}}
+    for name, (function, queries) in workloads.items():
+        latencies, hit_rate = timed(function, queries)
+        report["queries"][name] = dict(percentiles(latencies), hit_rate=round(hit_rate, 3))
+        stats = report["queries"][name]
+        print(f"{name:20s} p50 {stats['p50_us']:8.1f} us   p90 {stats['p90_us']:8.1f} us   "
+              f"p99 {stats['p99_us']:8.1f} us   hits {hit_rate:6.1%}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,18 +17,22 @@ setup(
     url='https://github.com/BaraniARR/anikimiapi',
     download_url='https://github.com/BaraniARR/anikimiapi/releases/tag/v0.0.1-beta',
     keywords=['anime', 'gogoanime', 'download', 'sub', 'dub'],
+    python_requires='>=3.7',
     install_requires=[
         'bs4',
         'requests',
-        'requests_html',
         'lxml'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'msgpack': ['msgpack'],
+        'brotli': ['brotli'],
+    },
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
         'Topic :: Internet',
         'License :: OSI Approved :: GNU Lesser General Public License v3 or later (LGPLv3+)',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
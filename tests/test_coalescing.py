@@ -0,0 +1,118 @@
+"""The single-flight of the concurrent identical calls and fetches."""
+import threading
+import time
+
+import pytest
+
+from anikimiapi import AniKimi
+from anikimiapi.coalescing import SingleFlight
+from stub_server import StubServer
+
+CALLERS = 5
+# holds the call in flight until every caller waits for it
+release = threading.Event()
+
+
+def wait_for(predicate, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def run_together(single_flight: SingleFlight, function, copy=None) -> list:
+    """calls ``function`` from ``CALLERS`` threads, released once all of them are in flight."""
+    outcomes = [None] * CALLERS
+
+    def caller(index):
+        try:
+            outcomes[index] = single_flight.call(("fetch", "clannad"), function, copy)
+        except Exception as error:
+            outcomes[index] = error
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    # every caller but the leader waits for the call in flight
+    wait_for(lambda: single_flight.stats()["coalesced"] == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    return outcomes
+
+
+@pytest.fixture(autouse=True)
+def gate():
+    release.clear()
+    yield
+    release.set()
+
+
+def test_concurrent_identical_calls_share_one_call():
+    calls = []
+
+    def fetch():
+        calls.append(threading.get_ident())
+        assert release.wait(2)
+        return ["clannad", "clannad-after-story"]
+
+    single_flight = SingleFlight()
+    outcomes = run_together(single_flight, fetch, copy=list)
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in outcomes) == [False] + [True] * (CALLERS - 1)
+    results = [result for result, _ in outcomes]
+    assert all(result == ["clannad", "clannad-after-story"] for result in results)
+    assert len({id(result) for result in results}) == CALLERS  # a copy each
+    assert single_flight.stats() == {
+        "in_flight": 0, "executed": 1, "coalesced": CALLERS - 1, "coalesced_by_kind": {"fetch": CALLERS - 1},
+    }
+
+
+def test_error_of_the_call_reaches_every_caller():
+    def fetch():
+        assert release.wait(2)
+        raise ValueError("broken page")
+
+    single_flight = SingleFlight()
+    outcomes = run_together(single_flight, fetch)
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert single_flight.stats()["executed"] == 1
+
+    # the failed call is forgotten, the next one runs again
+    assert single_flight.call(("fetch", "clannad"), lambda: "clannad") == ("clannad", False)
+    assert single_flight.stats()["executed"] == 2
+
+
+def test_async_callers_share_one_task():
+    import asyncio
+
+    async def main():
+        calls = []
+        gate = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await gate.wait()
+            return "clannad"
+
+        single_flight = SingleFlight()
+        callers = [asyncio.ensure_future(single_flight.acall(("fetch", "clannad"), fetch)) for _ in range(CALLERS)]
+        await asyncio.sleep(0)
+        gate.set()
+        outcomes = await asyncio.gather(*callers)
+        assert calls == [1]
+        assert outcomes == [("clannad", False)] + [("clannad", True)] * (CALLERS - 1)
+
+    asyncio.run(main())
+
+
+def test_concurrent_get_details_fetch_one_page():
+    with StubServer(delay=0.2, routes=("category",)) as server:
+        with AniKimi("token", "auth", host=server.url, single_flight=SingleFlight()) as client:
+            threads = [threading.Thread(target=client.get_details, args=("clannad-dub",)) for _ in range(CALLERS)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            assert server.requests["category"] == 1
+            assert client.single_flight.stats()["coalesced_by_kind"] == {"get_details": CALLERS - 1}
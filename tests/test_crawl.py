@@ -0,0 +1,66 @@
+"""The checkpointed crawl of the catalog, against the stub server with a broken page."""
+import json
+import os
+import shutil
+
+import pytest
+
+from anikimiapi import AniKimi
+from anikimiapi.crawl import Crawler
+from stub_server import FIXTURES, StubServer
+
+BROKEN = "romance-1-3-broken"
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    """the fixtures of the stub server, one anime of the genre page having a page which can't be parsed."""
+    path = tmp_path / "fixtures"
+    shutil.copytree(FIXTURES, path)
+    genre = (path / "genre-1.html").read_text(encoding="utf-8")
+    assert '"/category/romance-1-3"' in genre
+    (path / "genre-1.html").write_text(genre.replace('"/category/romance-1-3"', f'"/category/{BROKEN}"'),
+                                       encoding="utf-8")
+    category = (path / "category.html").read_text(encoding="utf-8")
+    (path / "category-broken.html").write_text(category.replace("Released: </span>2007", "Released: </span>"),
+                                               encoding="utf-8")
+    return str(path)
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupt_after(records: int):
+    """a report callback interrupting the crawl once ``records`` records are written."""
+    def report(line):
+        if line.endswith("records/s") and int(line.split("/")[0]) >= records:
+            raise Interrupted
+    return report
+
+
+def animeids_of(output: str) -> list:
+    with open(output, encoding="utf-8") as fh:
+        return [json.loads(line)["animeid"] for line in fh]
+
+
+@pytest.mark.parametrize("processes", [None, 1])
+def test_broken_page_is_failed_and_the_crawl_resumes(tmp_path, fixtures, processes):
+    output = str(tmp_path / "catalog.jsonl")
+    with StubServer(fixtures=fixtures) as server, AniKimi("token", "auth", host=server.url) as client:
+        crawler = Crawler(client, output, workers=1, limit=20, processes=processes,
+                          report=interrupt_after(12), report_interval=0)
+        with pytest.raises(Interrupted):
+            crawler.run(["romance"])
+        assert len(animeids_of(output)) == 12
+        assert os.path.exists(output + ".checkpoint")
+
+        crawler = Crawler(client, output, workers=4, limit=20, processes=processes, report=lambda line: None)
+        stats = crawler.run(["romance"])
+
+    assert (stats["resumed"], stats["records"], stats["failed"], stats["errors"]) == (12, 7, 1, 0)
+    assert crawler.failed[BROKEN].startswith("ValueError")
+    animeids = animeids_of(output)
+    assert len(animeids) == len(set(animeids)) == 19
+    assert BROKEN not in animeids
+    assert not os.path.exists(output + ".checkpoint")  # finished
@@ -0,0 +1,121 @@
+"""The segmented, resumable downloader, against the media route of the stub server."""
+import os
+
+import pytest
+
+from anikimiapi.data_classes import MediaLinksObject
+from anikimiapi.download import Downloader
+from anikimiapi.error_handlers import NetworkError
+from stub_server import StubServer, media_bytes
+
+
+class Interrupt(Exception):
+    pass
+
+
+def interrupt_after(size: int):
+    """a progress callback stopping the download once ``size`` bytes are on disk."""
+    def progress(report):
+        if report.downloaded >= size:
+            raise Interrupt
+    return progress
+
+
+def leftovers(path: str) -> list:
+    return [suffix for suffix in (".part", ".manifest") if os.path.exists(path + suffix)]
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_download_over_several_connections(tmp_path, use_mmap):
+    path = str(tmp_path / "episode.mp4")
+    with StubServer(media_size=2 << 20) as server:
+        with Downloader(connections=4, chunk_size=256 << 10, min_chunk=64 << 10, use_mmap=use_mmap) as downloader:
+            result = downloader.download(f"{server.url}media/episode.mp4", path)
+        assert server.ranges_served > 1
+        with open(path, "rb") as fh:
+            assert fh.read() == server.media
+    assert result.size == 2 << 20
+    assert result.resumed == 0
+    assert not leftovers(path)
+
+
+def test_interrupted_download_resumes_from_its_manifest(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    size = 2 << 20
+    with StubServer(media_size=size, rate=1 << 20) as server:
+        url = f"{server.url}media/episode.mp4"
+        with Downloader(connections=2, chunk_size=128 << 10, min_chunk=64 << 10,
+                        progress=interrupt_after(512 << 10), progress_interval=0.05) as downloader:
+            with pytest.raises(Interrupt):
+                downloader.download(url, path)
+        assert leftovers(path) == [".part", ".manifest"]
+
+        with Downloader(connections=2) as downloader:
+            result = downloader.download(url, path)
+        with open(path, "rb") as fh:
+            assert fh.read() == server.media
+    assert result.resumed >= 512 << 10
+    assert result.resumed + result.downloaded == size
+    assert not leftovers(path)
+
+
+def test_changed_file_is_downloaded_again(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    with StubServer(media_size=1 << 20, rate=1 << 20) as server:
+        url = f"{server.url}media/episode.mp4"
+        with Downloader(connections=2, chunk_size=128 << 10, min_chunk=64 << 10,
+                        progress=interrupt_after(256 << 10), progress_interval=0.05) as downloader:
+            with pytest.raises(Interrupt):
+                downloader.download(url, path)
+
+        server.media = media_bytes(1 << 20)[::-1]  # same size, another ETag
+        with Downloader(connections=2) as downloader:
+            result = downloader.download(url, path)
+        with open(path, "rb") as fh:
+            assert fh.read() == server.media
+    assert result.resumed == 0
+
+
+def test_file_changed_during_the_download_is_not_mixed(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    size = 1 << 20
+    with StubServer(media_size=size, rate=512 << 10) as server:
+        url = f"{server.url}media/episode.mp4"
+        changed = media_bytes(size)[::-1]
+
+        def change_once(report):
+            if report.downloaded and server.media != changed:
+                server.media = changed
+
+        # the ranges asked with the old If-Range get the whole new file, a 200
+        with Downloader(connections=2, chunk_size=64 << 10, min_chunk=64 << 10, max_chunk=64 << 10,
+                        progress=change_once, progress_interval=0.05) as downloader:
+            with pytest.raises(NetworkError, match="changed"):
+                downloader.download(url, path)
+
+        with Downloader(connections=2) as downloader:
+            result = downloader.download(url, path)
+        with open(path, "rb") as fh:
+            assert fh.read() == changed
+    assert result.resumed == 0
+
+
+def test_server_without_ranges_gets_a_single_stream(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    with StubServer(media_size=1 << 20, ranges=False) as server:
+        with Downloader(connections=4) as downloader:
+            result = downloader.download_links(MediaLinksObject(link_720p=f"{server.url}media/episode.mp4"), path)
+        assert server.ranges_served == 0
+        with open(path, "rb") as fh:
+            assert fh.read() == server.media
+    assert result.chunks == 0
+
+
+def test_dropped_connections_are_retried(tmp_path):
+    path = str(tmp_path / "episode.mp4")
+    with StubServer(media_size=1 << 20, drop=0.3, routes=("media",), seed=1) as server:
+        with Downloader(connections=4, chunk_size=128 << 10, min_chunk=64 << 10, retries=10) as downloader:
+            result = downloader.download(f"{server.url}media/episode.mp4", path)
+        with open(path, "rb") as fh:
+            assert fh.read() == server.media
+    assert result.retries > 0
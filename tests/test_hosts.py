@@ -0,0 +1,67 @@
+"""The failover and the ranking of the mirrors of a host pool, against stub servers."""
+import time
+
+import pytest
+
+from anikimiapi import AniKimi
+from anikimiapi.error_handlers import InvalidAnimeIdError
+from anikimiapi.hosts import HostPool
+from anikimiapi.transport import Page, Transport
+from stub_server import StubServer
+
+SEARCH = "search.html?keyword=clannad"
+
+
+def wait_for(predicate, timeout: float = 3.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def test_failover_to_the_second_mirror_on_server_errors():
+    with StubServer(fail=1.0) as first, StubServer() as second, Transport() as transport:
+        pool = HostPool([first.url, second.url], probe_interval=None)
+        for _ in range(3):
+            assert pool.get(transport, SEARCH).status == 200
+        # the first mirror failed once, then is tried last
+        assert (first.requests["search"], second.requests["search"]) == (1, 3)
+        assert pool.ranked() == [second.url, first.url]
+        stats = pool.stats()
+        assert stats[first.url]["error_rate"] == 1.0
+        assert stats[second.url]["error_rate"] == 0.0
+
+
+@pytest.mark.parametrize("status, valid", [(200, True), (301, True), (304, True), (403, False), (404, False),
+                                           (500, False), (503, False)])
+def test_only_successes_and_redirects_are_valid(status, valid):
+    pool = HostPool(["https://gogoanime.example/"], probe_interval=None)
+    assert pool.is_valid("https://gogoanime.example/", Page("https://gogoanime.example/", status, "", {})) is valid
+    # a redirect to another domain never is
+    assert not pool.is_valid("https://gogoanime.example/", Page("https://parked.example/", status, "", {}))
+
+
+def test_missing_page_counts_against_the_mirrors_and_is_returned():
+    with StubServer() as first, StubServer() as second:
+        pool = HostPool([first.url, second.url], probe_interval=None)
+        with AniKimi("token", "auth", host=pool) as client:
+            with pytest.raises(InvalidAnimeIdError):
+                client.get_details("clannad-invalid")
+        # both were asked, the 404 of the first is returned
+        assert [(stats["samples"], stats["error_rate"]) for stats in pool.stats().values()] == [(1, 1.0)] * 2
+
+
+def test_ranking_after_probes():
+    unreachable = "http://127.0.0.1:99999/"  # an invalid url, not a connection error
+    with StubServer(delay=0.2, routes=("home",)) as slow, StubServer() as fast:
+        pool = HostPool([slow.url, unreachable, fast.url], probe_interval=0.2)
+        try:
+            assert pool.ranked() == [slow.url, unreachable, fast.url]  # the order given, not probed yet
+            wait_for(lambda: all(stats["samples"] >= 2 for stats in pool.stats().values()))
+            stats = pool.stats()
+            assert stats[fast.url]["probe_latency"] < 0.2 <= stats[slow.url]["probe_latency"]
+            assert stats[unreachable]["error_rate"] == 1.0
+            assert pool.ranked() == [fast.url, slow.url, unreachable]
+        finally:
+            pool.close()
+        assert slow.requests["home"] >= 2 and fast.requests["home"] >= 2
@@ -0,0 +1,26 @@
+"""The metrics aggregated from the spans, and their Prometheus exposition."""
+from anikimiapi.instrumentation import Metrics, Span
+
+
+def test_prometheus_label_values_are_escaped():
+    metrics = Metrics()
+    error = 'NetworkError("C:\\cache"\nretrying)'
+    metrics(Span("call", "search_anime", 0.0, 0.01, {"error": error}))
+    exposition = metrics.to_prometheus()
+    line = next(line for line in exposition.splitlines() if line.startswith("anikimiapi_call_errors_total"))
+    assert line == (
+        'anikimiapi_call_errors_total{method="search_anime",'
+        'error="NetworkError(\\"C:\\\\cache\\"\\nretrying)"} 1'
+    )
+    # one sample per line, the newline of the value is escaped
+    assert all(line.startswith(("#", "anikimiapi_")) for line in exposition.splitlines())
+
+
+def test_failed_fetch_has_an_error_status():
+    metrics = Metrics()
+    metrics(Span("fetch", "get_details", 0.0, 0.2, {"route": "category", "error": "ConnectionError"}))
+    metrics(Span("fetch", "get_details", 0.0, 0.1, {"route": "category", "status": 200, "bytes": 10}))
+    counters = metrics.to_dict()["counters"]
+    assert counters['anikimiapi_fetches_total{route="category",status="error"}'] == 1
+    assert counters['anikimiapi_fetches_total{route="category",status="200"}'] == 1
+    assert not any('status="None"' in name for name in counters)
@@ -0,0 +1,68 @@
+"""The expiry of the signed links, and the cache of the resolved links."""
+import time
+
+import pytest
+
+from anikimiapi.data_classes import MediaLinksObject
+from anikimiapi.link_cache import LinkCache, link_expiry
+
+NOW = 1_700_000_000.0
+
+
+@pytest.mark.parametrize("url, expected", [
+    # absolute timestamps
+    ("https://cdn.example/v.mp4?expires=1700003600", 1700003600),
+    ("https://cdn.example/v.mp4?Expires=1700003600&sig=abc", 1700003600),
+    ("https://cdn.example/v.mp4?expiry=1700003600000", 1700003600.0),  # milliseconds
+    ("https://cdn.example/v.mp4?exp=1700003600", 1700003600),
+    ("https://cdn.example/v.mp4?e=1700003600&token=x", 1700003600),
+    # seconds from now, only with an explicit name
+    ("https://cdn.example/v.mp4?expires=600", NOW + 600),
+    ("https://cdn.example/v.mp4?e=1", None),
+    ("https://cdn.example/v.mp4?exp=3600", None),
+    ("https://cdn.example/v.mp4?e=1&expires=900", NOW + 900),
+    # the S3 presigned urls, relative to their signing date
+    ("https://s3.example/v.mp4?X-Amz-Date=20231114T221320Z&X-Amz-Expires=3600", 1700000000 + 3600),
+    ("https://s3.example/v.mp4?X-Amz-Date=yesterday&X-Amz-Expires=3600", None),
+    ("https://s3.example/v.mp4?X-Amz-Date=20231114T221320Z&X-Amz-Expires=soon", None),
+    # non numeric values
+    ("https://cdn.example/v.mp4?expires=tomorrow", None),
+    ("https://cdn.example/v.mp4?e=-5", None),
+    ("https://cdn.example/v.mp4?expires=1.5e9", None),
+    # no expiry
+    ("https://cdn.example/v.mp4", None),
+    ("https://cdn.example/v.mp4?quality=720", None),
+    ("", None),
+    (None, None),
+])
+def test_link_expiry(url, expected):
+    assert link_expiry(url, NOW) == expected
+
+
+def test_links_without_expiry_fall_back_to_the_ttl():
+    cache = LinkCache(ttl=300, margin=0)
+    now = time.time()
+    expiries = cache.expiries(MediaLinksObject(
+        link_720p="https://cdn.example/v.mp4?quality=720",
+        link_360p="https://cdn.example/v.mp4?e=1",
+        link_hdp=f"https://cdn.example/v.mp4?expires={int(now) + 60}",
+    ), now)
+    assert expiries == {
+        "link_360p": now + 300,
+        "link_720p": now + 300,
+        "link_hdp": int(now) + 60,
+    }
+
+
+def test_links_are_served_until_the_margin_before_the_first_expiry():
+    cache = LinkCache(ttl=3600, margin=60)
+    key = ("clannad-dub", 3, "advanced")
+    cache.put(key, MediaLinksObject(link_720p=f"https://cdn.example/v.mp4?expires={int(time.time()) + 61}"))
+    assert cache.get(key).link_720p.startswith("https://cdn.example/")
+    time.sleep(1.1)
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+
+    # already within the margin, never cached
+    cache.put(key, MediaLinksObject(link_720p=f"https://cdn.example/v.mp4?expires={int(time.time()) + 30}"))
+    assert len(cache) == 0
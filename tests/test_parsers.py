@@ -0,0 +1,48 @@
+"""The parity of the parser backends: every method on every fixture gives the same result."""
+import os
+
+import pytest
+
+from anikimiapi.parsers import BaseParser, LxmlParser, SoupParser
+from stub_server import FIXTURES
+
+pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+METHODS = sorted(name for name, value in vars(BaseParser).items() if callable(value) and not name.startswith("_"))
+PAGES = sorted(name for name in os.listdir(FIXTURES) if name.endswith(".html"))
+
+
+def fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as fh:
+        return fh.read().replace("EMBEDHOST", "127.0.0.1:8765")
+
+
+def outcome(parser, method: str, page_source: str):
+    """the result of a parser method, comparable across the backends, or the kind of its error."""
+    try:
+        result = getattr(parser, method)(page_source)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return "error"
+    return repr(result)
+
+
+@pytest.mark.parametrize("partial", [True, False])
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("method", METHODS)
+def test_backends_give_the_same_results(method, page, partial):
+    page_source = fixture(page)
+    assert outcome(SoupParser(partial), method, page_source) == outcome(LxmlParser(partial), method, page_source)
+
+
+def test_every_method_reads_its_fixture():
+    # the parity above is not only the one of the errors
+    read = {method for method in METHODS for page in PAGES if outcome(LxmlParser(), method, fixture(page)) != "error"}
+    assert read == set(METHODS)
+
+
+def test_mirror_names_are_single_spaced():
+    page_source = fixture("episode.html").replace('<li class="streamsb">', '<li class=" streamsb\n  hd ">')
+    for parser in (SoupParser(), LxmlParser()):
+        names = [name for name, _ in parser.mirrors(page_source)]
+        assert names[:3] == ["vidcdn", "streamsb hd", "xstreamcdn"]
@@ -0,0 +1,37 @@
+"""The pages of a pipeline parsed in worker processes, through the parse of the client."""
+import pytest
+
+from anikimiapi import AniKimi
+from anikimiapi.cache import ResponseCache
+from anikimiapi.error_handlers import InvalidAnimeIdError
+from anikimiapi.instrumentation import Instrumentation
+from anikimiapi.pipeline import Pipeline
+from stub_server import StubServer
+
+pytest.importorskip("lxml")
+
+
+def test_parses_in_the_workers_are_reported():
+    spans = []
+    with StubServer() as server, AniKimi("token", "auth", host=server.url, parser="lxml",
+                                         instrumentation=Instrumentation(hooks=[spans.append])) as client:
+        with Pipeline(client, fetchers=4, processes=1) as pipeline:
+            results = dict(pipeline.get_details(["clannad", "kanon", "air", "air-invalid"]))
+        expected = client.get_details("clannad")
+    assert isinstance(results.pop("air-invalid"), InvalidAnimeIdError)
+    assert all(details == expected for details in results.values())
+    parses = [span for span in spans if span.name == "parse" and span.method is None]
+    assert [span.attributes["phase"] for span in parses] == ["details"] * 4
+    # the time the workers spent building the trees, unknown for the page which failed
+    assert sorted(span.duration > 0 for span in parses) == [False, True, True, True]
+
+
+def test_results_parsed_from_a_cached_page_are_reused():
+    spans = []
+    with StubServer() as server, AniKimi("token", "auth", host=server.url, parser="lxml", cache=ResponseCache(),
+                                         instrumentation=Instrumentation(hooks=[spans.append])) as client:
+        with Pipeline(client, fetchers=1, processes=1) as pipeline:
+            results = list(pipeline.get_details(["clannad", "clannad"]))
+        assert server.requests["category"] == 1
+    assert results[0] == results[1]
+    assert [span.name for span in spans].count("parse") == 1
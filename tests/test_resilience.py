@@ -0,0 +1,134 @@
+"""The retries, the hedged requests and the circuit breaker of the transports, against the stub server."""
+import asyncio
+import time
+
+import pytest
+import requests
+
+from anikimiapi.error_handlers import CircuitOpenError
+from anikimiapi.resilience import CircuitBreaker, HedgePolicy, RetryPolicy
+from anikimiapi.transport import AsyncTransport, Transport
+from stub_server import StubServer
+
+
+def search_url(server) -> str:
+    return f"{server.url}search.html?keyword=clannad"
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    with StubServer(fail=1.0, routes=("search",)) as server, Transport(breaker=breaker) as transport:
+        url = search_url(server)
+        assert transport.get(url).status == 500
+        assert breaker.state(url) == "closed"
+        assert transport.get(url).status == 500
+        assert breaker.state(url) == "open"
+
+        with pytest.raises(CircuitOpenError):
+            transport.get(url)
+        assert server.requests["search"] == 2  # failed fast, never sent
+
+        server.fail = 0.0
+        time.sleep(0.25)
+        assert transport.get(url).status == 200  # the probe of the half-open circuit
+        assert breaker.state(url) == "closed"
+        assert breaker.stats()[f"127.0.0.1:{server.port}"]["failures"] == 0
+
+
+def test_breaker_failed_probe_opens_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    with StubServer(drop=1.0, routes=("search",)) as server, Transport(breaker=breaker) as transport:
+        url = search_url(server)
+        with pytest.raises(requests.exceptions.ConnectionError):
+            transport.get(url)
+        assert breaker.state(url) == "open"
+
+        # the probe fails with an error which is not a connection error
+        server.drop, server.truncate = 0.0, 1.0
+        time.sleep(0.25)
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            transport.get(url)
+        assert breaker.state(url) == "open"
+
+        server.truncate = 0.0
+        time.sleep(0.25)
+        assert transport.get(url).status == 200
+        assert breaker.state(url) == "closed"
+
+
+def test_async_breaker_failed_probe_opens_again():
+    pytest.importorskip("aiohttp")
+    import aiohttp
+
+    async def run(server, url):
+        transport = AsyncTransport(breaker=breaker)
+        try:
+            with pytest.raises(aiohttp.ClientPayloadError):
+                await transport.get(url)
+            assert breaker.state(url) == "open"
+            server.truncate = 0.0
+            await asyncio.sleep(0.25)
+            assert (await transport.get(url)).status == 200
+        finally:
+            await transport.close()
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    with StubServer(truncate=1.0, routes=("search",)) as server:
+        url = search_url(server)
+        asyncio.run(run(server, url))
+        assert breaker.state(url) == "closed"
+
+
+def test_unanswered_probe_is_given_up_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    url = "http://127.0.0.1:1/"
+    breaker.failure(url)
+    time.sleep(0.15)
+    breaker.check(url)  # the probe, which never reports back
+    assert breaker.state(url) == "half-open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check(url)
+    time.sleep(0.15)
+    breaker.check(url)  # another probe goes through
+
+
+def test_retry_honours_retry_after():
+    retry = RetryPolicy(retries=1, backoff=0.001)
+    with StubServer(throttle=1.0, routes=("search",)) as server, Transport(retry=retry) as transport:
+        start = time.monotonic()
+        page = transport.get(search_url(server))
+        elapsed = time.monotonic() - start
+    assert page.status == 503
+    assert page.header("retry-after") == "1"
+    assert retry.retried == 1
+    assert server.requests["search"] == 2
+    assert elapsed >= 1.0  # the Retry-After, not the 1ms backoff
+
+
+def test_retry_recovers_from_dropped_connections():
+    retry = RetryPolicy(retries=5, backoff=0.001)
+    with StubServer(drop=0.5, routes=("search",), seed=3) as server, Transport(retry=retry) as transport:
+        pages = [transport.get(search_url(server)) for _ in range(10)]
+    assert all(page.status == 200 for page in pages)
+    assert retry.retried > 0
+
+
+def test_hedge_sends_a_duplicate_of_a_slow_request():
+    hedge = HedgePolicy(min_samples=5, min_delay=0.05)
+    with StubServer(routes=("search",)) as server, Transport(hedge=hedge) as transport:
+        url = search_url(server)
+        for _ in range(5):
+            transport.get(url)
+        server.tail = (1.0, 0.3)
+        assert transport.get(url).status == 200
+    assert hedge.hedged == 1
+    assert server.requests["search"] == 7
+
+
+def test_timeout_of_a_request():
+    breaker = CircuitBreaker(failure_threshold=1)
+    with StubServer(delay=1.0, routes=("search",)) as server, Transport(breaker=breaker) as transport:
+        url = search_url(server)
+        with pytest.raises(requests.exceptions.Timeout):
+            transport.get(url, timeout=0.2)
+        assert breaker.state(url) == "open"
@@ -0,0 +1,96 @@
+"""The AIMD limits of the scheduler, fed with successes and failures."""
+import threading
+import time
+
+import pytest
+
+from anikimiapi.scheduler import Scheduler
+
+URL = "https://gogoanime.example/category/clannad"
+HOST = "gogoanime.example"
+
+
+def feed(scheduler: Scheduler, status: int = 200, elapsed: float = 0.01, times: int = 1, retry_after=None) -> dict:
+    for _ in range(times):
+        scheduler.acquire(URL)
+        scheduler.release(URL, status, elapsed, retry_after)
+    return scheduler.stats()[HOST]
+
+
+def test_additive_increase_up_to_max_rate():
+    scheduler = Scheduler(rate=4, burst=1000, max_rate=5, increase=1)
+    rate = 4.0
+    for _ in range(3):
+        rate += 1 / rate
+        assert feed(scheduler)["rate"] == pytest.approx(rate, abs=1e-3)
+    assert feed(scheduler, times=20)["rate"] == 5
+
+
+def test_max_rate_defaults_to_four_times_the_rate():
+    scheduler = Scheduler(rate=2, burst=1000)
+    assert scheduler.max_rate == 8
+    assert feed(scheduler, times=200)["rate"] == 8
+
+
+@pytest.mark.parametrize("status", Scheduler.THROTTLE_STATUSES)
+def test_multiplicative_decrease_down_to_min_rate(status):
+    # high rates, so the bucket emptied by each decrease refills at once
+    scheduler = Scheduler(rate=800, burst=1000, max_in_flight=8, min_rate=150, decrease=0.5, cooldown=0)
+    stats = feed(scheduler, status)
+    assert (stats["rate"], stats["concurrency"], stats["throttled"]) == (400, 4, 1)
+    assert feed(scheduler, status)["rate"] == 200
+    stats = feed(scheduler, status, times=5)
+    assert (stats["rate"], stats["concurrency"]) == (150, 1)
+
+
+def test_slow_responses_decrease_the_limits():
+    scheduler = Scheduler(rate=800, burst=1000, slow_after=1.0, cooldown=0)
+    stats = feed(scheduler, 200, elapsed=2.0)
+    assert (stats["rate"], stats["slow"]) == (400, 1)
+
+
+def test_decreases_are_spaced_by_the_cooldown():
+    scheduler = Scheduler(rate=800, burst=1000, cooldown=60)
+    assert feed(scheduler, 429, times=3)["rate"] == 400
+
+
+def test_errors_and_server_errors_keep_the_limits():
+    scheduler = Scheduler(rate=8, burst=1000, max_rate=8)
+    assert feed(scheduler, None)["errors"] == 1
+    stats = feed(scheduler, 500)
+    assert (stats["rate"], stats["concurrency"], stats["throttled"]) == (8, 8, 0)
+
+
+def test_concurrency_grows_back_one_slot_per_window():
+    scheduler = Scheduler(rate=800, burst=1000, max_in_flight=8, cooldown=0)
+    assert feed(scheduler, 503)["concurrency"] == 4
+    # 1/c per success: about c successes make one more slot
+    assert feed(scheduler, times=4)["concurrency"] == 4
+    assert feed(scheduler)["concurrency"] == 5
+    assert feed(scheduler, times=100)["concurrency"] == 8
+
+
+def test_retry_after_pauses_the_host():
+    scheduler = Scheduler(rate=8, burst=1000)
+    feed(scheduler, 429, retry_after="0.3")
+    start = time.monotonic()
+    waited = scheduler.acquire(URL)
+    scheduler.release(URL, 200, 0.01)
+    assert waited >= 0.25
+    assert time.monotonic() - start >= 0.25
+
+
+def test_in_flight_requests_are_limited_per_host():
+    scheduler = Scheduler(rate=100, burst=1000, max_in_flight=2)
+    scheduler.acquire(URL)
+    scheduler.acquire(URL)
+    scheduler.acquire("https://other.example/")  # another host has its own slots
+    assert scheduler.stats()[HOST]["in_flight"] == 2
+
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (scheduler.acquire(URL), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.1)
+    scheduler.release(URL, 200, 0.01)
+    assert acquired.wait(1)
+    thread.join()
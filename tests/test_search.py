@@ -0,0 +1,56 @@
+"""The streamed search of the sync and the asyncio clients, against the stub server."""
+import asyncio
+import shutil
+
+import pytest
+
+from anikimiapi import AniKimi
+from anikimiapi.error_handlers import NetworkError, NoSearchResultsError
+from stub_server import FIXTURES, StubServer
+
+
+def search(host: str, query: str = "clannad") -> list:
+    with AniKimi("token", "auth", host=host) as client:
+        return list(client.iter_search(query))
+
+
+def asearch(host: str, query: str = "clannad") -> list:
+    pytest.importorskip("aiohttp")
+    from anikimiapi import AsyncAniKimi
+
+    async def main():
+        async with AsyncAniKimi("token", "auth", host=host) as client:
+            return [result async for result in client.iter_search(query)]
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def no_results(tmp_path):
+    """the fixtures of the stub server, with a search page listing no anime."""
+    path = tmp_path / "fixtures"
+    shutil.copytree(FIXTURES, path)
+    page = (path / "search.html").read_text(encoding="utf-8")
+    (path / "search.html").write_text(page.replace('<ul class="items">', '<ul class="empty">'), encoding="utf-8")
+    return str(path)
+
+
+def test_sync_and_async_search_give_the_same_results():
+    with StubServer() as server:
+        results = search(server.url)
+        assert results
+        assert asearch(server.url) == results
+        assert server.requests["search"] == 2
+
+
+@pytest.mark.parametrize("run", [search, asearch])
+def test_search_without_results(no_results, run):
+    with StubServer(fixtures=no_results) as server:
+        with pytest.raises(NoSearchResultsError):
+            run(server.url)
+
+
+@pytest.mark.parametrize("run", [search, asearch])
+def test_search_of_an_unreachable_host(run):
+    with pytest.raises(NetworkError):
+        run("http://127.0.0.1:1/")
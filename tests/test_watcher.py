@@ -0,0 +1,21 @@
+"""The polls of the airing watcher, against the front page of the stub server."""
+from anikimiapi import AniKimi
+from anikimiapi.instrumentation import Instrumentation
+from anikimiapi.watcher import AiringWatcher
+from stub_server import StubServer
+
+
+def test_only_a_change_is_parsed_and_the_parse_is_reported():
+    spans = []
+    with StubServer() as server, AniKimi("token", "auth", host=server.url,
+                                         instrumentation=Instrumentation(hooks=[spans.append])) as client:
+        watcher = AiringWatcher(client)
+        change = watcher.poll()
+        assert len(change.added) == len(change.airing) == 25
+        assert change.removed == []
+        assert watcher.poll() is None
+        assert server.requests["home"] == 2
+    assert watcher.stats() == {"polls": 2, "skipped": 1, "changes": 1}
+    # the parse of the client, reported like the ones of its methods
+    assert [span.attributes["phase"] for span in spans if span.name == "parse"] == ["airing"]
+    assert [span.attributes["route"] for span in spans if span.name == "fetch"] == ["home", "home"]